@@ -0,0 +1,61 @@
+#Benchmark de CleanNumb: parser vectorizado actual contra el método anterior (str.extract + astype)
+# Uso: python benchmarks/bench_cleannumb.py [filas ...]   (por defecto 1_000_000 y 10_000_000)
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kit import _numero
+
+
+#el _numero anterior: extrae los dígitos con regex fila a fila y convierte a entero
+def _numero_anterior(serie:pd.Series, sib:str =None, drop:bool =True) -> pd.Series:
+
+    if sib is not None:
+        if serie.dtype == 'object':
+            serie = serie.str.replace(sib, '', regex=False)
+    serie = serie.astype(str).str.extract(r'(\d+)')[0].astype(float)
+    serie = pd.to_numeric(serie, errors='coerce')
+
+    if drop:
+        serie = serie.fillna(0)
+
+    return serie.round(0).astype(int)
+
+#los tres casos del commit: textos numéricos limpios, 20% de basura y columna ya float64
+def _casos(filas:int) -> dict:
+
+    rng = np.random.default_rng(0)
+    precios = rng.uniform(0, 1000, filas).round(2)
+    limpios = pd.Series(precios.astype(str), dtype=object)
+
+    basura = limpios.copy()
+    malos = rng.random(filas) < 0.2
+    basura[malos] = rng.choice(["N/A", "GRATIS", "$12.50", "BBDD_ERR", "0.00$", " "], int(malos.sum()))
+
+    return {"textos limpios": limpios, "20% basura": basura, "float64": pd.Series(precios)}
+
+#mejor de 'repeticiones' corridas (segundos)
+def _medir(funcion, serie:pd.Series, repeticiones:int =3) -> float:
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(serie)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+if __name__ == "__main__":
+
+    tamanos = [int(x) for x in sys.argv[1:]] or [1_000_000, 10_000_000]
+
+    for filas in tamanos:
+        print(f"\n--- ⏱️ CleanNumb con {filas:,} filas ---")
+        for nombre, serie in _casos(filas).items():
+            anterior = _medir(_numero_anterior, serie)
+            actual = _medir(_numero, serie)
+            print(f"{nombre:>15}: anterior {anterior:7.2f} s -> actual {actual:7.2f} s ({anterior / actual:5.1f}x)")
@@ -0,0 +1,61 @@
+#Benchmark de TimePlus: turnos (horarios) y conteo semana / fin de semana (estacionalidad)
+# Uso: python benchmarks/bench_timeplus.py [filas ...]   (por defecto 1_000_000 y 10_000_000)
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from kit import _semana, _turnos
+
+
+#los turnos anteriores: lista por comprensión con condicionales hora por hora
+def _turnos_anterior(horas:pd.Series) -> list:
+    return ["Mañana" if 6 <= h < 12 else
+            "Tarde" if 12 <= h < 18 else
+            "Noche" if 18 <= h < 24 else
+            "Madrugada"
+            for h in horas]
+
+#el conteo anterior: dos recorridos en Python sobre los días
+def _semana_anterior(dias:pd.Series) -> tuple:
+    return sum(1 for d in dias if d < 5), sum(1 for d in dias if d >= 5)
+
+#el conteo actual tal como lo hace TimePlus('estacionalidad')
+def _semana_actual(dias:pd.Series) -> pd.Series:
+    return _semana(dias).value_counts()
+
+#mejor de 'repeticiones' corridas (segundos)
+def _medir(funcion, serie:pd.Series, repeticiones:int =3) -> float:
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(serie)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+if __name__ == "__main__":
+
+    tamanos = [int(x) for x in sys.argv[1:]] or [1_000_000, 10_000_000]
+
+    for filas in tamanos:
+        rng = np.random.default_rng(0)
+        fechas = pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 2 * 365 * 86400, filas), unit="s"))
+        # Los campos ya vienen de la caché de fechas (_Campo): solo se mide la clasificación
+        horas, dias = fechas.dt.hour, fechas.dt.dayofweek
+
+        # Ambos métodos deben dar lo mismo
+        assert list(_turnos(horas.iloc[:10_000])) == _turnos_anterior(horas.iloc[:10_000])
+        conteo = _semana_actual(dias.iloc[:10_000])
+        assert (conteo["Semana"], conteo["Fin de semana"]) == _semana_anterior(dias.iloc[:10_000])
+
+        print(f"\n--- ⏱️ TimePlus con {filas:,} filas ---")
+        for nombre, anterior, actual, serie in (("turnos", _turnos_anterior, _turnos, horas),
+                                                 ("semana/finde", _semana_anterior, _semana_actual, dias)):
+            t_anterior, t_actual = _medir(anterior, serie), _medir(actual, serie)
+            print(f"{nombre:>13}: anterior {t_anterior:6.2f} s -> actual {t_actual:6.2f} s "
+                  f"({t_anterior / t_actual:5.1f}x)")
@@ -2,19 +2,1948 @@ from __future__ import annotations
 from typing import Optional, Any, Union
 import pandas as pd
 import os
+import re
+import ast
 import time
+import unicodedata
+import inspect
+import functools
+import json
+import glob
+import hashlib
+import numbers
+import sys
+import queue
+import atexit
+import threading
+import multiprocessing
+import uuid
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from datetime import datetime
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String
+from sqlalchemy import create_engine, event, text, MetaData, Table, Column, Integer, String
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+
+#-------------------------Kernels de columna---------------------------
+# Funciones puras Serie -> Serie. Las usan los métodos Clean*, el planificador
+# del modo lazy y el modo Stream, así todos limpian exactamente igual.
+
+# Bytes ASCII a eliminar según el modo: drop=True solo deja letras y espacios, drop=False también números
+_ESPACIOS = b' \t\n\r\x0b\x0c'
+_SIMBOLOS = {
+    True: bytes(c for c in range(256) if not (97 <= c <= 122 or c in _ESPACIOS)),
+    False: bytes(c for c in range(256) if not (97 <= c <= 122 or 48 <= c <= 57 or c in _ESPACIOS)),
+}
+
+#normaliza un solo texto en una pasada
+def _normalizar(valor:str, drop:bool =True) -> str:
+
+    # Primero quitamos acentos (José -> Jose) y después los símbolos, así no se pierden letras
+    if not valor.isascii():
+        valor = unicodedata.normalize('NFKD', valor)
+
+    # Ya en ASCII, minúsculas + borrado de símbolos + strip + capitalize se hacen sobre bytes
+    limpio = valor.encode('ascii', errors='ignore').lower().translate(None, _SIMBOLOS[drop])
+    return limpio.strip().capitalize().decode('ascii')
+
+# Caracteres que sobreviven a la limpieza en el motor Arrow (mismo criterio que _SIMBOLOS)
+_PERMITIDOS_ARROW = {True: r"[^a-z \t\n\r\x0b\x0c]", False: r"[^a-z0-9 \t\n\r\x0b\x0c]"}
+
+#devuelve True si la serie guarda textos en Arrow (backend 'pyarrow')
+def _es_texto_arrow(serie:pd.Series) -> bool:
+    if not isinstance(serie.dtype, pd.ArrowDtype):
+        return False
+    import pyarrow as pa
+    tipo = serie.dtype.pyarrow_dtype
+    return pa.types.is_string(tipo) or pa.types.is_large_string(tipo)
+
+#limpieza de texto con kernels de Arrow (sin pasar por objetos de Python)
+def _texto_arrow(serie:pd.Series, drop:bool =True) -> pd.Series:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    # Igual que en _texto: se limpian los valores distintos y se reparten con sus códigos
+    codigos, unicos = pd.factorize(serie)
+    valores = pa.array(unicos.array)
+    valores = pc.utf8_lower(pc.utf8_normalize(valores, "NFKD"))
+    valores = pc.replace_substring_regex(valores, _PERMITIDOS_ARROW[drop], "")
+    valores = pc.utf8_capitalize(pc.utf8_trim_whitespace(valores))
+
+    limpios = valores.take(pa.array(codigos, mask=codigos < 0))
+    return pd.Series(pd.arrays.ArrowExtensionArray(limpios), index=serie.index, name=serie.name)
+
+#limpieza de texto
+def _texto(serie:pd.Series, drop:bool =True) -> pd.Series:
+
+    if _es_texto_arrow(serie):
+        return _texto_arrow(serie, drop)
+
+    # Cada valor distinto se limpia una sola vez y luego se reparte con sus códigos
+    codigos, unicos = pd.factorize(serie)
+    limpios = [_normalizar(v if isinstance(v, str) else str(v), drop) for v in unicos.tolist()]
+    limpios = np.array(limpios + [np.nan], dtype=object)
+
+    # El código -1 (nulo) apunta al último elemento, que es NaN
+    resultado = pd.Series(limpios[codigos], index=serie.index, name=serie.name)
+
+    if isinstance(serie.dtype, pd.StringDtype):
+        return resultado.astype(serie.dtype)
+
+    return resultado
+
+# Número dentro de un texto: el signo solo cuenta si va al principio ('TXN-1366' no es negativo)
+_NUMERO = r'^\s*(-)?\D*?(\d+(?:\.\d+)?)'
+
+#limpieza de numeros
+def _numero(serie:pd.Series, sib=None, drop:bool =True, decimal:str ='.', tipo:str ='auto', escala:int =2) -> pd.Series:
+
+    if serie.dtype.kind in 'iufb':
+        # Ruta rápida: la columna ya es numérica
+        valores = serie.astype(float)
+
+    else:
+        texto = serie.astype(str)
+
+        #limpiamos los numeros de simbolos (moneda, separador de miles...) en una sola pasada
+        if sib is not None:
+            simbolos = [sib] if isinstance(sib, str) else list(sib)
+            texto = texto.str.replace('|'.join(re.escape(x) for x in simbolos), '', regex=True)
+
+        # Formato con coma decimal (1.234,56): quitamos los puntos y la coma pasa a ser punto
+        if decimal != '.':
+            texto = texto.str.replace('.', '', regex=False).str.replace(decimal, '.', regex=False)
+
+        # Ruta rápida: textos que ya son números válidos
+        valores = pd.to_numeric(texto, errors='coerce').astype(float)
+        valores[np.isinf(valores)] = np.nan
+
+        # Solo los que fallaron pasan por la expresión regular
+        fallidos = valores.isna() & texto.notna()
+        if fallidos.any():
+            partes = texto[fallidos].str.extract(_NUMERO)
+            numeros = pd.to_numeric(partes[1], errors='coerce')
+            valores[fallidos] = numeros.where(partes[0].isna(), -numeros)
+
+    if drop:
+        #eliminamos nulos
+        valores = valores.fillna(0)
+
+    match tipo:
+
+        case 'float':
+            return valores
+
+        case 'decimal':
+            return valores.round(escala)
+
+        case 'Int64':
+            return valores.round(0).astype('Int64')
+
+        case 'int' | 'auto':
+            enteros = valores.round(0)
+            # En 'auto' los decimales se conservan si existen (426.35 no se trunca)
+            if tipo == 'auto' and not enteros.equals(valores):
+                return valores
+            return enteros.astype('Int64' if enteros.isna().any() else 'int64')
+
+        case _:
+            raise ValueError(f"Tipo numérico '{tipo}' no soportado (auto, int, float, Int64, decimal)")
+
+# Formatos candidatos que se prueban sobre una muestra de la columna
+_FORMATOS_FECHA = ['%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d', '%d/%m/%Y',
+                   '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%m/%d/%Y', '%d-%m-%Y', '%d.%m.%Y', '%Y%m%d']
+
+#convierte con pd.to_datetime sin que un valor raro detenga todo (None si el intento no sirve)
+def _convertir_fechas(textos:pd.Series, **opciones) -> Optional[pd.Series]:
+
+    for utc in (False, True):
+        try:
+            convertidas = pd.to_datetime(textos, errors='coerce', utc=utc, **opciones)
+            return convertidas if convertidas.dtype.kind == 'M' else None
+        except (ValueError, OverflowError, TypeError):
+            # "Mixed timezones detected": el segundo intento lleva todo a UTC
+            continue
+
+    return None
+
+#junta lo convertido por cada formato; si hay zonas horarias distintas (o con y sin zona) todo pasa a UTC
+def _unir_fechas(partes:list, indice:pd.Index) -> pd.Series:
+
+    if not partes:
+        return pd.Series(pd.NaT, index=indice, dtype='datetime64[us]')
+
+    zonas = {str(parte.dt.tz) for parte in partes if parte.dt.tz is not None}
+    if zonas and (len(zonas) > 1 or any(parte.dt.tz is None for parte in partes)):
+        partes = [parte.dt.tz_localize('UTC') if parte.dt.tz is None else parte.dt.tz_convert('UTC')
+                  for parte in partes]
+
+    return pd.concat(partes).reindex(indice)
+
+#conversion de fechas
+def _fecha(serie:pd.Series, formatos:Optional[list] =None, reporte:Optional[dict] =None) -> pd.Series:
+
+    if serie.dtype.kind == 'M':
+        # Ya es fecha, no hay nada que convertir
+        return serie
+
+    # Cada texto distinto se convierte una sola vez (las fechas se repiten mucho en pedidos)
+    codigos, unicos = pd.factorize(serie)
+    textos = pd.Series(unicos).astype(str).str.strip()
+    # Sin búfer previo: cada formato decide su resolución y su zona horaria ('9999-12-31', '+02:00')
+    partes, usados = [], {}
+
+    # 1. Detectamos los formatos dominantes sobre una muestra de valores distintos
+    muestra = textos.sample(min(len(textos), 1000), random_state=0)
+    candidatos = formatos or _FORMATOS_FECHA
+    aciertos = {f: pd.to_datetime(muestra, format=f, errors='coerce').notna().sum() for f in candidatos}
+    orden = [f for f in sorted(candidatos, key=aciertos.get, reverse=True) if formatos or aciertos[f] > 0]
+
+    # 2. Cada formato se aplica vectorizado solo a lo que aún no se pudo convertir
+    faltan = textos.index
+    for formato in orden:
+        convertidas = _convertir_fechas(textos[faltan], format=formato)
+        if convertidas is None:
+            continue
+        ok = convertidas.notna()
+        partes.append(convertidas[ok])
+        usados[formato] = ok.index[ok]
+        faltan = ok.index[~ok]
+
+    # 3. Lo que sobra (pocos valores raros) va al parser general, salvo que se fijen los formatos
+    if len(faltan) and formatos is None:
+        convertidas = _convertir_fechas(textos[faltan], format='mixed', dayfirst=True)
+        if convertidas is not None:
+            ok = convertidas.notna()
+            partes.append(convertidas[ok])
+            usados['mixto'] = ok.index[ok]
+
+    fechas = _unir_fechas(partes, textos.index)
+
+    if reporte is not None:
+        # Filas (no valores distintos) convertidas por cada formato
+        filas = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+        for formato, posiciones in usados.items():
+            if len(posiciones):
+                reporte[formato] = int(filas[posiciones].sum())
+        reporte['sin fecha'] = int(len(serie) - sum(reporte.values()))
+
+    # El código -1 (nulo) apunta al último elemento, que es NaT
+    resultado = fechas.reindex(np.arange(len(textos) + 1)).take(codigos)
+    resultado.index, resultado.name = serie.index, serie.name
+    return resultado
+
+# Patrones listos para ExtractInfo: nombre -> (regex, texto que la celda debe contener, regex que valida lo extraído)
+_EXTRACTORES = {
+    'email': (r"[\w\.-]+@[\w\.-]+", "@", r"[\w\.+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}"),
+    'telefono': (r"\+?\(?\d[\d \-().]{6,}\d", None, r"\+?(?:\D*\d){8,15}\D*"),
+    'id': (r"\b[A-Za-z]{2,5}[-_#]?\d+\b", None, r"[A-Za-z]{2,5}[-_#]?\d{1,12}"),
+    # Un monto lleva '$' o decimales y no puede ir pegado a letras o guiones ('AB-12', '55-1234' no son
+    # montos); RE2 no tiene lookbehind: el borde izquierdo se consume fuera del grupo que se extrae
+    'monto': (r"(?:^|[^\w.,$-])([-+]?(?:\$\s?\d[\d,]*(?:\.\d{1,2})?|\d[\d,]*\.\d{1,2})\b)", None,
+              r"[-+]?\$?\s?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d{1,2})?"),
+}
+
+#nombre de _EXTRACTORES o regex propia -> (regex, literal obligatorio o None, validación o None)
+def _extractor(patron:str) -> tuple:
+    return _EXTRACTORES.get(patron, (patron, None, None))
+
+#regex compilada una sola vez por patrón
+@functools.lru_cache(maxsize=256)
+def _regex(patron:str) -> re.Pattern:
+    return re.compile(patron)
+
+# En RE2 '\w' y '\d' solo son ASCII; en Python abarcan Unicode ('ñú@dom.mx')
+_UNICODE_RE2 = {'w': r"\p{L}\p{N}_", 'd': r"\p{Nd}"}
+
+#adapta una regex de Python para que RE2 encuentre lo mismo en textos con acentos
+def _re2(patron:str) -> str:
+
+    salida, clase, i = [], False, 0
+    while i < len(patron):
+        letra = patron[i]
+        if letra == '\\' and i + 1 < len(patron):
+            siguiente = patron[i + 1]
+            if siguiente in _UNICODE_RE2:
+                salida.append(_UNICODE_RE2[siguiente] if clase else f"[{_UNICODE_RE2[siguiente]}]")
+            else:
+                salida.append(patron[i:i + 2])
+            i += 2
+            continue
+        if letra == '[' and not clase:
+            clase = True
+        elif letra == ']' and clase and patron[i - 1] not in '[^':
+            clase = False
+        salida.append(letra)
+        i += 1
+
+    return "".join(salida)
+
+#deja con nombre solo el primer grupo de captura (como str.extract) y vuelve los demás no capturantes
+def _primer_grupo(patron:str) -> str:
+
+    # Sin grupos se extrae la coincidencia completa
+    if _regex(patron).groups == 0:
+        return f"(?P<m>{patron})"
+
+    salida, clase, primero, i = [], False, True, 0
+    while i < len(patron):
+        letra = patron[i]
+        if letra == '\\':
+            salida.append(patron[i:i + 2])
+            i += 2
+            continue
+        if clase:
+            clase = not (letra == ']' and patron[i - 1] not in '[^')
+        elif letra == '[':
+            clase = True
+        elif letra == '(' and (patron.startswith('(?P<', i) or not patron.startswith('(?', i)):
+            # Grupo capturante, con o sin nombre
+            salida.append('(?P<m>' if primero else '(?:')
+            primero = False
+            i = patron.index('>', i) + 1 if patron.startswith('(?P<', i) else i + 1
+            continue
+        salida.append(letra)
+        i += 1
+
+    return "".join(salida)
+
+#primera coincidencia con el motor RE2 de Arrow; las celdas sin el literal no pasan por la regex
+def _extraer_arrow(serie:pd.Series, patron:str, literal:Optional[str] =None) -> pd.Series:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    valores = pa.array(serie.array)
+    candidatas = None
+    if literal is not None:
+        candidatas = pc.fill_null(pc.match_substring(valores, literal), False)
+        valores = valores.filter(candidatas)
+
+    encontrado = pc.extract_regex(valores, _re2(_primer_grupo(patron)))
+    primero = pc.if_else(pc.is_valid(encontrado), pc.struct_field(encontrado, [0]), None)
+
+    if candidatas is not None:
+        primero = pc.replace_with_mask(pa.nulls(len(serie), primero.type), candidatas, primero)
+
+    return pd.Series(pd.arrays.ArrowExtensionArray(primero), index=serie.index, name=serie.name)
+
+#primera coincidencia de varios patrones [(regex, literal)] recorriendo una sola vez los valores distintos
+def _extraer_varios(serie:pd.Series, patrones:list) -> list:
+
+    # El 'str' de pandas también guarda Arrow: se usa RE2 y el resultado vuelve a object como antes
+    nativo = _es_texto_arrow(serie)
+    if nativo or (isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage == 'pyarrow'):
+        import pyarrow as pa
+        try:
+            resultados = [_extraer_arrow(serie, patron, literal) for patron, literal in patrones]
+            if nativo:
+                return resultados
+            return [pd.Series(r.to_numpy(dtype=object, na_value=np.nan), index=serie.index, name=serie.name,
+                              dtype=object) for r in resultados]
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            pass  # Patrón que RE2 no entiende (ej: lookbehind): se usa el motor de Python
+
+    codigos, unicos = pd.factorize(serie)
+    valores = [v if isinstance(v, str) else str(v) for v in unicos.tolist()]
+    # Con grupos de captura se devuelve el primero (como str.extract), sin grupos toda la coincidencia
+    buscadores = [(_regex(patron).search, min(_regex(patron).groups, 1), literal) for patron, literal in patrones]
+    # Una casilla extra al final para el nulo (código -1)
+    salidas = [[np.nan] * (len(valores) + 1) for _ in patrones]
+
+    for k, valor in enumerate(valores):
+        for salida, (buscar, grupo, literal) in zip(salidas, buscadores):
+            if literal is not None and literal not in valor:
+                continue
+            encontrado = buscar(valor)
+            if encontrado is not None and encontrado.group(grupo) is not None:
+                salida[k] = encontrado.group(grupo)
+
+    return [pd.Series(np.array(salida, dtype=object)[codigos], index=serie.index, name=serie.name, dtype=object)
+            for salida in salidas]
+
+#extraccion del primer patron encontrado
+def _extraer(serie:pd.Series, patron:str, literal:Optional[str] =None) -> pd.Series:
+    return _extraer_varios(serie, [(patron, literal)])[0]
+
+#True donde lo extraído cumple la validación completa (sin validación: donde hubo coincidencia)
+def _validar(serie:pd.Series, validacion:Optional[str] =None) -> pd.Series:
+
+    codigos, unicos = pd.factorize(serie)
+    completo = None if validacion is None else _regex(validacion).fullmatch
+    validos = np.array([completo is None or completo(str(v)) is not None for v in unicos.tolist()] + [False])
+    return pd.Series(validos[codigos], index=serie.index)
+
+#redondeo de decimales
+def _decimal(serie:pd.Series, decimales:int =2) -> pd.Series:
+    return pd.to_numeric(serie, errors='coerce').round(decimales)
+
+# Turnos por defecto de TimePlus('horarios'): {'Nombre': (hora_inicio, hora_fin)}
+_TURNOS = {"Madrugada": (0, 6), "Mañana": (6, 12), "Tarde": (12, 18), "Noche": (18, 24)}
+
+#clasifica horas (0-23) en turnos; sin hora (NaT) queda nulo
+def _turnos(horas:pd.Series, turnos:dict =_TURNOS) -> pd.Series:
+
+    # Tabla de 24 posiciones hora -> turno, calculada con np.select una sola vez
+    dia = np.arange(24)
+    condiciones = [(dia >= ini) & (dia < fin) if ini < fin else (dia >= ini) | (dia < fin)
+                   for ini, fin in turnos.values()]
+    tabla = np.append(np.select(condiciones, np.arange(len(turnos)), default=-1), -1)
+
+    # Las horas nulas apuntan a la última posición (-1 = sin turno)
+    h = horas.to_numpy(dtype=float, na_value=np.nan)
+    codigos = tabla[np.where(np.isnan(h), 24, h).astype(np.intp)]
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=list(turnos)), index=horas.index, name=horas.name)
+
+#clasifica dias (0=lunes ... 6=domingo) en semana o fin de semana; sin fecha queda nulo
+def _semana(dias:pd.Series, finde:tuple =(5, 6)) -> pd.Series:
+
+    d = dias.to_numpy(dtype=float, na_value=np.nan)
+    codigos = np.where(np.isnan(d), -1, np.isin(d, finde).astype(np.int8))
+    return pd.Series(pd.Categorical.from_codes(codigos, categories=["Semana", "Fin de semana"]), index=dias.index, name=dias.name)
+
+#aplica un kernel solo a los valores distintos y reparte el resultado con los códigos
+def _por_categorias(serie:pd.Series, funcion, categorica:bool =True, **kw) -> pd.Series:
+
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+    else:
+        codigos, unicos = pd.factorize(serie)
+
+    # Si hay nulos (código -1) van al final para que el kernel decida qué hacer con ellos; sin
+    # nulos no se agrega nada (un NaN de más cambiaría el tipo: Int64 en vez de int64)
+    nulos = bool((codigos < 0).any())
+    entrada = pd.Series(list(unicos) + [np.nan] * nulos, dtype=object, name=serie.name)
+    salida = funcion(entrada, **kw).reset_index(drop=True)
+    if nulos:
+        codigos = np.where(codigos < 0, len(unicos), codigos)
+
+    if not categorica:
+        resultado = salida.take(codigos)
+        resultado.index = serie.index
+        return resultado
+
+    # Categorías que quedan iguales tras limpiar ('Elena' y 'Elena123!!') se fusionan en una
+    nuevos, finales = pd.factorize(salida)
+    return pd.Series(pd.Categorical.from_codes(nuevos[codigos], categories=finales),
+                     index=serie.index, name=serie.name)
+
+#mismo tipo numérico en el backend de la serie (NumPy, nullable de pandas o Arrow)
+def _en_backend(tipo, nombre:str):
+
+    if isinstance(tipo, pd.ArrowDtype):
+        import pyarrow as pa
+        return pd.ArrowDtype(pa.from_numpy_dtype(np.dtype(nombre)))
+
+    if isinstance(tipo, pd.api.extensions.ExtensionDtype):
+        # Int64 -> Int8, Float64 -> Float32 ...
+        return pd.api.types.pandas_dtype(nombre.capitalize())
+
+    return np.dtype(nombre)
+
+#entero con signo más chico que abarca [bajo, alto] (sin signo se evita: restas negativas)
+def _entero_compacto(tipo, bajo, alto, entero_min:str ='int8'):
+
+    for nombre in ('int8', 'int16', 'int32'):
+        candidato = np.dtype(nombre)
+        if candidato.itemsize < np.dtype(entero_min).itemsize:
+            continue
+        if candidato.itemsize >= tipo.itemsize:
+            return None
+        if np.iinfo(candidato).min <= bajo and alto <= np.iinfo(candidato).max:
+            return _en_backend(tipo, nombre)
+    return None
+
+#tipo más pequeño que guarda la serie sin perder información (None si no se gana nada)
+def _tipo_compacto(serie:pd.Series, umbral:float =0.5, entero_min:str ='int8'):
+
+    tipo = serie.dtype
+
+    if isinstance(tipo, pd.CategoricalDtype) or len(serie) == 0 or serie.isna().all():
+        return None
+
+    if tipo.kind in 'iu':
+        return _entero_compacto(tipo, serie.min(), serie.max(), entero_min)
+
+    if tipo.kind == 'f':
+        # float32 solo si cada valor vuelve idéntico (19.99 no cabe exacto y se queda en float64)
+        if tipo.itemsize <= 4:
+            return None
+        corto = _en_backend(tipo, 'float32')
+        ida = serie.astype(corto).astype(tipo)
+        return corto if bool(((ida == serie) | serie.isna()).all()) else None
+
+    if tipo.kind in 'OU':
+        # Textos repetitivos (pocos valores distintos respecto a las filas) -> Categorical
+        if serie.nunique(dropna=True) <= umbral * len(serie):
+            return 'category'
+
+    return None
+
+#-------------------------Formulas (compilador)---------------------------
+# "Precio_final = Subtotal + IVA - Descuento" se compila una vez a una lista de
+# ufuncs de NumPy y se evalúa por bloques de filas con búferes reutilizados:
+# sin columnas ni Series intermedias del tamaño del DataFrame.
+
+_OPERADORES = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Pow: np.power, ast.Mod: np.mod}
+_FUNCIONES = {'abs': np.abs, 'sqrt': np.sqrt, 'log': np.log, 'exp': np.exp,
+              'minimum': np.minimum, 'maximum': np.maximum}
+
+#división como la de Calculadora: donde el divisor es 0 se divide entre 1
+def _dividir(a, b, out):
+    cero = np.equal(b, 0)
+    np.copyto(out, a, where=cero)
+    return np.divide(a, b, out=out, where=np.logical_not(cero))
+
+#compila una fórmula 'Resultado = expresión' (las columnas con espacios van entre `comillas`)
+@functools.lru_cache(maxsize=256)
+def _compilar(formula:str) -> dict:
+
+    # `nombre con espacios` -> identificador temporal
+    nombres = {}
+    def marcar(m):
+        nombres[f"_col{len(nombres)}_"] = m.group(1)
+        return f"_col{len(nombres) - 1}_"
+    codigo = re.sub(r"`([^`]+)`", marcar, formula.strip())
+
+    try:
+        arbol = ast.parse(codigo, mode='exec')
+    except SyntaxError as e:
+        raise ValueError(f"Sintaxis inválida en '{formula}': {e.msg}") from None
+
+    if len(arbol.body) != 1 or not isinstance(arbol.body[0], ast.Assign) or len(arbol.body[0].targets) != 1 \
+            or not isinstance(arbol.body[0].targets[0], ast.Name):
+        raise ValueError(f"La fórmula debe tener la forma 'Resultado = expresión': {formula}")
+
+    pasos, columnas, libres = [], set(), []
+    flotante, temporales = False, 0
+
+    def temporal():
+        nonlocal temporales
+        if libres:
+            return libres.pop()
+        temporales += 1
+        return ('t', temporales - 1)
+
+    def soltar(*refs):
+        libres.extend(r for r in refs if r[0] == 't')
+
+    def nodo(n):
+        nonlocal flotante
+
+        if isinstance(n, ast.Constant) and isinstance(n.value, (int, float)) and not isinstance(n.value, bool):
+            flotante |= isinstance(n.value, float)
+            return ('k', n.value)
+
+        if isinstance(n, ast.Name):
+            nombre = nombres.get(n.id, n.id)
+            columnas.add(nombre)
+            return ('c', nombre)
+
+        if isinstance(n, ast.UnaryOp) and isinstance(n.op, (ast.USub, ast.UAdd)):
+            valor = nodo(n.operand)
+            if isinstance(n.op, ast.UAdd):
+                return valor
+            if valor[0] == 'k':
+                return ('k', -valor[1])
+            soltar(valor)
+            destino = temporal()
+            pasos.append((np.negative, (valor,), destino))
+            return destino
+
+        if isinstance(n, ast.BinOp) and (type(n.op) in _OPERADORES or isinstance(n.op, ast.Div)):
+            izq, der = nodo(n.left), nodo(n.right)
+            division = isinstance(n.op, ast.Div)
+            flotante |= division or isinstance(n.op, ast.Pow)
+            funcion = _dividir if division else _OPERADORES[type(n.op)]
+
+            if izq[0] == der[0] == 'k':
+                # Constantes: se resuelven al compilar (1 - 0.10 -> 0.9)
+                if division:
+                    return ('k', izq[1] / (der[1] or 1))
+                return ('k', funcion(izq[1], der[1]).item())
+
+            soltar(izq, der)
+            destino = temporal()
+            pasos.append((funcion, (izq, der), destino))
+            return destino
+
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Name) and n.func.id in _FUNCIONES and not n.keywords:
+            argumentos = tuple(nodo(a) for a in n.args)
+            flotante |= n.func.id in ('sqrt', 'log', 'exp')
+            soltar(*argumentos)
+            destino = temporal()
+            pasos.append((_FUNCIONES[n.func.id], argumentos, destino))
+            return destino
+
+        raise ValueError(f"Elemento no permitido en la fórmula '{formula}': {ast.unparse(n)}")
+
+    resultado = nodo(arbol.body[0].value)
+
+    # El último paso escribe directo en la columna de salida
+    if pasos and resultado == pasos[-1][2]:
+        pasos[-1] = (pasos[-1][0], pasos[-1][1], ('s',))
+    else:
+        pasos.append((np.positive, (resultado,), ('s',)))
+
+    destino = arbol.body[0].targets[0].id
+    return {'res': nombres.get(destino, destino), 'pasos': tuple(pasos), 'columnas': frozenset(columnas),
+            'flotante': flotante, 'temporales': temporales}
+
+#evalúa varias fórmulas en una sola pasada por bloques de filas; devuelve {columna: arreglo}
+def _evaluar(df:pd.DataFrame, formulas:list, bloque:int =65_536) -> dict:
+
+    compiladas = [_compilar(f) for f in formulas]
+    n = len(df)
+    arreglos, salidas, fuentes, destinos = {}, {}, [], []
+
+    for compilada in compiladas:
+
+        # Columnas de entrada (las que calcula una fórmula anterior del lote se usan directo)
+        faltan = [c for c in compilada['columnas'] if c not in arreglos and c not in df.columns]
+        if faltan:
+            raise KeyError(f"Faltan columnas: {faltan}")
+
+        for columna in compilada['columnas'] - arreglos.keys():
+            serie = df[columna]
+            if serie.dtype.kind in 'iub' and not serie.hasnans:
+                arreglos[columna] = serie.to_numpy(dtype=np.int64)
+            else:
+                arreglos[columna] = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        fuentes.append({c: arreglos[c] for c in compilada['columnas']})
+        tipo = np.float64 if compilada['flotante'] or any(
+            arreglos[c].dtype.kind == 'f' for c in compilada['columnas']) else np.int64
+        # 'A = A * 2' lee la columna original; las fórmulas siguientes ya ven la nueva
+        destinos.append(np.empty(n, dtype=tipo))
+        salidas[compilada['res']] = arreglos[compilada['res']] = destinos[-1]
+
+    # Búferes temporales del tamaño de un bloque, reutilizados en todos los bloques
+    buferes = [[np.empty(min(bloque, n), dtype=d.dtype) for _ in range(c['temporales'])]
+               for c, d in zip(compiladas, destinos)]
+
+    for inicio in range(0, n, bloque):
+
+        fin = min(inicio + bloque, n)
+        largo = fin - inicio
+
+        for compilada, temporales, columnas, salida in zip(compiladas, buferes, fuentes, destinos):
+
+            def valor(ref):
+                match ref[0]:
+                    case 'k':
+                        return ref[1]
+                    case 'c':
+                        return columnas[ref[1]][inicio:fin]
+                    case 't':
+                        return temporales[ref[1]][:largo]
+                    case _:
+                        return salida[inicio:fin]
+
+            for funcion, argumentos, destino in compilada['pasos']:
+                funcion(*(valor(a) for a in argumentos), out=valor(destino))
+
+    return salidas
+
+# Fórmulas de CalculadoraPlus: tipo -> (columna resultado, expresión, valores por defecto)
+_PRESETS = {
+    "costo_unitario": ("Costo_unitario", "{col1} / {col2}", {}),
+    "subtotal": ("Subtotal", "{col1} * {col2}", {}),
+    "iva": ("IVA", "{col1} * {col2}", {'col2': 0.16}),
+    "descuento": ("Descuento", "{col1} * (1 - {col2})", {'col2': 0.10}),
+    "precio_final": ("Precio_final", "{col1} + {col2} - {col3}", {'col3': 0.10}),
+    "margen_bruto": ("Margen_bruto", "{col1} - {col2}", {}),
+    "margen_pct": ("Margen", "{col1} / {col2} * 100", {}),
+    "margen_porcent": ("margen_porcent", "{col1} / {col2} * 100", {}),
+    "envio_KG": ("Logistica", "{col1} * {col2}", {'col2': 15}),
+    "conversion_divisa": ("Conversion", "{col1} * {col2}", {'col2': 1}),
+}
+
+#arma la fórmula de un tipo de CalculadoraPlus (las columnas van entre `comillas`, los números tal cual)
+def _preset(tipo:str, kwargs:dict) -> str:
+
+    res, expresion, defecto = _PRESETS[tipo]
+    operandos = {}
+    for clave in ('col1', 'col2', 'col3'):
+        valor = kwargs.get(clave, defecto.get(clave))
+        if isinstance(valor, np.generic):
+            # Escalares de numpy: np.int64(2) es el número 2, no una columna (y su repr no es '2')
+            valor = valor.item()
+        if isinstance(valor, numbers.Number) and not isinstance(valor, complex):
+            operandos[clave] = repr(valor if isinstance(valor, (int, float)) else float(valor))
+        else:
+            operandos[clave] = f"`{valor}`"
+
+    return f"`{res}` = " + expresion.format(**operandos)
+
+#-------------------------Perfilado (sketches)---------------------------
+# Resúmenes de tamaño fijo que se alimentan lote a lote: sirven para perfilar
+# archivos que no caben en memoria con una sola lectura.
+
+class HyperLogLog:
+    """
+    Cuenta aproximada de valores distintos con 2**p registros de un byte
+    (error típico ~1.04 / sqrt(2**p): ~0.8% con p=14, 16 KB por columna).
+    """
+
+    def __init__(self, p:int =14):
+        self.p = p
+        self.m = 1 << p
+        self.registros = np.zeros(self.m, dtype=np.uint8)
+
+    #agrega hashes de 64 bits (agregar el mismo valor dos veces no cambia nada)
+    def Agregar(self, hashes:np.ndarray):
+
+        if len(hashes) == 0:
+            return
+
+        hashes = hashes.astype(np.uint64, copy=False)
+        indices = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        # Bits restantes con un 1 de tope para que el rango nunca pase de 64 - p + 1
+        resto = (hashes << np.uint64(self.p)) | np.uint64(1 << (self.p - 1))
+        _, exponente = np.frexp(resto.astype(np.float64))
+        rangos = (65 - exponente).astype(np.uint8)  # ceros a la izquierda + 1
+        np.maximum.at(self.registros, indices, rangos)
+
+    def Estimar(self) -> int:
+
+        alfa = 0.7213 / (1 + 1.079 / self.m)
+        estimado = alfa * self.m * self.m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+
+        # Con pocos valores el conteo lineal de registros vacíos es más exacto
+        vacios = int(np.count_nonzero(self.registros == 0))
+        if estimado <= 2.5 * self.m and vacios:
+            estimado = self.m * np.log(self.m / vacios)
+
+        return int(round(estimado))
+
+class KLL:
+    """
+    Cuantiles aproximados en memoria acotada (sketch KLL): cada nivel guarda
+    a lo sumo ~k valores y al llenarse se ordena y conserva uno de cada dos,
+    que pasan al nivel siguiente con el doble de peso.
+    """
+
+    def __init__(self, k:int =200, semilla:int =0):
+        self.k = k
+        self.n = 0
+        self.niveles = [np.empty(0)]
+        self._azar = np.random.default_rng(semilla)
+
+    def _Capacidad(self, nivel:int) -> int:
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.niveles) - nivel - 1))))
+
+    #agrega un arreglo de números (los NaN se ignoran)
+    def Agregar(self, valores:np.ndarray):
+
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        self.n += len(valores)
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+
+        nivel = 0
+        while nivel < len(self.niveles):
+
+            datos = self.niveles[nivel]
+            if len(datos) > self._Capacidad(nivel):
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                datos = np.sort(datos)
+                # Con cantidad impar el último se queda en su nivel
+                sobra, datos = (datos[-1:], datos[:-1]) if len(datos) % 2 else (datos[:0], datos)
+                mitad = datos[self._azar.integers(2)::2]
+                self.niveles[nivel] = sobra
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], mitad])
+
+            nivel += 1
+
+    #devuelve los cuantiles pedidos (0-1); NaN si no hay datos
+    def Cuantiles(self, qs) -> np.ndarray:
+
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+
+        valores, pesos = self._Muestra()
+        return self._Ponderados(valores, pesos, qs)
+
+    #mediana aproximada de |x - centro| (MAD) sobre la misma muestra ponderada
+    def Desviacion(self, centro:float) -> float:
+
+        if self.n == 0:
+            return np.nan
+
+        valores, pesos = self._Muestra()
+        return self._Ponderados(np.abs(valores - centro), pesos, [0.5])[0]
+
+    def _Muestra(self) -> tuple:
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(datos), 2.0 ** nivel) for nivel, datos in enumerate(self.niveles)])
+        return valores, pesos
+
+    @staticmethod
+    def _Ponderados(valores:np.ndarray, pesos:np.ndarray, qs) -> np.ndarray:
+        orden = np.argsort(valores, kind='stable')
+        acumulado = np.cumsum(pesos[orden])
+        posiciones = np.searchsorted(acumulado, np.asarray(qs) * acumulado[-1], side='left')
+        return valores[orden][np.minimum(posiciones, len(valores) - 1)]
+
+_CUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+#forma de cada texto: letras -> 'A'/'a', dígitos -> '9' y cada racha se junta ('TXN-1366' -> 'A-9')
+def _patrones(textos:pd.Series) -> pd.Series:
+
+    # Sobre el tipo 'str' de pandas los reemplazos corren vectorizados (Arrow) y no valor a valor
+    formas = textos.astype("str").str.slice(0, 100)
+    for clase, simbolo in ((r"[a-z]+", "a"), (r"[A-Z]+", "A"), (r"[0-9]+", "9"), (r"\s+", " ")):
+        formas = formas.str.replace(clase, simbolo, regex=True)
+    return formas
+
+#valor de numpy/pandas -> tipo de JSON
+def _json(valor):
+
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    if isinstance(valor, np.generic):
+        return _json(valor.item())
+    if isinstance(valor, (int, float, str, bool)):
+        return valor
+    return str(valor)
+
+class _PerfilColumna:
+    """
+    Acumula el perfil de una columna lote a lote. Cada lote se factoriza una
+    sola vez: los conteos salen de los códigos y todo lo demás (distintos,
+    mínimo, máximo, patrones, longitudes) se calcula sobre los valores únicos.
+    """
+
+    def __init__(self, top:int =10, precision:int =14):
+        self.top = top
+        self.filas = 0
+        self.nulos = 0
+        self.tipo = self.dtype = None
+        self.exacto32 = True
+        self.minimo = self.maximo = None
+        self.largo = [None, None]
+        self.hll = HyperLogLog(precision)
+        self.kll = None
+        self.frecuentes = {}
+        self.patrones = {}
+
+    def Agregar(self, serie:pd.Series):
+
+        self.tipo = self.tipo or str(serie.dtype)
+        self.dtype = self.dtype if self.dtype is not None else serie.dtype
+        self.filas += len(serie)
+        codigos, unicos = pd.factorize(serie)
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+        self.nulos += int(np.count_nonzero(codigos < 0))
+
+        if len(unicos) == 0:
+            return
+
+        unicos = pd.Series(unicos)
+        self.hll.Agregar(pd.util.hash_pandas_object(unicos, index=False).to_numpy())
+        tipo = serie.dtype
+
+        if tipo.kind in 'iufmM' and not isinstance(tipo, pd.CategoricalDtype):
+            bajo, alto = unicos.min(), unicos.max()
+            self.minimo = bajo if self.minimo is None else min(self.minimo, bajo)
+            self.maximo = alto if self.maximo is None else max(self.maximo, alto)
+
+            if tipo.kind == 'f' and tipo.itemsize > 4 and self.exacto32:
+                # ¿Cada valor distinto vuelve idéntico de float32? (lo que pide Compact)
+                ida = unicos.astype(_en_backend(tipo, 'float32')).astype(tipo)
+                self.exacto32 = bool((ida == unicos).all())
+
+            if tipo.kind in 'iuf':
+                # Los cuantiles sí necesitan cada fila (el peso de cada valor)
+                self.kll = self.kll or KLL(k=1000)
+                self.kll.Agregar(serie.to_numpy(dtype=np.float64, na_value=np.nan))
+        elif tipo.kind != 'b':
+            textos = unicos.astype(str)
+            largos = textos.str.len()
+            self.largo[0] = int(largos.min()) if self.largo[0] is None else min(self.largo[0], int(largos.min()))
+            self.largo[1] = int(largos.max()) if self.largo[1] is None else max(self.largo[1], int(largos.max()))
+
+            formas = pd.Series(conteos).groupby(_patrones(textos).to_numpy()).sum()
+            for forma, cuenta in formas.items():
+                self.patrones[forma] = self.patrones.get(forma, 0) + int(cuenta)
+
+        # Top-k: se guardan 10*k candidatos (exacto si todo cabe en un lote)
+        mejores = np.argsort(-conteos, kind='stable')[:self.top * 10]
+        for i in mejores:
+            clave = _json(unicos.iloc[i])
+            self.frecuentes[clave] = self.frecuentes.get(clave, 0) + int(conteos[i])
+        if len(self.frecuentes) > self.top * 10:
+            self.frecuentes = dict(sorted(self.frecuentes.items(), key=lambda x: -x[1])[:self.top * 10])
+
+    #tipo al que Compact reduciría la columna, deducido de lo ya acumulado (None si no se gana nada)
+    def Sugerido(self, umbral:float =0.5):
+
+        tipo = self.dtype
+        if tipo is None or isinstance(tipo, pd.CategoricalDtype) or self.nulos == self.filas:
+            return None
+        if tipo.kind in 'iu':
+            return _entero_compacto(tipo, self.minimo, self.maximo)
+        if tipo.kind == 'f':
+            return _en_backend(tipo, 'float32') if tipo.itemsize > 4 and self.exacto32 else None
+        if tipo.kind in 'OU' and self.hll.Estimar() <= umbral * self.filas:
+            return 'category'
+        return None
+
+    def Resultado(self) -> dict:
+
+        resultado = {
+            "tipo": self.tipo,
+            "filas": self.filas,
+            "nulos": self.nulos,
+            "nulos_pct": round(100 * self.nulos / self.filas, 3) if self.filas else 0.0,
+            "distintos_aprox": min(self.hll.Estimar(), self.filas - self.nulos),
+            "min": _json(self.minimo),
+            "max": _json(self.maximo),
+            "top": [[v, c] for v, c in sorted(self.frecuentes.items(), key=lambda x: -x[1])[:self.top]],
+            "sugerido": _json(self.Sugerido()),
+        }
+
+        if self.kll is not None:
+            valores = self.kll.Cuantiles(_CUANTILES)
+            resultado["cuantiles"] = {f"p{int(q * 100):02d}": _json(v) for q, v in zip(_CUANTILES, valores)}
+
+        if self.patrones:
+            resultado["longitud"] = {"min": self.largo[0], "max": self.largo[1]}
+            resultado["patrones"] = [[p, c] for p, c in sorted(self.patrones.items(), key=lambda x: -x[1])[:self.top]]
+
+        return resultado
+
+#-------------------------Valores atípicos---------------------------
+
+# Factor por defecto de cada método: iqr -> Q1/Q3 -+ 1.5*IQR, zscore -> media -+ 3 desv, mad -> z robusto de 3.5
+_ATIPICOS = {'iqr': 1.5, 'zscore': 3.0, 'mad': 3.5}
+
+# Escala que vuelve la MAD comparable con la desviación estándar (distribución normal)
+_MAD_NORMAL = 0.6745
+
+class _Momentos:
+    """Conteo, media y suma de cuadrados acumulados lote a lote (fórmula de Chan)."""
+
+    def __init__(self):
+        self.n, self.media, self.m2 = 0, 0.0, 0.0
+
+    def Agregar(self, valores:np.ndarray):
+
+        valores = valores[~np.isnan(valores)]
+        if len(valores) == 0:
+            return
+
+        n, media = len(valores), valores.mean()
+        delta, total = media - self.media, self.n + n
+        self.m2 += ((valores - media) ** 2).sum() + delta ** 2 * self.n * n / total
+        self.media += delta * n / total
+        self.n = total
+
+    def Desviacion(self) -> float:
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+#tabla de límites: columnas ('inferior'|'superior', columna) y una fila por grupo ('*' si no hay grupo)
+def _tabla_limites(inferior:pd.DataFrame, superior:pd.DataFrame) -> pd.DataFrame:
+    return pd.concat({'inferior': inferior, 'superior': superior}, axis=1)
+
+#posición de la fila de límites de cada registro (-1 si su grupo no tiene límites)
+def _posiciones(df:pd.DataFrame, limites:pd.DataFrame) -> Optional[np.ndarray]:
+    grupo = limites.index.name
+    return None if grupo is None else limites.index.get_indexer(df[grupo])
+
+#valores de una columna de la tabla repartidos por fila (NaN donde no hay límite)
+def _por_fila(valores:np.ndarray, posiciones:Optional[np.ndarray]):
+    return valores[0] if posiciones is None else np.append(valores, np.nan)[posiciones]
+
+#límites exactos sobre un DataFrame en memoria: cada estadístico se calcula para todas las columnas a la vez
+def _limites(df:pd.DataFrame, columnas:list, metodo:str ='iqr', factor:Optional[float] =None,
+             grupo:Optional[str] =None) -> pd.DataFrame:
+
+    if metodo not in _ATIPICOS:
+        raise ValueError(f"Método '{metodo}' no soportado. Usa: {list(_ATIPICOS)}")
+    factor = _ATIPICOS[metodo] if factor is None else factor
+
+    datos = df[columnas]
+    agrupado = None if grupo is None else datos.groupby(df[grupo], observed=True, sort=False)
+
+    def estadistico(funcion) -> pd.DataFrame:
+        if agrupado is None:
+            return funcion(datos).to_frame('*').T
+        return funcion(agrupado).rename_axis(grupo)
+
+    match metodo:
+
+        case 'iqr':
+            # Un solo quantile([.25, .75]) para todas las columnas (y grupos)
+            if agrupado is None:
+                cuartiles = datos.quantile([0.25, 0.75])
+                q1, q3 = cuartiles.iloc[[0]].set_axis(['*']), cuartiles.iloc[[1]].set_axis(['*'])
+            else:
+                cuartiles = agrupado.quantile([0.25, 0.75])
+                q1 = cuartiles.xs(0.25, level=-1).rename_axis(grupo)
+                q3 = cuartiles.xs(0.75, level=-1).rename_axis(grupo)
+            rango = q3 - q1
+            return _tabla_limites(q1 - factor * rango, q3 + factor * rango)
+
+        case 'zscore':
+            media, desviacion = estadistico(lambda d: d.mean()), estadistico(lambda d: d.std())
+            return _tabla_limites(media - factor * desviacion, media + factor * desviacion)
+
+        case 'mad':
+            mediana = estadistico(lambda d: d.median())
+            posiciones = None if grupo is None else mediana.index.get_indexer(df[grupo])
+            centro = np.vstack([mediana.to_numpy(dtype=np.float64), np.full((1, len(columnas)), np.nan)])
+            centro = centro[0] if posiciones is None else centro[posiciones]
+            desvios = (datos - centro).abs()
+            mad = (desvios.median().to_frame('*').T if grupo is None
+                   else desvios.groupby(df[grupo], observed=True, sort=False).median().rename_axis(grupo))
+            mad = mad.reindex(mediana.index) * factor / _MAD_NORMAL
+            return _tabla_limites(mediana - mad, mediana + mad)
+
+#límites aproximados recorriendo lotes una sola vez (KLL para cuantiles, momentos para z-score)
+def _limites_lotes(lotes, columnas:Optional[list], metodo:str ='iqr', factor:Optional[float] =None,
+                   grupo:Optional[str] =None) -> pd.DataFrame:
+
+    if metodo not in _ATIPICOS:
+        raise ValueError(f"Método '{metodo}' no soportado. Usa: {list(_ATIPICOS)}")
+    factor = _ATIPICOS[metodo] if factor is None else factor
+
+    # Con grupos hay un sketch por grupo y columna, así que se usa uno más chico
+    k = 1000 if grupo is None else 200
+    bocetos = {}
+
+    for lote in lotes:
+
+        if columnas is None:
+            columnas = [c for c in lote.select_dtypes('number').columns if c != grupo]
+        partes = [('*', lote)] if grupo is None else lote.groupby(grupo, observed=True, sort=False)
+
+        for clave, parte in partes:
+            for columna in columnas:
+                valores = pd.to_numeric(parte[columna], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                if (clave, columna) not in bocetos:
+                    bocetos[(clave, columna)] = _Momentos() if metodo == 'zscore' else KLL(k=k)
+                bocetos[(clave, columna)].Agregar(valores)
+
+    claves = list(dict.fromkeys(clave for clave, _ in bocetos))
+    inferior = pd.DataFrame(np.nan, index=pd.Index(claves, name=grupo), columns=columnas or [])
+    superior = inferior.copy()
+
+    for (clave, columna), boceto in bocetos.items():
+        match metodo:
+            case 'iqr':
+                q1, q3 = boceto.Cuantiles([0.25, 0.75])
+                bajo, alto = q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+            case 'zscore':
+                bajo = boceto.media - factor * boceto.Desviacion()
+                alto = boceto.media + factor * boceto.Desviacion()
+            case 'mad':
+                mediana = boceto.Cuantiles([0.5])[0]
+                mad = boceto.Desviacion(mediana) * factor / _MAD_NORMAL
+                bajo, alto = mediana - mad, mediana + mad
+        inferior.loc[clave, columna], superior.loc[clave, columna] = bajo, alto
+
+    return _tabla_limites(inferior, superior)
+
+#máscara de filas con algún valor fuera de sus límites (NaN y grupos sin límites se conservan)
+def _fuera(df:pd.DataFrame, columnas:list, limites:pd.DataFrame) -> np.ndarray:
+
+    posiciones = _posiciones(df, limites)
+    fuera = np.zeros(len(df), dtype=bool)
+
+    for columna in columnas:
+        valores = df[columna].to_numpy(dtype=np.float64, na_value=np.nan)
+        bajo = _por_fila(limites[('inferior', columna)].to_numpy(dtype=np.float64), posiciones)
+        alto = _por_fila(limites[('superior', columna)].to_numpy(dtype=np.float64), posiciones)
+        fuera |= (valores < bajo) | (valores > alto)
+
+    return fuera
+
+#-------------------------Duplicados e IDs---------------------------
+
+class ConjuntoHashes:
+    """
+    Conjunto de hashes uint64: ocupa 8 bytes por clave, nunca filas completas.
+    Se guarda como corridas ordenadas; cada lote agrega una y dos corridas de
+    tamaño parecido se fusionan, así cada hash se copia pocas veces. Con
+    'carpeta' cada corrida se escribe también como .npy y el conjunto sigue
+    vigente entre lotes, archivos y ejecuciones.
+    """
+
+    def __init__(self, carpeta:Optional[str] =None):
+        self.carpeta = carpeta
+        self.corridas = []  # (ruta o None, arreglo ordenado)
+        self._contador = 0
+
+        if carpeta is not None:
+            os.makedirs(carpeta, exist_ok=True)
+            for ruta in sorted(glob.glob(os.path.join(carpeta, "corrida_*.npy"))):
+                self.corridas.append((ruta, np.load(ruta)))
+                self._contador = max(self._contador, int(os.path.basename(ruta)[8:-4]) + 1)
+            # La más grande primero, como quedan al fusionar
+            self.corridas.sort(key=lambda corrida: -len(corrida[1]))
+
+    def __len__(self) -> int:
+        return sum(len(arreglo) for _, arreglo in self.corridas)
+
+    #True donde el hash ya está en el conjunto
+    def Contiene(self, hashes:np.ndarray) -> np.ndarray:
+
+        esta = np.zeros(len(hashes), dtype=bool)
+        for _, corrida in self.corridas:
+            posiciones = np.minimum(np.searchsorted(corrida, hashes), len(corrida) - 1)
+            esta |= corrida[posiciones] == hashes
+        return esta
+
+    #True en la primera aparición de cada hash que no estaba (y lo agrega al conjunto)
+    def Nuevos(self, hashes:np.ndarray) -> np.ndarray:
+
+        unicos, primeros = np.unique(hashes, return_index=True)
+        nuevos = ~self.Contiene(unicos)
+        mascara = np.zeros(len(hashes), dtype=bool)
+        mascara[primeros[nuevos]] = True
+
+        if nuevos.any():
+            self._Agregar(unicos[nuevos])
+        return mascara
+
+    def _Agregar(self, ordenados:np.ndarray):
+
+        self.corridas.append((self._Escribir(ordenados), ordenados))
+
+        while len(self.corridas) > 1 and len(self.corridas[-2][1]) <= 2 * len(self.corridas[-1][1]):
+            (ruta_b, b), (ruta_a, a) = self.corridas.pop(), self.corridas.pop()
+            # Si se corta aquí solo quedan hashes repetidos en dos corridas (no se pierde nada)
+            fusion = np.sort(np.concatenate([a, b]), kind='stable')
+            self.corridas.append((self._Escribir(fusion), fusion))
+            for ruta in (ruta_a, ruta_b):
+                if ruta is not None:
+                    os.remove(ruta)
+
+    def _Escribir(self, arreglo:np.ndarray) -> Optional[str]:
+
+        if self.carpeta is None:
+            return None
+
+        ruta = os.path.join(self.carpeta, f"corrida_{self._contador:08d}.npy")
+        self._contador += 1
+        with open(ruta + ".tmp", "wb") as archivo:
+            np.save(archivo, arreglo)
+        os.replace(ruta + ".tmp", ruta)
+        return ruta
+
+#hash de una columna numérica: los enteros se hashean tal cual y los float enteros (5.0) igual que 5
+def _hash_numerico(serie:pd.Series) -> np.ndarray:
+
+    nulos = serie.isna().to_numpy()
+
+    if serie.dtype.kind in 'iu':
+        # Sin pasar por float: IDs por encima de 2^53 perderían precisión y chocarían
+        hashes = pd.util.hash_array(serie.to_numpy(dtype=np.dtype(f"{serie.dtype.kind}8"), na_value=0))
+    else:
+        # Un lote con nulos lee la columna entera como float: 5.0 debe dar lo mismo que 5
+        valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        hashes = pd.util.hash_array(valores)
+        enteros = np.isfinite(valores) & (valores == np.trunc(valores)) & (np.abs(valores) < 2.0 ** 63)
+        hashes[enteros] = pd.util.hash_array(valores[enteros].astype(np.int64))
+
+    hashes[nulos] = pd.util.hash_array(np.array([np.nan]))[0]
+    return hashes
+
+#hash uint64 de cada fila tomando solo las columnas clave
+def _hash_filas(df:pd.DataFrame, claves:list) -> np.ndarray:
+
+    total = np.zeros(len(df), dtype=np.uint64)
+
+    for columna in claves:
+        serie = df[columna]
+        if serie.dtype.kind in 'iuf' and not isinstance(serie.dtype, pd.CategoricalDtype):
+            parcial = _hash_numerico(serie)
+        else:
+            parcial = pd.util.hash_pandas_object(serie, index=False).to_numpy()
+        total = (total * np.uint64(0x100000001B3)) ^ parcial
+
+    return total
+
+# 'TXN-1366', 'txn 1366', 'A#07', '1366' -> prefijo (letras) y número
+_PATRON_ID = r"^\s*([A-Za-z]*)[\s\-_#:/.]*(\d+)\s*$"
+
+#separa cada ID en prefijo (categoría en mayúsculas) y número (entero compacto); se trabaja sobre los distintos
+def _separar_id(serie:pd.Series) -> tuple:
+
+    codigos, unicos = pd.factorize(serie)
+    textos = pd.Series(unicos, dtype=object).astype(str).str.replace(r"\.0+$", "", regex=True)
+    partes = textos.str.extract(_PATRON_ID)
+
+    # El nulo va al final: el código -1 de factorize apunta a él
+    prefijos, categorias = pd.factorize(partes[0].str.upper().replace("", np.nan))
+    prefijo = pd.Series(pd.Categorical.from_codes(np.append(prefijos, -1)[codigos], categories=categorias),
+                        index=serie.index)
+
+    numeros = pd.to_numeric(partes[1], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    numero = pd.Series(np.append(numeros, np.nan)[codigos], index=serie.index)
+    numero = numero.astype('Int64' if numero.isna().any() else 'int64')
+    compacto = _tipo_compacto(numero)
+
+    return prefijo, (numero if compacto is None else numero.astype(compacto))
+
+#-------------------------Coincidencias difusas---------------------------
+# Solo se comparan pares candidatos: vecinos dentro del mismo bloque fonético
+# y vecinos al ordenar el texto (derecho y al revés). Cada par se mide con
+# Levenshtein vectorizado y los pares parecidos se unen en grupos (union-find).
+
+# Clave fonética en español: 'Maria', 'Mariaa', 'María' -> 'mr'; 'Elena' -> 'eln'
+# (las letras dobles se juntan una por una: el motor de Arrow no admite referencias '\1' en el patrón)
+_FONETICA = ((r"[^a-z ]", ""), (r"qu", "k"), (r"c([ei])", r"s\1"), (r"[cq]", "k"), (r"z", "s"),
+             (r"v", "b"), (r"ll", "y"), (r"h", ""),
+             *((f"{letra}{letra}+", letra) for letra in "bdfgjklmnprstxy"), (r"\B[aeiouy]+", ""))
+
+#clave fonética de cada texto en minúsculas (los acentos se quitan aquí: 'josé' -> 'js', 'ñandú' -> 'nnd')
+def _fonetica(textos:pd.Series) -> pd.Series:
+    claves = textos.str.normalize('NFKD').str.replace("[\u0300-\u036f]", "", regex=True)
+    for patron, reemplazo in _FONETICA:
+        claves = claves.str.replace(patron, reemplazo, regex=True)
+    return claves
+
+#pares (i, j) con i < j que quedan a menos de 'ventana' posiciones en 'orden' (y en el mismo bloque)
+def _vecinos(orden:np.ndarray, ventana:int, bloques:Optional[np.ndarray] =None) -> list:
+
+    pares = []
+    for salto in range(1, ventana + 1):
+        a, b = orden[:-salto], orden[salto:]
+        if bloques is not None:
+            mismo = bloques[a] == bloques[b]
+            a, b = a[mismo], b[mismo]
+        pares.append(np.stack([np.minimum(a, b), np.maximum(a, b)]))
+    return pares
+
+#textos -> matriz de códigos Unicode (una fila por texto, rellenada con 0) y largo de cada uno
+def _codigos(textos) -> tuple:
+    largos = np.fromiter(map(len, textos), dtype=np.int32, count=len(textos))
+    ancho = max(int(largos.max(initial=0)), 1)
+    relleno = "".join(t.ljust(ancho, "\0") for t in textos)
+    return np.frombuffer(relleno.encode("utf-32-le"), dtype=np.uint32).reshape(len(textos), ancho), largos
+
+#cuántas veces aparece cada letra en cada texto (32 casillas: código Unicode % 32), sin matriz de relleno
+def _bolsas(textos, largos:np.ndarray) -> np.ndarray:
+    letras = np.frombuffer("".join(textos).encode("utf-32-le"), dtype=np.uint32)
+    indices = np.repeat(np.arange(len(largos)), largos) * 32 + letras % 32
+    return np.bincount(indices, minlength=len(largos) * 32).reshape(len(largos), 32).astype(np.int16)
+
+#distancia de edición (Levenshtein + transposición de letras vecinas) de muchos pares a la vez
+def _levenshtein(A:np.ndarray, la:np.ndarray, B:np.ndarray, lb:np.ndarray) -> np.ndarray:
+
+    distancia = np.where(la == 0, lb, 0).astype(np.int16)
+    if len(la) == 0 or la.max() == 0:
+        return distancia
+
+    # Solo las columnas que usa el texto más largo del lote
+    A, B = A[:, :int(la.max())], B[:, :max(int(lb.max()), 1)]
+    rango = np.arange(B.shape[1] + 1, dtype=np.int16)
+    anterior = np.broadcast_to(rango, (len(la), len(rango))).copy()
+    previa = None
+
+    for i in range(1, A.shape[1] + 1):
+        # Sustitución o borrado desde la fila anterior; la inserción (izquierda) sale con un mínimo acumulado
+        actual = np.empty_like(anterior)
+        actual[:, 0] = i
+        np.minimum(anterior[:, 1:] + 1, anterior[:, :-1] + (A[:, i - 1:i] != B), out=actual[:, 1:])
+        if previa is not None:
+            # 'ab' -> 'ba' cuesta 1
+            cruce = (A[:, i - 1:i] == B[:, :-1]) & (A[:, i - 2:i - 1] == B[:, 1:])
+            np.minimum(actual[:, 2:], np.where(cruce, previa[:, :-2] + 1, actual[:, 2:]), out=actual[:, 2:])
+        actual = np.minimum.accumulate(actual - rango, axis=1) + rango
+        fin = la == i
+        distancia[fin] = actual[fin, lb[fin]]
+        previa, anterior = anterior, actual
+
+    return distancia
+
+#componentes conexas de un grafo (union-find vectorizado): etiqueta = menor nodo del grupo
+def _componentes(n:int, i:np.ndarray, j:np.ndarray) -> np.ndarray:
+
+    etiquetas = np.arange(n)
+    while len(i):
+        raiz_i, raiz_j = etiquetas[i], etiquetas[j]
+        if (raiz_i == raiz_j).all():
+            break
+        menor = np.minimum(raiz_i, raiz_j)
+        np.minimum.at(etiquetas, raiz_i, menor)
+        np.minimum.at(etiquetas, raiz_j, menor)
+        # Cada nodo apunta directo a su raíz
+        while True:
+            saltos = etiquetas[etiquetas]
+            if (saltos == etiquetas).all():
+                break
+            etiquetas = saltos
+
+    return etiquetas
+
+# Largo máximo de un texto "corto" para Fuzzy
+_FUZZY_CORTO = 5
+
+# Textos más largos no se comparan (no son nombres y su matriz de Levenshtein no cabe en memoria)
+_FUZZY_LARGO = 255
+
+# Celdas de las matrices de códigos de cada tanda de pares (filas x largo del texto más largo)
+_FUZZY_CELDAS = 1 << 24
+
+#agrupa los valores distintos parecidos: devuelve el grupo de cada valor y cuántos pares se midieron
+def _agrupar_textos(textos:pd.Series, similitud:float =0.8, ventana:int =8, lote:int =200_000) -> tuple:
+
+    n = len(textos)
+    if n < 2:
+        return np.arange(n), 0
+
+    minusculas = textos.str.lower()
+    bloques = pd.factorize(_fonetica(minusculas))[0]
+    orden_texto = np.argsort(minusculas.to_numpy(), kind='stable')
+    orden_reves = np.argsort(minusculas.str[::-1].to_numpy(), kind='stable')
+    orden_bloque = np.lexsort((minusculas.to_numpy(), bloques))
+
+    pares = (_vecinos(orden_bloque, ventana, bloques) + _vecinos(orden_texto, ventana)
+             + _vecinos(orden_reves, ventana))
+    # Cada par (i, j) como un solo entero para quitar repetidos rápido
+    pares = np.sort(np.concatenate([i * n + j for i, j in pares]))
+    pares = pares[np.r_[True, pares[1:] != pares[:-1]]]
+    pares = np.stack([pares // n, pares % n])
+
+    # Filtro barato por largo: si la diferencia de largos ya supera la tolerancia no hace falta medir
+    # (1 - distancia / largo >= similitud  <=>  distancia <= (1 - similitud) * largo)
+    lista = np.asarray(minusculas.tolist(), dtype=object)
+    largos = np.fromiter(map(len, lista), dtype=np.int32, count=n)
+    la, lb = largos[pares[0]], largos[pares[1]]
+    tolerancia = np.floor((1 - similitud) * np.maximum(la, lb) + 1e-9)
+    posibles = (np.abs(la - lb) <= tolerancia) & (np.maximum(la, lb) <= _FUZZY_LARGO)
+    pares, tolerancia = pares[:, posibles], tolerancia[posibles]
+
+    # En textos cortos una letra ya es otro nombre ('Maria' / 'Marta'): además deben sonar igual
+    cortos = np.maximum(largos[pares[0]], largos[pares[1]]) <= _FUZZY_CORTO
+    suenan = bloques[pares[0]] == bloques[pares[1]]
+    pares, tolerancia = pares[:, ~cortos | suenan], tolerancia[~cortos | suenan]
+
+    # Cota inferior por letras: cada edición arregla a lo sumo una letra de más y una de menos
+    bolsas = _bolsas(lista, largos)
+    cota = np.empty(pares.shape[1], dtype=np.int32)
+    for inicio in range(0, pares.shape[1], lote):
+        diferencia = bolsas[pares[0, inicio:inicio + lote]] - bolsas[pares[1, inicio:inicio + lote]]
+        cota[inicio:inicio + lote] = np.maximum(np.clip(diferencia, 0, None).sum(axis=1),
+                                                np.clip(-diferencia, 0, None).sum(axis=1))
+    pares, tolerancia = pares[:, cota <= tolerancia], tolerancia[cota <= tolerancia]
+
+    # Pares de largo parecido juntos: menos relleno en cada matriz
+    maximos = np.maximum(largos[pares[0]], largos[pares[1]])
+    orden = np.argsort(maximos, kind='stable')
+    pares, tolerancia, maximos = pares[:, orden], tolerancia[orden], maximos[orden]
+    unidos = np.zeros(pares.shape[1], dtype=bool)
+    inicio = 0
+
+    while inicio < pares.shape[1]:
+        # Los códigos se arman por tanda; con textos largos la tanda se achica para no pasar de _FUZZY_CELDAS
+        ancho = max(int(maximos[min(inicio + lote, pares.shape[1]) - 1]), 1)
+        fin = inicio + max(1, min(lote, _FUZZY_CELDAS // ancho))
+        i, j = pares[0, inicio:fin], pares[1, inicio:fin]
+        (A, la), (B, lb) = _codigos(lista[i]), _codigos(lista[j])
+        unidos[inicio:fin] = _levenshtein(A, la, B, lb) <= tolerancia[inicio:fin]
+        inicio = fin
+
+    return _componentes(n, pares[0, unidos], pares[1, unidos]), pares.shape[1]
+
+#-------------------------Lectura de archivos---------------------------
+
+#lee un archivo completo segun su extension (si se pasan columnas, solo lee esas)
+def _leer(file:str, columnas:Optional[set] =None, cache:bool =True, backend:str ='numpy') -> pd.DataFrame:
+
+    # Extraemos la extensión (ej: '.parquet', '.csv')
+    _, extension = os.path.splitext(file)
+    extension = extension.lower()
+    usar = None if columnas is None else (lambda c: c in columnas)
+    arrow = backend == 'pyarrow'
+
+    match extension:
+
+        case '.csv':
+            if arrow:
+                # El lector de Arrow (multihilo) no acepta funciones en usecols: le pasamos la lista
+                if columnas is not None:
+                    usar = [c for c in pd.read_csv(file, nrows=0).columns if c in columnas]
+                return pd.read_csv(file, usecols=usar, engine='pyarrow', dtype_backend='pyarrow')
+            return pd.read_csv(file, usecols=usar)
+
+        case '.parquet':
+            opciones = {'dtype_backend': 'pyarrow', 'memory_map': True} if arrow else {}
+            if columnas is not None:
+                import pyarrow.parquet as pq
+                nombres = pq.read_schema(file).names
+                return pd.read_parquet(file, columns=[c for c in nombres if c in columnas], **opciones)
+            return pd.read_parquet(file, **opciones)
+
+        case '.json' | '.xlsx' | '.xls':
+            # Los lectores más lentos: se convierten una vez a Feather y luego se lee la copia
+            if cache:
+                return _leer_columnar(file, columnas, backend)
+            return _leer_lento(file, columnas, backend)
+
+        case _:
+            raise ValueError(f"Formato {extension} no soportado")
+
+#lectura directa de JSON y Excel
+def _leer_lento(file:str, columnas:Optional[set] =None, backend:str ='numpy') -> pd.DataFrame:
+
+    opciones = {'dtype_backend': 'pyarrow'} if backend == 'pyarrow' else {}
+
+    if file.lower().endswith('.json'):
+        df = pd.read_json(file, **opciones)
+        return df if columnas is None else df[[c for c in df.columns if c in columnas]]
+
+    return pd.read_excel(file, usecols=None if columnas is None else (lambda c: c in columnas), **opciones)
+
+#convierte una tabla de Arrow a pandas devolviendo las columnas 'object' a su tipo original
+def _a_pandas(tabla, backend:str ='numpy') -> pd.DataFrame:
+
+    if backend == 'pyarrow':
+        # Las columnas siguen siendo arreglos de Arrow (sin copia a NumPy)
+        return tabla.to_pandas(types_mapper=pd.ArrowDtype)
+
+    df = tabla.to_pandas()
+
+    # Arrow no distingue 'object' de 'str': lo que era object vuelve a object
+    for columna in (tabla.schema.pandas_metadata or {}).get('columns', []):
+        if columna.get('numpy_type') == 'object' and columna.get('name') in df.columns:
+            df[columna['name']] = df[columna['name']].astype(object)
+
+    return df
+
+#lee JSON/Excel desde una copia Feather junto al archivo (.datatoolbox/), creándola si no existe
+def _leer_columnar(file:str, columnas:Optional[set] =None, backend:str ='numpy') -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    carpeta = os.path.join(os.path.dirname(os.path.abspath(file)), ".datatoolbox")
+    base = os.path.basename(file)
+    info = os.stat(file)
+    # Clave: ruta + fecha de modificación + tamaño + hash del contenido
+    clave = f"{info.st_mtime_ns}_{info.st_size}_{_huella_archivo(file)[:16]}"
+    copia = os.path.join(carpeta, f"{base}.{clave}.feather")
+
+    try:
+        # Sin compresión y con memory_map: las columnas se leen directo del mapa de memoria
+        nombres = feather.read_table(copia, columns=[], memory_map=True).schema.names
+        elegidas = None if columnas is None else [c for c in nombres if c in columnas]
+        return _a_pandas(feather.read_table(copia, columns=elegidas, memory_map=True), backend)
+    except FileNotFoundError:
+        # Sin copia (o la borró otro proceso entre tanto): se lee el original
+        pass
+
+    df = _leer_lento(file, None, backend)
+
+    try:
+        os.makedirs(carpeta, exist_ok=True)
+        # Las copias de versiones anteriores del mismo archivo ya no sirven (solo las de otra clave:
+        # la de esta versión pudo escribirla otro proceso hace un momento)
+        patron = re.compile(re.escape(base) + r"\.(\d+_\d+_[0-9a-f]{16})\.feather")
+        for vieja in glob.glob(os.path.join(carpeta, f"{glob.escape(base)}.*.feather")):
+            encontrada = patron.fullmatch(os.path.basename(vieja))
+            if encontrada and encontrada.group(1) != clave:
+                try:
+                    os.remove(vieja)
+                except FileNotFoundError:
+                    pass
+        # Se escribe con otro nombre y se renombra, así otro hilo nunca lee una copia a medias
+        temporal = f"{copia}.{os.getpid()}.{threading.get_ident()}.tmp"
+        feather.write_feather(pa.Table.from_pandas(df), temporal, compression='uncompressed')
+        os.replace(temporal, copia)
+
+    except Exception as e:
+        # Columnas con tipos mezclados (ej: números y textos en Excel) no pasan a Arrow: sin copia
+        print(f"⚠️ No se pudo crear la copia columnar de '{file}': {e}")
+
+    return df if columnas is None else df[[c for c in df.columns if c in columnas]]
+
+#hash del contenido de una versión de un archivo; (ruta, mtime_ns, tamaño) -> hash, con tope de entradas
+@functools.lru_cache(maxsize=256)
+def _huella_version(ruta:str, mtime_ns:int, tamano:int) -> str:
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+#hash del contenido de un archivo (se recalcula solo si cambia su fecha de modificación o tamaño)
+def _huella_archivo(ruta:str) -> str:
+
+    info = os.stat(ruta)
+    return _huella_version(os.path.abspath(ruta), info.st_mtime_ns, info.st_size)
+
+#lectura que no lanza errores (para los pools de MergePlus): devuelve (df, error)
+def _leer_seguro(file:str, backend:str ='numpy'):
+    try:
+        return _leer(file, backend=backend), None
+    except Exception as e:
+        return None, e
+
+#clase de pool para CleanBatch/MergePlus: con spawn (Windows, macOS) cada proceso vuelve a importar el
+#script principal, y sin 'if __name__ == "__main__":' el hijo crearía otro pool (recursión): ahí se usan hilos
+def _pool(procesos:bool):
+
+    # Al reimportar el script el hijo ya tiene su nombre ('SpawnProcess-1'), aunque aún no sepa quién es su padre
+    if procesos and multiprocessing.current_process().name != 'MainProcess':
+        print("⚠️ Pool de procesos pedido dentro de un proceso hijo (¿falta 'if __name__ == \"__main__\":' "
+              "en el script?). Se usarán hilos.")
+        return ThreadPoolExecutor
+
+    return ProcessPoolExecutor if procesos else ThreadPoolExecutor
+
+#ejecuta un kernel sobre una columna (función de módulo para poder enviarla a otro proceso)
+def _kernel(serie:pd.Series, funcion, por_categoria:bool, kw:dict) -> pd.Series:
+
+    if not por_categoria:
+        return funcion(serie, **kw)
+
+    # Los textos siguen siendo Categorical; los números vuelven a su tipo numérico
+    return _por_categorias(serie, funcion, categorica=funcion in (_texto, _extraer), **kw)
+
+#-------------------------Motores SQL (registro compartido)---------------------------
+
+# Tamaño del pool por defecto: conexiones fijas, extra bajo demanda, espera máxima y reciclaje (s)
+_POOL = {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30, 'pool_recycle': 1800}
+
+class PoolMedido(QueuePool):
+    """
+    QueuePool que cuenta cuántas conexiones se piden y cuánto se espera por ellas.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = {'checkouts': 0, 'espera_total_s': 0.0, 'espera_max_s': 0.0, 'timeouts': 0}
+        self._candado = threading.Lock()
+
+    def _do_get(self):
+
+        inicio = time.perf_counter()
+        agotado = False
+
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            agotado = True
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._candado:
+                self.metricas['checkouts'] += 1
+                self.metricas['espera_total_s'] += espera
+                self.metricas['espera_max_s'] = max(self.metricas['espera_max_s'], espera)
+                self.metricas['timeouts'] += agotado
+
+# Un motor (y su pool) por URL y opciones, compartido por todas las instancias e hilos del proceso
+_MOTORES = {}
+_MOTORES_LOCK = threading.Lock()
+
+#clave de _MOTORES: URL sin contraseña + huella de la URL completa (otra contraseña, otro pool) + opciones
+def _clave_motor(ruta:str, opciones:dict) -> tuple:
+
+    oculta = make_url(ruta).render_as_string(hide_password=True)
+    huella = hashlib.blake2b(ruta.encode(), digest_size=8).hexdigest()
+    return oculta, huella, json.dumps(opciones, sort_keys=True, default=repr)
+
+#devuelve (o crea) el motor de una URL
+def _motor(ruta:str, **opciones):
+
+    clave = _clave_motor(ruta, opciones)
+
+    with _MOTORES_LOCK:
+
+        if clave not in _MOTORES:
+
+            otras = [c[2] for c in _MOTORES if c[:2] == clave[:2]]
+            if otras:
+                print(f"⚠️ Ya hay un pool para '{clave[0]}' con otras opciones ({otras[0]}); "
+                      f"se crea uno aparte con {clave[2]}.")
+
+            if ruta.startswith("sqlite") and (ruta in ("sqlite://", "sqlite:///") or ":memory:" in ruta):
+                # SQLite en memoria vive en una sola conexión: se deja el pool propio de SQLAlchemy
+                motor = create_engine(ruta)
+            else:
+                ajustes = {**_POOL, **opciones}
+                motor = create_engine(ruta, poolclass=PoolMedido, pool_pre_ping=True, **ajustes)
+
+            # El SQLite local se ajusta para cargas masivas (ver '_pragmas_sqlite')
+            if motor.dialect.name == 'sqlite':
+                event.listen(motor, "connect", _pragmas_sqlite)
+
+            _MOTORES[clave] = motor
+
+        return _MOTORES[clave]
+
+#-------------------------Carga masiva SQL---------------------------
+
+# Máximo de parámetros por sentencia en INSERT de varias filas (SQL Server solo admite ~2100)
+_PARAMETROS_MAX = {'mssql': 2_000}
+
+#ajustes de SQLite para cargas grandes (se aplican a cada conexión nueva del motor local)
+def _pragmas_sqlite(conexion, _registro):
+
+    cursor = conexion.cursor()
+    # WAL + synchronous=NORMAL: un fsync por checkpoint y no por commit, sin riesgo de corrupción
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-200000")  # ~200 MB de caché de páginas
+    cursor.close()
+
+#inserta con COPY FROM STDIN (PostgreSQL); se pasa como 'method' a DataFrame.to_sql
+def _copy_postgres(tabla, con, columnas:list, filas) -> int:
+    import csv
+    import io
+
+    buffer = io.StringIO()
+    total = 0
+    escritor = csv.writer(buffer)
+    for fila in filas:
+        escritor.writerow(fila)
+        total += 1
+    buffer.seek(0)
+
+    quote = con.dialect.identifier_preparer.quote
+    nombre = f"{quote(tabla.schema)}.{quote(tabla.name)}" if tabla.schema else quote(tabla.name)
+    campos = ", ".join(quote(c) for c in columnas)
+    sql = f"COPY {nombre} ({campos}) FROM STDIN WITH (FORMAT csv)"
+
+    with con.connection.cursor() as cursor:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(sql, buffer)  # psycopg2
+        else:
+            with cursor.copy(sql) as copia:  # psycopg 3
+                copia.write(buffer.getvalue())
+
+    return total
+
+# Marcador de parámetro de cada driver DBAPI ('named' no se usa: necesita diccionarios por fila)
+_MARCADORES = {'qmark': '?', 'format': '%s', 'pyformat': '%s'}
+
+#inserta con executemany del driver (DBAPI) directo, sin el procesado fila a fila de SQLAlchemy
+def _executemany_dbapi(tabla, con, columnas:list, filas) -> int:
+
+    quote = con.dialect.identifier_preparer.quote
+    nombre = f"{quote(tabla.schema)}.{quote(tabla.name)}" if tabla.schema else quote(tabla.name)
+    campos = ", ".join(quote(c) for c in columnas)
+    marcas = ", ".join([_MARCADORES[con.dialect.paramstyle]] * len(columnas))
+    filas = list(filas)
+
+    # Los tipos que el dialecto convierte (ej: DateTime en SQLite -> '2026-01-01 00:00:00.000000')
+    # pasan por el mismo procesador que usa to_sql; las demás columnas van tal cual al driver
+    procesos = []
+    for k, columna in enumerate(columnas):
+        proceso = tabla.table.columns[columna].type.dialect_impl(con.dialect).bind_processor(con.dialect)
+        if proceso is not None:
+            procesos.append((k, proceso))
+
+    if procesos:
+        filas = [list(fila) for fila in filas]
+        for fila in filas:
+            for k, proceso in procesos:
+                fila[k] = proceso(fila[k])
+
+    cursor = con.connection.cursor()
+    try:
+        cursor.executemany(f"INSERT INTO {nombre} ({campos}) VALUES ({marcas})", filas)
+    finally:
+        cursor.close()
+
+    return len(filas)
+
+#elige cómo insertar cada lote según el motor: 'method' y 'chunksize' para to_sql
+def _metodo_sql(dialecto:str, paramstyle:str, metodo:str, columnas:int):
+
+    if metodo == 'auto':
+        # PostgreSQL -> COPY, el resto -> executemany del driver (una sola sentencia preparada por lote)
+        metodo = 'copy' if dialecto == 'postgresql' else 'executemany'
+
+    match metodo:
+        case 'copy':
+            if dialecto != 'postgresql':
+                raise ValueError("El método 'copy' solo está disponible en PostgreSQL")
+            return _copy_postgres, None
+        case 'executemany':
+            # Si el driver usa parámetros con nombre se deja el executemany de SQLAlchemy
+            return (_executemany_dbapi if paramstyle in _MARCADORES else None), None
+        case 'multi':
+            return 'multi', max(1, _PARAMETROS_MAX.get(dialecto, 30_000) // max(columnas, 1))
+        case _:
+            raise ValueError(f"Método '{metodo}' no soportado (auto, copy, executemany, multi)")
+
+#-------------------------Bitacora (auditoria)---------------------------
+
+class Bitacora:
+    """
+    Registro de operaciones en JSON lines escrito por un hilo en segundo plano.
+    Los registros entran a una cola acotada, se escriben por bloques y el fsync
+    se hace cada 'fsync_cada' registros o 'intervalo' segundos. El archivo rota
+    al superar 'max_bytes' (ruta.1, ruta.2 ... hasta 'respaldos'). Si el disco
+    falla se avisa una vez por stderr y los registros siguientes se descartan
+    (contados en 'perdidos') sin bloquear a quien escribe.
+    """
+
+    def __init__(self, ruta:str, max_bytes:int =10_000_000, respaldos:int =3, fsync_cada:int =500,
+                 intervalo:float =2.0, capacidad:int =10_000):
+
+        # La ruta se fija ahora: el hilo no debe depender del directorio actual cuando abra el archivo
+        self.ruta = os.path.abspath(ruta)
+        self.Configurar(max_bytes=max_bytes, respaldos=respaldos, fsync_cada=fsync_cada, intervalo=intervalo)
+        self.perdidos = 0
+        self._candado = threading.Lock()  # 'perdidos' lo suman quien escribe y el hilo escritor
+        self.error = None
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._hilo = threading.Thread(target=self._Escritor, name=f"bitacora:{self.ruta}", daemon=True)
+        self._hilo.start()
+
+    #cambia rotación y fsync (el hilo escritor las lee en cada bloque, aplican desde el siguiente)
+    def Configurar(self, max_bytes:int =10_000_000, respaldos:int =3, fsync_cada:int =500, intervalo:float =2.0):
+        self.max_bytes = max_bytes
+        self.respaldos = respaldos
+        self.fsync_cada = fsync_cada
+        self.intervalo = intervalo
+
+    #cuenta registros descartados
+    def _Perder(self, cuantos:int =1):
+        with self._candado:
+            self.perdidos += cuantos
+
+    #encola un registro (si la cola sigue llena tras un segundo se descarta y se cuenta)
+    def Escribir(self, registro:dict):
+
+        # Con el archivo deshabilitado no tiene sentido esperar a la cola
+        if self.error is not None:
+            self._Perder()
+            return
+
+        try:
+            self._cola.put(registro, timeout=1)
+        except queue.Full:
+            self._Perder()
+
+    #espera (como máximo 'timeout' segundos) a que todo lo encolado esté escrito en disco
+    def Vaciar(self, timeout:float =10.0) -> bool:
+
+        limite = time.monotonic() + timeout
+        with self._cola.all_tasks_done:
+            while self._cola.unfinished_tasks:
+                restante = limite - time.monotonic()
+                if restante <= 0 or not self._hilo.is_alive():
+                    return False
+                self._cola.all_tasks_done.wait(min(restante, 0.5))
+
+        return True
+
+    #termina el hilo escritor después de escribir lo pendiente
+    def Cerrar(self, timeout:float =10.0):
+        if self._hilo.is_alive():
+            try:
+                self._cola.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            self._hilo.join(timeout)
+
+    #pasa ruta -> ruta.1 -> ruta.2 ... y empieza un archivo nuevo
+    def _Rotar(self, archivo):
+
+        archivo.close()
+        for i in range(self.respaldos - 1, 0, -1):
+            if os.path.exists(f"{self.ruta}.{i}"):
+                os.replace(f"{self.ruta}.{i}", f"{self.ruta}.{i + 1}")
+        if self.respaldos > 0:
+            os.replace(self.ruta, f"{self.ruta}.1")
+
+        return open(self.ruta, "a", encoding="utf-8")
+
+    #abre el archivo de la bitácora (creando su carpeta si hace falta)
+    def _Abrir(self):
+
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+
+        return open(self.ruta, "a", encoding="utf-8")
+
+    #deshabilita el archivo tras un error de disco y avisa una sola vez
+    def _Fallo(self, archivo, error:Exception):
+
+        self.error = error
+        print(f"⚠️ Bitácora deshabilitada ({self.ruta}): {error}. Los registros siguientes se descartan.",
+              file=sys.stderr)
+        if archivo is not None:
+            try:
+                archivo.close()
+            except OSError:
+                pass
+
+    def _Escritor(self):
+
+        try:
+            archivo = self._Abrir()
+        except OSError as e:
+            archivo = None
+            self._Fallo(archivo, e)
+
+        sin_fsync, ultimo_fsync, activo = 0, time.monotonic(), True
+
+        while activo:
+            # Esperamos un registro y luego tomamos todos los que ya estén en cola (escritura por bloques)
+            bloque = [self._cola.get()]
+            while len(bloque) < 1000:
+                try:
+                    bloque.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            lineas = []
+            for registro in bloque:
+                if registro is None:
+                    activo = False
+                else:
+                    lineas.append(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+            try:
+                if self.error is not None:
+                    # Archivo deshabilitado: la cola se sigue vaciando para que nadie quede esperando
+                    self._Perder(len(lineas))
+                    continue
+
+                archivo.write("".join(lineas))
+                archivo.flush()
+                sin_fsync += len(lineas)
+
+                if not activo or sin_fsync >= self.fsync_cada or time.monotonic() - ultimo_fsync >= self.intervalo:
+                    os.fsync(archivo.fileno())
+                    sin_fsync, ultimo_fsync = 0, time.monotonic()
+
+                if archivo.tell() >= self.max_bytes:
+                    archivo = self._Rotar(archivo)
+
+            except (OSError, ValueError) as e:
+                # Disco lleno, permisos, archivo cerrado por una rotación fallida...
+                self._Perder(len(lineas))
+                self._Fallo(archivo, e)
+
+            finally:
+                for _ in bloque:
+                    self._cola.task_done()
+
+        if self.error is None:
+            archivo.close()
+
+# Una bitácora por archivo, compartida por todas las instancias del proceso
+_BITACORAS = {}
+_BITACORAS_LOCK = threading.Lock()
+
+#devuelve (o crea) la bitácora de una ruta; con opciones, una bitácora ya abierta se reconfigura
+def _bitacora(ruta:str, **opciones) -> Bitacora:
+
+    ruta = os.path.abspath(ruta)
+    with _BITACORAS_LOCK:
+        if ruta not in _BITACORAS:
+            _BITACORAS[ruta] = Bitacora(ruta, **opciones)
+        elif opciones:
+            _BITACORAS[ruta].Configurar(**opciones)
+        return _BITACORAS[ruta]
+
+#al salir del programa se escribe lo pendiente de todas las bitácoras
+@atexit.register
+def _cerrar_bitacoras():
+    for bitacora in list(_BITACORAS.values()):
+        bitacora.Cerrar()
+
+#permite que un metodo se registre en el plan en vez de ejecutarse (modo lazy)
+def _diferible(metodo):
+
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+
+        if self.lazy:
+            self.plan.append((metodo.__name__, args, kwargs))
+            print(f"📝 Paso '{metodo.__name__}' agregado al plan ({len(self.plan)} pasos).")
+            return None
+
+        filas, inicio = len(self.df), time.perf_counter()
+        resultado = metodo(self, *args, **kwargs)
+        duracion = time.perf_counter() - inicio
+
+        # Las columnas que escribió el paso dejan de ser válidas en la caché de fechas
+        try:
+            escribe = self._Operacion(metodo.__name__, args, kwargs)['escribe']
+        except (ValueError, TypeError, KeyError, AttributeError):
+            # Argumentos que el propio método ya rechazó: por seguridad se olvida todo
+            escribe = {'*'}
+
+        self._Invalidar(escribe)
+
+        # Registro estructurado del paso (memoria sin 'deep' para que sea barato)
+        self.Reporte(f"PASO {metodo.__name__}", paso=metodo.__name__, columnas=sorted(escribe),
+                     filas_entrada=filas, filas_salida=len(self.df), duracion_ms=round(duracion * 1000, 3),
+                     bytes=int(self.df.memory_usage(deep=False).sum()))
+        return resultado
+
+    return envoltura
+
+#True si 'nombre' es un método público de DataToolBox (un paso válido para el plan o Stream)
+def _es_paso(nombre:str) -> bool:
+    return isinstance(nombre, str) and not nombre.startswith('_') and callable(getattr(DataToolBox, nombre, None))
+
+#True si 'serie' son los mismos datos en memoria que 'fuente' (sin recorrer los valores)
+def _misma_columna(serie:pd.Series, fuente:pd.Series) -> bool:
+
+    if len(serie) != len(fuente) or serie.dtype != fuente.dtype or not serie.index.equals(fuente.index):
+        return False
+
+    if isinstance(serie.dtype, np.dtype):
+        # Cada acceso crea otro envoltorio de NumPy: se compara la dirección de los datos
+        a, b = serie.to_numpy(copy=False), fuente.to_numpy(copy=False)
+        return a.__array_interface__['data'] == b.__array_interface__['data'] and a.strides == b.strides
+
+    return serie.array is fuente.array
 
 class DataToolBox:
 
-    def __init__(self, file:Optional[str] =None):
+    def __init__(self, file:Optional[str] =None, lazy:bool =False, columnas:Optional[list] =None,
+                 backend:str ='numpy', compactar:Optional[str] =None):
 
         # 1. Definimos las variables con valores por defecto SIEMPRE al principio
+        # (self.df también reinicia self._fechas: caché de columnas ya convertidas a fecha)
         self.df = pd.DataFrame()
         self.ruta = "" 
         self.engine = None
+        # Modo lazy: los métodos de limpieza y cálculo solo se anotan en 'plan'
+        self.lazy = lazy
+        self.plan = []
+        self._pendiente = False  # True si el archivo aún no se ha leído (lazy)
+        # Bitácora de operaciones (ver 'ConfigurarReporte')
+        self.reporte_ruta = "factura_proceso.jsonl"
+        self.reporte_max = 500
+        # 'pyarrow': columnas en Arrow (textos sin un objeto de Python por celda, parquet con memory map)
+        if backend not in ('numpy', 'pyarrow'):
+            print(f"⚠️ Backend '{backend}' no soportado (numpy o pyarrow). Se usará numpy.")
+            backend = 'numpy'
+        self.backend = backend
+        # Copia Feather de los .xlsx/.xls/.json para no volver a parsearlos (ver '_leer_columnar')
+        self.cache_columnar = True
+        # Caché de resultados intermedios (ver 'Cache' y 'Checkpoint'); None = desactivada
+        self.cache_ruta = None
+        self.cache_max_bytes = 2_000_000_000
+        # Compactación automática de tipos (ver 'Compact'): None, 'carga' o 'final' (antes de exportar)
+        self.auto_compactar = compactar
+        # Marcas de agua de las cargas incrementales (ver 'CargarTabla(incremental=...)')
+        self.marcas_ruta = "marcas_agua.json"
+        # Columnas de baja cardinalidad: se limpian solo sus valores distintos
+        self.categoricas = set()
+        self.umbral_categorico = 0.05  # None desactiva la detección automática
+        # Decisiones Categorical ya tomadas por el plan lazy para el paso en curso (ver '_Ejecutar')
+        self._fijas = {}
+        # Conjuntos de hashes abiertos por carpeta (ver 'Dedup(persistente=...)')
+        self.conjuntos = {}
 
         if file is not None:
         
@@ -28,43 +1957,38 @@ class DataToolBox:
     
                 try:
 
-                    # Extraemos la extensión (ej: '.parquet', '.csv')
-                    _, extension = os.path.splitext(file)
-                    extension = extension.lower()
-
-                    match extension:
-
-                        case  '.csv':
-                            self.df = pd.read_csv(file)
-                            self.ruta = file  # Solo se actualiza si la carga es real
-                            print(f"✅ Archivo '{file}' cargado con éxito.")
-
-                        case   '.parquet':
-                            self.df = pd.read_parquet(file)
-                            self.ruta = file  # Solo se actualiza si la carga es real
-                            print(f"✅ Archivo '{file}' cargado con éxito.")
-
-                        case   '.json':
-                            self.df = pd.read_json(file)
-                            self.ruta = file  # Solo se actualiza si la carga es real
-                            print(f"✅ Archivo '{file}' cargado con éxito.")
-
-                        case   '.xlsx':
-                            self.df = pd.read_excel(file)
-                            self.ruta = file  # Solo se actualiza si la carga es real
-                            print(f"✅ Archivo '{file}' cargado con éxito.")
-
-                        case   '.xls':
-                            self.df = pd.read_excel(file)
-                            self.ruta = file  # Solo se actualiza si la carga es real
-                            print(f"✅ Archivo '{file}' cargado con éxito.")
-
-                        case _:
+                    if lazy:
+                        # En modo lazy solo registramos la ruta, se lee al ejecutar el plan
+                        _, extension = os.path.splitext(file)
+                        if extension.lower() not in ('.csv', '.parquet', '.json', '.xlsx', '.xls'):
                             raise ValueError(f"Formato {extension} no soportado")
-                    
+                        self.ruta = file
+                        self._pendiente = True
+                        print(f"📝 Archivo '{file}' registrado en modo lazy.")
+                    else:
+                        # Con 'columnas' solo se leen esas (en lazy ya se leen solo las que usa el plan)
+                        self.df = self._Leer(file, None if columnas is None else set(columnas))
+                        self.ruta = file  # Solo se actualiza si la carga es real
+                        print(f"✅ Archivo '{file}' cargado con éxito.")
+                        self._AutoCompactar('carga')
+
                 except Exception as e:
                     print(f"⚠️ No se pudo cargar '{file}': {e}")
+
+    # Al reasignar self.df (filtros, merge, cargas) la caché de fechas deja de valer
+    @property
+    def df(self) -> pd.DataFrame:
+        return self._df
+
+    @df.setter
+    def df(self, valor:pd.DataFrame):
+        self._df = valor
+        self._fechas = {}
     
+    #lee un archivo completo segun su extension (si se pasan columnas, solo lee esas)
+    def _Leer(self, file:str, columnas:Optional[set] =None) -> pd.DataFrame:
+        return _leer(file, columnas, self.cache_columnar, self.backend)
+
     #enlista los archivos que hayan en la ruta escogida
     def List_files(self, ruta_carpeta:str ="./", extension:str =".csv"):
         
@@ -103,7 +2027,8 @@ class DataToolBox:
             #        "server":"servidor", 
             #        "puerto":"puerto", 
             #        "bd":"datos.bd"}
-        
+            # Opcional: "pool": {"pool_size": 20, "max_overflow": 40}
+
         if(kwargs.get('red') == True):
 
             #internet
@@ -123,250 +2048,1648 @@ class DataToolBox:
             #asignamos ruta
             ruta = f"sqlite:///{bd}"
 
-        #luego establecer la ruta se consultan los datos y los insertamos en el objeto
-        try:
+        #luego establecer la ruta se consultan los datos y los insertamos en el objeto
+        try:
+
+            #aqui va la ruta sql (el motor y su pool se comparten entre instancias con la misma ruta)
+            opciones = kwargs.get('pool') or {}
+            nuevo = _clave_motor(ruta, opciones) not in _MOTORES
+            self.engine = _motor(ruta, **opciones)
+            print("⚡ Conexión establecida." if nuevo else "⚡ Conexión establecida (pool compartido).")
+
+        except Exception as e:
+
+            print(f"❌ Error al al cargar ruta: {e}")
+            self.engine = None # Aseguramos que quede limpio si falla
+            return []
+    
+    #muestra las métricas del pool de conexiones de esta instancia
+    def MetricasPool(self) -> dict:
+
+        if self.engine is None:
+            print("⚠️ Error: Primero debes llamar a 'Conexion'.")
+            return {}
+
+        pool = self.engine.pool
+        metricas = dict(getattr(pool, 'metricas', {}))
+
+        if isinstance(pool, QueuePool):
+            metricas.update({'tamano': pool.size(), 'en_uso': pool.checkedout(),
+                             'libres': pool.checkedin(), 'extra': max(pool.overflow(), 0)})
+
+        if metricas.get('checkouts'):
+            metricas['espera_media_ms'] = round(metricas['espera_total_s'] / metricas['checkouts'] * 1000, 3)
+            metricas['espera_total_s'] = round(metricas['espera_total_s'], 6)
+            metricas['espera_max_s'] = round(metricas['espera_max_s'], 6)
+
+        print(f"🔌 Pool: {metricas}")
+        return metricas
+
+    #arma la consulta SELECT con proyección de columnas y filtros con parámetros
+    def _Consulta(self, tabla:str, columnas:Optional[list] =None, filtro=None, desde:Optional[tuple] =None):
+
+        quote = self.engine.dialect.identifier_preparer.quote
+
+        # Una consulta completa (con espacios) se usa tal cual, o como subconsulta si hay
+        # columnas, filtro o marca de agua que aplicarle (antes se ignoraban en silencio)
+        if " " in tabla.strip():
+            consulta = tabla.strip().rstrip(";")
+            if not (columnas or filtro or desde is not None):
+                return consulta, {}
+            nombre = f"({consulta}) q"
+        else:
+            nombre = ".".join(quote(parte) for parte in tabla.split("."))
+        campos = ", ".join(quote(c) for c in columnas) if columnas else "*"
+        query = f"SELECT {campos} FROM {nombre}"
+        params = {}
+
+        condiciones = []
+
+        if isinstance(filtro, str):
+            # Condición SQL escrita a mano, ej: "fecha >= '2026-01-01'"
+            condiciones.append(f"({filtro})")
+
+        elif filtro:
+            # {'col': valor} -> col = valor | {'col': [a, b]} -> col IN (...) | {'col': ('>', valor)}
+            for i, (columna, valor) in enumerate(filtro.items()):
+                if isinstance(valor, tuple):
+                    operador, valor = valor
+                    if operador not in ('=', '!=', '<>', '<', '<=', '>', '>='):
+                        raise ValueError(f"Operador '{operador}' no soportado en el filtro")
+                    condiciones.append(f"{quote(columna)} {operador} :p{i}")
+                    params[f"p{i}"] = valor
+                elif isinstance(valor, list) and not valor:
+                    # IN () no es SQL válido: una lista vacía no deja pasar ninguna fila
+                    condiciones.append("1=0")
+                elif isinstance(valor, list):
+                    marcas = ", ".join(f":p{i}_{j}" for j in range(len(valor)))
+                    condiciones.append(f"{quote(columna)} IN ({marcas})")
+                    params.update({f"p{i}_{j}": v for j, v in enumerate(valor)})
+                else:
+                    condiciones.append(f"{quote(columna)} = :p{i}")
+                    params[f"p{i}"] = valor
+
+        if desde is not None:
+            # Carga incremental: desde la marca de agua inclusive (filas confirmadas después con el
+            # mismo valor no se pierden); las ya leídas en el borde se descartan con '_Borde'
+            columna, marca = desde
+            condiciones.append(f"{quote(columna)} >= :marca")
+            params["marca"] = marca
+
+        if condiciones:
+            query += " WHERE " + " AND ".join(condiciones)
+
+        return query, params
+
+    #lee una consulta por lotes con cursor del lado del servidor (stream_results)
+    def _LotesSQL(self, query:str, params:dict, chunksize:int, marca:Optional[tuple] =None, vistos:set =frozenset()):
+
+        tope, borde = None, set()
+
+        with self.engine.connect().execution_options(stream_results=True) as con:
+            # Solo usamos text() si hay parámetros: una consulta a mano puede traer '::' (casts)
+            consulta = text(query) if params else query
+            for lote in pd.read_sql_query(consulta, con, params=params or None, chunksize=chunksize):
+                if marca is not None and not lote.empty:
+                    lote, tope, borde = self._Borde(lote, marca[1], vistos, tope, borde)
+                yield lote
+
+        # La marca solo avanza si se consumieron todos los lotes
+        if marca is not None and tope is not None:
+            self._GuardarMarca(marca[0], tope, borde)
+
+    #descarta las filas ya leídas en el borde de la marca y lleva el nuevo tope con las huellas de sus filas
+    def _Borde(self, lote:pd.DataFrame, columna:str, vistos:set, tope, borde:set) -> tuple:
+
+        huellas = _hash_filas(lote, list(lote.columns))
+        maximo = lote[columna].max()
+
+        if pd.notna(maximo) and (tope is None or maximo >= tope):
+            if tope is None or maximo > tope:
+                tope, borde = maximo, set()
+            en_tope = (lote[columna] == tope).to_numpy(dtype=bool, na_value=False)
+            borde = borde | set(huellas[en_tope].tolist())
+
+        if vistos:
+            lote = lote[~np.isin(huellas, np.fromiter(vistos, dtype=np.uint64))]
+        return lote, tope, borde
+
+    #clave de la marca de agua: motor (sin contraseña) + tabla + columna
+    def _ClaveMarca(self, tabla:str, columna:str) -> str:
+        return f"{self.engine.url.render_as_string(hide_password=True)}::{tabla}::{columna}"
+
+    #lee el archivo de marcas de agua (vacío si aún no existe)
+    def _LeerMarcas(self) -> dict:
+
+        if not os.path.exists(self.marcas_ruta):
+            return {}
+
+        with open(self.marcas_ruta, encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+    #marca de agua guardada -> (valor o None, huellas de las filas ya leídas con ese valor)
+    def _Marca(self, clave:str) -> tuple:
+
+        valor = self._LeerMarcas().get(clave)
+        if isinstance(valor, dict):
+            return valor["valor"], set(valor.get("vistos", []))
+        # Marcas de versiones anteriores: solo el valor (el borde se relee una vez)
+        return valor, set()
+
+    #guarda una marca de agua (y las huellas de las filas leídas en ese valor)
+    def _GuardarMarca(self, clave:str, valor, vistos:set =frozenset()):
+
+        # Tipos de numpy/pandas -> tipos de JSON (las fechas se guardan como texto)
+        if isinstance(valor, np.generic):
+            valor = valor.item()
+        if not isinstance(valor, (int, float, str)):
+            valor = str(valor)
+
+        marcas = self._LeerMarcas()
+        marcas[clave] = {"valor": valor, "vistos": sorted(vistos)}
+        self._EscribirMarcas(marcas)
+
+    #escribe el archivo de marcas de agua (atómico: archivo temporal + reemplazo)
+    def _EscribirMarcas(self, marcas:dict):
+
+        temporal = self.marcas_ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(marcas, archivo, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.marcas_ruta)
+
+    #olvida la marca de agua de una tabla (la siguiente carga incremental vuelve a leer todo)
+    def ReiniciarMarca(self, tabla:str, columna:Optional[str] =None):
+
+        if self.engine is None:
+            print("⚠️ Error: Primero debes llamar a 'Conexion'.")
+            return
+
+        prefijo = self._ClaveMarca(tabla, columna or "")
+        marcas = self._LeerMarcas()
+        borrar = [k for k in marcas if (k == prefijo if columna else k.startswith(prefijo))]
+
+        for clave in borrar:
+            del marcas[clave]
+
+        self._EscribirMarcas(marcas)
+        print(f"🔄 Marca de agua de '{tabla}' reiniciada ({len(borrar)} eliminadas).")
+
+    #convertir una tabla en un DataFrame
+    def CargarTabla(self, tabla:str, columnas:Optional[list] =None, filtro=None, chunksize:Optional[int] =None,
+                    incremental:Optional[str] =None):
+
+        #Ejemplo de uso
+        # db.CargarTabla("ventas", columnas=["id", "precio"], filtro={"producto": ["Laptop Pro", "Monitor 4K"]})
+        # db.CargarTabla("ventas", filtro={"precio": (">", 100)})
+        # Extracción tabla -> parquet en memoria constante:
+        # db.Stream(db.CargarTabla("ventas", chunksize=50_000), pasos, name="ventas", formato="parquet")
+        # Solo filas nuevas o modificadas desde la última corrida:
+        # db.CargarTabla("ventas", incremental="actualizado")
+
+        """
+        Carga una tabla (o consulta) en self.df. 'columnas' y 'filtro' se envían
+        a la base de datos en vez de traer SELECT * (sobre una consulta escrita a
+        mano se aplican envolviéndola como subconsulta). Con 'chunksize' no se carga
+        nada en self.df: devuelve un iterador de lotes leídos con cursor del lado
+        del servidor, listo para pasarlo a 'Stream'.
+        Con 'incremental' (columna de fecha de modificación o id creciente) solo se
+        traen filas con valor mayor o igual a la marca de agua guardada en 'marcas_ruta'
+        (las que ya se leyeron con ese mismo valor se descartan); la marca avanza al
+        máximo leído cuando la carga termina.
+        """
+        if self.engine is None:
+
+            print("⚠️ Error: Primero debes llamar a 'Conexion' antes de cargar una tabla.")
+            return
+
+        try:
+            marca, desde, vistos = None, None, set()
+
+            if incremental is not None:
+                if columnas and incremental not in columnas:
+                    columnas = list(columnas) + [incremental]
+                clave = self._ClaveMarca(tabla, incremental)
+                marca = (clave, incremental)
+                valor, vistos = self._Marca(clave)
+                desde = None if valor is None else (incremental, valor)
+                print(f"🔖 Carga incremental por '{incremental}' desde: {valor if valor is not None else 'el inicio'}")
+
+            # Usamos pd.read_sql_query para extraer la información
+            query, params = self._Consulta(tabla, columnas, filtro, desde)
+
+            if chunksize is not None:
+                print(f"📦 Lista '{tabla}' lista para leer por lotes de {chunksize} filas.")
+                return self._LotesSQL(query, params, chunksize, marca, vistos)
+
+            datos = pd.read_sql_query(text(query) if params else query, self.engine, params=params or None)
+
+            if marca is not None and not datos.empty:
+                datos, tope, borde = self._Borde(datos, incremental, vistos, None, set())
+                datos = datos.reset_index(drop=True)
+                self._GuardarMarca(clave, tope, borde)
+
+            self.df = datos
+            self._pendiente = False
+
+            print(f"✅ Lista '{tabla}' cargada al DataFrame ({len(self.df)} filas).")
+            self._AutoCompactar('carga')
+
+        except Exception as e:
+            print(f"❌ Error al extraer datos de SQL: {e}")
+
+    #carga masiva: reparte los datos en lotes y confirma cada lote en su propia transacción
+    def _CargaMasiva(self, lotes, tabla:str, modo:str ='append', lote:int =50_000, metodo:str ='auto') -> int:
+
+        dialecto, paramstyle = self.engine.dialect.name, self.engine.dialect.paramstyle
+        filas = 0
+
+        for parte in lotes:
+
+            insertar, bloque = _metodo_sql(dialecto, paramstyle, metodo, len(parte.columns))
+
+            for inicio in range(0, len(parte), lote):
+                with self.engine.begin() as con:
+                    parte.iloc[inicio:inicio + lote].to_sql(tabla, con=con, if_exists=modo, index=False,
+                                                            method=insertar, chunksize=bloque)
+                # Solo el primer lote reemplaza/crea la tabla, los siguientes se agregan
+                modo = 'append'
+                filas += min(lote, len(parte) - inicio)
+
+        return filas
+
+    #upsert: cada lote va a una tabla de paso y se fusiona por 'clave' dentro de una misma transacción
+    def _Upsert(self, lotes, tabla:str, clave:list, lote:int =50_000, metodo:str ='auto') -> tuple:
+
+        dialecto, paramstyle = self.engine.dialect.name, self.engine.dialect.paramstyle
+        quote = self.engine.dialect.identifier_preparer.quote
+        # 'esquema.tabla' -> to_sql/has_table reciben el esquema aparte; la tabla de paso va al mismo
+        # esquema con nombre único (dos cargas a la vez sobre la misma tabla no se pisan)
+        esquema, _, nombre = tabla.rpartition(".")
+        esquema = esquema or None
+        paso = f"_paso_{uuid.uuid4().hex[:12]}"
+        prefijo = f"{quote(esquema)}." if esquema else ""
+        destino, temporal = prefijo + quote(nombre), prefijo + quote(paso)
+        nuevas = actualizadas = 0
+
+        for parte in lotes:
+
+            faltan = [c for c in clave if c not in parte.columns]
+            if faltan:
+                raise KeyError(f"Columnas clave no encontradas: {faltan}")
+
+            # NULL = NULL no empareja en SQL: esas filas se insertarían otra vez en cada carga
+            nulas = parte[clave].isna().any(axis=1)
+            if nulas.any():
+                raise ValueError(f"{int(nulas.sum())} filas tienen la clave {clave} vacía; el upsert no puede emparejarlas")
+
+            # Si la clave se repite dentro del lote gana la última aparición
+            parte = parte.drop_duplicates(subset=clave, keep='last')
+            insertar, bloque = _metodo_sql(dialecto, paramstyle, metodo, len(parte.columns))
+            campos = ", ".join(quote(c) for c in parte.columns)
+            union = " AND ".join(f"{temporal}.{quote(c)} = {destino}.{quote(c)}" for c in clave)
+
+            for inicio in range(0, len(parte), lote):
+
+                trozo = parte.iloc[inicio:inicio + lote]
+
+                with self.engine.begin() as con:
+
+                    # Si la tabla destino no existe, el primer lote la crea
+                    if not self.engine.dialect.has_table(con, nombre, schema=esquema):
+                        trozo.to_sql(nombre, con=con, schema=esquema, index=False, method=insertar, chunksize=bloque)
+                        nuevas += len(trozo)
+                        continue
+
+                    trozo.to_sql(paso, con=con, schema=esquema, if_exists='replace', index=False, method=insertar,
+                                 chunksize=bloque)
+                    borradas = con.execute(text(
+                        f"DELETE FROM {destino} WHERE EXISTS (SELECT 1 FROM {temporal} WHERE {union})")).rowcount
+                    con.execute(text(f"INSERT INTO {destino} ({campos}) SELECT {campos} FROM {temporal}"))
+                    con.execute(text(f"DROP TABLE {temporal}"))
+
+                actualizadas += borradas
+                nuevas += len(trozo) - borradas
+
+        return nuevas, actualizadas
+
+    # Guardar el DataFrame actual en una tabla SQL
+    def ExportSQL(self, nombre_tabla:str, modo:str ='append', lote:int =50_000, metodo:str ='auto', origen=None,
+                  clave=None):
+
+        #Ejemplo de uso
+        # db.ExportSQL("ventas", modo="replace")
+        # db.ExportSQL("ventas", origen="bandeja/ventas_grandes.csv", lote=100_000)   # sin pasar por self.df
+        # db.ExportSQL("ventas", modo="upsert", clave="id")
+
+        """
+        Exporta el contenido de self.df a la base de datos conectada.
+        modo 'append': Agrega los datos al final.
+        modo 'replace': Borra la tabla y crea una nueva con los datos actuales.
+        modo 'upsert': Actualiza las filas cuya 'clave' ya existe e inserta las nuevas.
+        Los datos se insertan en lotes de 'lote' filas, cada uno en su transacción.
+        metodo 'auto' usa COPY en PostgreSQL y executemany del driver en el resto
+        ('copy', 'executemany' o 'multi' -INSERT de varias filas- para forzarlo).
+        Con 'origen' (ruta o iterador de DataFrames) se carga por lotes sin tocar self.df.
+        """
+        # 1. Verificación de seguridad: ¿Hay conexión y hay datos?
+        if self.engine is None:
+            print("⚠️ ERROR: No hay conexión activa. Usa 'Conexion' primero.")
+            return
+
+        if modo == 'upsert' and not clave:
+            print("⚠️ ERROR: El modo 'upsert' necesita 'clave' (ej: clave='id').")
+            return
+
+        if origen is None:
+            self._Materializar()
+            datos = self._AutoCompactar('final')
+
+            if datos.empty:
+                print("⚠️ ERROR: El DataFrame está vacío. No hay nada que exportar.")
+                return
+
+        try:
+            # 2. Ejecutar la exportación en lotes usando el motor de la instancia
+            inicio = time.perf_counter()
+            lotes = [datos] if origen is None else self._Lotes(origen, lote)
+            if modo == 'upsert':
+                clave = [clave] if isinstance(clave, str) else list(clave)
+                nuevas, actualizadas = self._Upsert(lotes, nombre_tabla, clave, lote, metodo)
+                filas = nuevas + actualizadas
+            else:
+                filas = self._CargaMasiva(lotes, nombre_tabla, modo, lote, metodo)
+            duracion = time.perf_counter() - inicio
+            velocidad = filas / duracion if duracion > 0 else 0.0
+
+            print(f"✅ ¡Éxito! Datos exportados a la tabla '{nombre_tabla}' (Modo: {modo}).")
+            if modo == 'upsert':
+                print(f"   🔁 {nuevas} filas nuevas, {actualizadas} actualizadas.")
+            print(f"   🚀 {filas} filas en {duracion:.2f} s ({velocidad:,.0f} filas/s).")
+            self.Reporte(f"EXPORTACIÓN SQL: Tabla '{nombre_tabla}' actualizada satisfactoriamente.",
+                         filas=filas, duracion_ms=round(duracion * 1000, 3), filas_seg=round(velocidad, 1))
+
+        except Exception as e:
+            print(f"❌ ERROR al exportar a SQL: {e}")
+            self.Reporte(f"FALLO EXPORTACIÓN SQL: {e}")
+
+    #---------------------------Utilieria-------------------------------
+
+    #Ver lista
+    def View(self, filas:int =10, portable:bool =False, list:Optional[list] =None):
+
+        if (portable == True):
+            """Imprime el DataFrame de forma segura y rápida"""
+            print(f"\n>>> Mostrando {filas} filas de {list.shape[0]} totales:")
+            print(list.head(filas))
+            print("-" * 30)
+        else:
+            """Imprime el DataFrame de forma segura y rápida"""
+            self._Materializar()
+            print(f"\n>>> Mostrando {filas} filas de {self.df.shape[0]} totales:")
+            print(self.df.head(filas))
+            print("-" * 30)
+
+    #genera documento (JSON lines) con las operaciones realizadas
+    def Reporte(self, mensaje:str, **campos):
+
+        # Los mensajes largos se recortan: la bitácora nunca guarda datos completos
+        if len(mensaje) > self.reporte_max:
+            mensaje = mensaje[:self.reporte_max] + f"... (+{len(mensaje) - self.reporte_max} caracteres)"
+
+        registro = {"hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], "mensaje": mensaje}
+        registro.update(campos)
+
+        # El hilo de la bitácora escribe en segundo plano; aquí solo se encola
+        _bitacora(self.reporte_ruta).Escribir(registro)
+
+    #configura dónde y cómo se guarda la bitácora de operaciones
+    def ConfigurarReporte(self, ruta:str ="factura_proceso.jsonl", max_bytes:int =10_000_000, respaldos:int =3,
+                          fsync_cada:int =500, intervalo:float =2.0, max_mensaje:int =500):
+
+        #Ejemplo de uso
+        # db.ConfigurarReporte("logs/etl.jsonl", max_bytes=50_000_000, respaldos=5)
+
+        """
+        La bitácora es compartida por ruta en todo el proceso; si esa ruta ya
+        estaba abierta (también la ruta por defecto) se reconfigura su rotación
+        y fsync para todas las instancias que la usan.
+        """
+        self.reporte_ruta = ruta
+        self.reporte_max = max_mensaje
+        _bitacora(ruta, max_bytes=max_bytes, respaldos=respaldos, fsync_cada=fsync_cada, intervalo=intervalo)
+        print(f"🧾 Bitácora de operaciones en: {ruta}")
+
+    #Renombras filas de una lista
+    @_diferible
+    def Rename(self, esquema:Optional[str]):
+
+        #Ejemplo de uso
+        # cambios = {
+        #     "Product_ID": "ID",
+        #     "Item": "Producto",
+        #     "Cost": "Precio"
+        # }
+
+        """
+        Cambia el nombre de las columnas.
+        Argumento 'esquema': un diccionario {'viejo': 'nuevo'}
+        """
+        try:
+            self.df.rename(columns=esquema, inplace=True)
+            print("✅ Columnas renombradas con éxito.")
+        except Exception as e:
+            print(f"❌ Error al renombrar: {e}")
+
+    #refrescamos o asignamos una lista al dataframe
+    def Refresh(self, archivo:str):
+
+        try:
+
+            print(f"📂 Cargando CSV: {archivo}.")
+            self.df = pd.read_csv(f"{archivo}")
+            self._pendiente = False
+            self._AutoCompactar('carga')
+
+        except Exception as e:
+            print(f"❌ Error al al cargar archivo: {e}")
+            return []
+    
+    #exportar a los formatos disponibles
+    def Export(self, name:str= "archivo", carpeta:str= "./", formato:str = "csv"):
+
+        self._Materializar()
+        datos = self._AutoCompactar('final')
+
+        try:
+
+            if not os.path.exists(carpeta):
+                os.makedirs(carpeta)
+                
+            match (formato):
+            
+                case 'csv':
+                    ruta_completa = os.path.join(carpeta, f"{name}.csv")
+                    datos.to_csv(ruta_completa, index=False)
+                case 'parquet':
+                    ruta_completa = os.path.join(carpeta, f"{name}.parquet")
+                    datos.to_parquet(ruta_completa, engine='pyarrow', compression='snappy')
+                case 'json':
+                    ruta_completa = os.path.join(carpeta, f"{name}.json")
+                    datos.to_json(ruta_completa, orient='records', indent=4)
+                case 'excel':
+                    ruta_completa = os.path.join(carpeta, f"{name}.excel")
+                    datos.to_excel(ruta_completa, sheet_name=f"{name}")
+            
+            print(f"✅ ¡Éxito! Archivo guardado en: {ruta_completa}")
+            self.Reporte(f"Exportación exitosa: {name}.{formato}") # Usando tu sistema de log
+            
+        except PermissionError:
+            print(f"❌ ERROR: No se pudo guardar. Cierra el archivo '{name}.{formato}' si lo tienes abierto en Excel.")
+        except Exception as e:
+            print(f"❌ ERROR INESPERADO al exportar: {e}")
+            self.Reporte(f"Fallo en exportación: {e}")
+
+    #---------------------------Streaming-------------------------------
+
+    #genera lotes (chunks) de un archivo sin cargarlo completo en memoria
+    def _Lotes(self, origen, chunksize:int =100_000):
+
+        # Si ya nos pasaron un DataFrame o un iterador de DataFrames, lo usamos tal cual
+        if isinstance(origen, pd.DataFrame):
+            yield origen
+            return
+
+        if not isinstance(origen, str):
+            # Un iterador de DataFrames o una lista de rutas (se leen una tras otra)
+            for parte in origen:
+                yield from self._Lotes(parte, chunksize)
+            return
+
+        _, extension = os.path.splitext(origen)
+        extension = extension.lower()
+
+        match extension:
+
+            case '.csv':
+                with pd.read_csv(origen, chunksize=chunksize) as lector:
+                    yield from lector
+
+            case '.parquet':
+                # Leemos por bloques dentro de cada row group, nunca el archivo entero
+                import pyarrow.parquet as pq
+                archivo = pq.ParquetFile(origen)
+                for bloque in archivo.iter_batches(batch_size=chunksize):
+                    yield _a_pandas(bloque, self.backend)
+
+            case '.jsonl':
+                with pd.read_json(origen, lines=True, chunksize=chunksize) as lector:
+                    yield from lector
+
+            case '.json' | '.xlsx' | '.xls':
+                # Estos formatos no se pueden leer por partes: se entregan en un solo lote
+                print(f"⚠️ El formato {extension} no admite lectura por lotes. Se cargará completo.")
+                yield self._Leer(origen)
+
+            case _:
+                raise ValueError(f"Formato {extension} no soportado")
+
+    #escribe un lote en el destino (archivo o tabla SQL) abriendo el destino solo una vez
+    def _EscribirLote(self, lote:pd.DataFrame, estado:dict):
+
+        primero = estado['lotes'] == 0
+
+        if estado['tabla'] is not None:
+            # El primer lote respeta el modo pedido, los siguientes se agregan
+            modo = estado['modo'] if primero else 'append'
+            self._CargaMasiva([lote], estado['tabla'], modo)
+            return
+
+        match estado['formato']:
+
+            case 'csv':
+                lote.to_csv(estado['ruta'], mode='w' if primero else 'a', header=primero, index=False)
+
+            case 'json':
+                # En streaming se escribe en formato JSON lines (un registro por línea)
+                lote.to_json(estado['ruta'], orient='records', lines=True, mode='w' if primero else 'a')
+
+            case 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+
+                if estado['writer'] is None:
+                    esquema = pa.Schema.from_pandas(lote, preserve_index=False)
+                    # Columnas vacías en el primer lote no pueden fijar el tipo 'null' para todo el archivo
+                    for i, campo in enumerate(esquema):
+                        if pa.types.is_null(campo.type):
+                            esquema = esquema.set(i, campo.with_type(pa.string()))
+                    estado['writer'] = pq.ParquetWriter(estado['ruta'], esquema, compression='snappy')
+
+                tabla = pa.Table.from_pandas(lote, schema=estado['writer'].schema, preserve_index=False)
+                estado['writer'].write_table(tabla)
+
+            case _:
+                raise ValueError(f"Formato {estado['formato']} no soportado en streaming")
+
+    #procesa un archivo grande por lotes: limpia cada lote y lo escribe directo al destino
+    def Stream(self, origen, pasos:list, name:str ="archivo", carpeta:str ="./", formato:str ="csv",
+               tabla:Optional[str] =None, modo:str ='append', chunksize:int =100_000):
+
+        #Ejemplo de uso
+        # pasos = [
+        #     ("CleanStruct",),
+        #     ("CleanNumb", "id"),
+        #     ("CleanText", "producto", False),
+        #     ("CalculadoraPlus", {"tipo": "subtotal", "col1": "precio", "col2": "cantidad"}),
+        # ]
+        # db.Stream("bandeja/caos_total.csv", pasos, name="dataset_limpio", formato="parquet")
+
+        """
+        Aplica los pasos de limpieza lote por lote (chunksize filas) y escribe
+        cada lote en el destino, así la memoria depende del lote y no del archivo.
+        Si se indica 'tabla' el destino es SQL (usa 'Conexion' antes), si no, un archivo.
+        """
+        # Convertimos los pasos al formato del plan y los optimizamos una sola vez
+        plan = []
+        for paso in pasos:
+            nombre, *args = paso
+            kwargs = args.pop() if args and isinstance(args[-1], dict) else {}
+
+            # Con tipo='auto' cada lote elegiría int64 o float64 según sus datos; el destino
+            # (el esquema parquet sale del primer lote) necesita el mismo tipo en todo el archivo
+            if nombre == 'CleanNumb':
+                if len(args) > 4:
+                    args[4] = 'float' if args[4] == 'auto' else args[4]
+                elif kwargs.get('tipo', 'auto') == 'auto':
+                    kwargs = {**kwargs, 'tipo': 'float'}
+
+            plan.append((nombre, tuple(args), kwargs))
+
+        # Pasos que no existen (o con argumentos inválidos) se rechazan antes de leer nada
+        try:
+            ops = self._Optimizar(plan)
+        except (ValueError, TypeError) as e:
+            print(f"❌ ERROR: El paso no se puede ejecutar por lotes: {e}")
+            return 0
+
+        # Solo se permiten pasos que trabajan fila a fila (CleanFalse sin 'limites' necesita el archivo completo)
+        for op in ops:
+            if op['global']:
+                print(f"❌ ERROR: El paso '{op['nombre']}' no se puede ejecutar por lotes.")
+                return 0
+
+        if tabla is not None and self.engine is None:
+            print("⚠️ ERROR: No hay conexión activa. Usa 'Conexion' primero.")
+            return 0
+
+        estado = {'tabla': tabla, 'modo': modo, 'formato': formato, 'writer': None, 'lotes': 0, 'ruta': None}
+
+        if tabla is None:
+            if not os.path.exists(carpeta):
+                os.makedirs(carpeta)
+            extension = 'jsonl' if formato == 'json' else formato
+            estado['ruta'] = os.path.join(carpeta, f"{name}.{extension}")
+
+        # Guardamos el DataFrame actual para no perderlo mientras usamos self.df como lote
+        original, lazy = self.df, self.lazy
+        self.lazy = False
+        filas = 0
+
+        try:
+
+            for lote in self._Lotes(origen, chunksize):
+
+                self.df = lote
+                print(f"📦 Lote {estado['lotes'] + 1}: {len(lote)} filas.")
+                self._Ejecutar(ops)
+
+                self._EscribirLote(self.df, estado)
+                estado['lotes'] += 1
+                filas += len(self.df)
+
+            destino = f"tabla '{tabla}'" if tabla is not None else estado['ruta']
+            print(f"✅ Streaming completado: {filas} filas en {estado['lotes']} lotes -> {destino}")
+            self.Reporte(f"STREAMING: {filas} filas en {estado['lotes']} lotes -> {destino}")
+
+        except Exception as e:
+            print(f"❌ ERROR en streaming (lote {estado['lotes'] + 1}): {e}")
+            self.Reporte(f"FALLO STREAMING: {e}")
+
+        finally:
+            if estado['writer'] is not None:
+                estado['writer'].close()
+            self.df, self.lazy = original, lazy
+
+        return filas
+
+    #-------------------------Columnas categoricas---------------------------
+
+    #declara columnas de baja cardinalidad o ajusta el umbral de detección automática
+    def Categorizar(self, columnas:Optional[list] =None, umbral:Optional[float] =0.05):
+
+        #Ejemplo de uso
+        # db.Categorizar(["producto", "nombre_cliente"])   # declaradas a mano
+        # db.Categorizar(umbral=None)                      # sin detección automática
+
+        """
+        Las columnas declaradas (o detectadas: valores distintos / filas <= umbral)
+        se limpian una sola vez por categoría en CleanText, CleanNumb y ExtractInfo,
+        y los textos quedan como pandas Categorical.
+        """
+        if isinstance(columnas, str):
+            columnas = [columnas]
+
+        self.categoricas |= set(columnas or [])
+        self.umbral_categorico = umbral
+        print(f"🏷️ Columnas categóricas: {sorted(self.categoricas) or 'auto'} (umbral: {umbral}).")
+
+    #decide si una columna se limpia por categorías
+    def _EsCategorica(self, columna:str, serie:pd.Series) -> bool:
+
+        if columna in self._fijas:
+            return self._fijas[columna]
+
+        if columna in self.categoricas or isinstance(serie.dtype, pd.CategoricalDtype):
+            return True
+
+        # En columnas pequeñas no vale la pena; en las grandes medimos sobre una muestra
+        if self.umbral_categorico is None or len(serie) < 1000 or serie.dtype.kind in 'iufbM':
+            return False
+
+        muestra = serie.sample(min(len(serie), 10_000), random_state=0)
+        return muestra.nunique(dropna=True) <= self.umbral_categorico * len(muestra)
+
+    #aplica un kernel a la columna, por categorías si es de baja cardinalidad
+    def _Aplicar(self, columna:str, serie:pd.Series, funcion, **kw) -> pd.Series:
+        return _kernel(serie, funcion, self._EsCategorica(columna, serie), kw)
+
+    #-------------------------Modo lazy (planificador)---------------------------
+
+    #activa o desactiva el modo lazy (los pasos se anotan y se ejecutan con 'Collect')
+    def Lazy(self, activo:bool =True):
+
+        if not activo and self.plan:
+            self.Collect()
+
+        self.lazy = activo
+        print(f"📝 Modo lazy {'activado' if activo else 'desactivado'}.")
+
+    #ejecuta el plan pendiente antes de usar self.df directamente
+    def _Materializar(self):
+
+        if self.plan or self._pendiente:
+            self.Collect()
+
+    #describe un paso: que columnas lee y escribe, si filtra filas y si depende de todas las filas
+    def _Operacion(self, nombre:str, args:tuple, kwargs:dict) -> dict:
+
+        if not _es_paso(nombre):
+            raise ValueError(f"El paso '{nombre}' no existe en DataToolBox")
+
+        p = inspect.signature(getattr(DataToolBox, nombre)).bind(self, *args, **kwargs)
+        p.apply_defaults()
+        p = p.arguments
+
+        op = {'nombre': nombre, 'args': args, 'kwargs': kwargs, 'lee': set(), 'escribe': set(),
+              'filtro': False, 'global': False, 'kernel': None}
+
+        match nombre:
+
+            case 'CleanText':
+                op['kernel'] = (p['columna'], _texto, {'drop': p['drop']})
+
+            case 'CleanNumb':
+                op['kernel'] = (p['columna'], _numero, {k: p[k] for k in ('sib', 'drop', 'decimal', 'tipo', 'escala')})
+
+            case 'ExtractInfo':
+                if p['extraer'] is None and not p['validar']:
+                    patron, literal, _ = _extractor(p['patron'])
+                    op['kernel'] = (p['columna'], _extraer, {'patron': patron, 'literal': literal})
+                else:
+                    destinos = self._Extracciones(p['columna'], p['patron'], p['extraer'])
+                    op['lee'] = {p['columna']}
+                    op['escribe'] = set(destinos) | ({f"{d}_valido" for d in destinos} if p['validar'] else set())
+
+            case 'CleanDecimal':
+                op['kernel'] = (p['columna'], _decimal, {'decimales': p['decimales']})
+
+            case 'CleanDate':
+                # Con drop=True además de convertir elimina filas (es un filtro)
+                op['kernel'] = (p['fecha'], _fecha, {'formatos': p['formatos']})
+                op['filtro'] = bool(p['drop'])
+
+            case 'CleanStruct':
+                op['lee'] = {'*'}
+                op['filtro'] = True
+
+            case 'CleanBatch':
+                op['lee'] = op['escribe'] = set(p['limpiezas'])
+                # Si alguna limpieza es CleanDate con drop, el lote también elimina filas
+                op['filtro'] = any(self._Operacion(*self._Limpieza(c, l))['filtro']
+                                   for c, l in p['limpiezas'].items())
+
+            case 'CleanFalse':
+                columnas = {p['columna']} if isinstance(p['columna'], str) else set(p['columna'])
+                limites = p['limites']
+                grupo = p['grupo'] if limites is None else getattr(getattr(limites, 'index', None), 'name', None)
+                op['lee'] = columnas | ({grupo} if grupo is not None else set())
+                op['escribe'] = columnas
+                op['filtro'] = True
+                # Los límites calculados dependen de todas las filas; los dados se aplican fila a fila
+                op['global'] = limites is None
+
+            case 'Dedup':
+                claves = p['claves']
+                op['lee'] = {'*'} if claves is None else {claves} if isinstance(claves, str) else set(claves)
+                if p['accion'] == 'marcar':
+                    op['escribe'] = {p['columna']}
+                else:
+                    op['filtro'] = True
+                # Sin conjunto en disco los repetidos dependen de todas las filas (no sirve por lotes)
+                op['global'] = p['persistente'] is None
+
+            case 'Fuzzy':
+                # Los grupos dependen de todos los valores de la columna
+                op['lee'] = {p['columna']}
+                op['escribe'] = {p['res']} | ({p['representante']} if p['representante'] else set())
+                op['global'] = True
+
+            case 'CleanID':
+                op['lee'] = {p['columna']}
+                op['escribe'] = {p['prefijo'] or f"{p['columna']}_prefijo", p['numero'] or f"{p['columna']}_num"}
+                if p['drop']:
+                    op['escribe'].add(p['columna'])
+
+            case 'Calculadora':
+                config = p['config']
+                op['lee'] = {config.get(k) for k in ('col1', 'col2') if isinstance(config.get(k), str)}
+                op['escribe'] = {config['res']} if config.get('res') else set()
+                op['global'] = config.get('op') == '++'
+
+            case 'CalculadoraPlus':
+                config = p['kwargs']
+                salidas = {"costo_unitario": "Costo_unitario", "subtotal": "Subtotal", "iva": "IVA",
+                           "descuento": "Descuento", "precio_final": "Precio_final",
+                           "margen_bruto": "Margen_bruto", "margen_pct": "Margen",
+                           "margen_porcent": "margen_porcent", "envio_KG": "Logistica",
+                           "conversion_divisa": "Conversion", "rango": config.get('res')}
+                op['lee'] = {config.get(k) for k in ('col1', 'col2', 'col3') if isinstance(config.get(k), str)}
+                op['escribe'] = {salidas[config.get('tipo')]} if salidas.get(config.get('tipo')) else set()
+
+            case 'Formula':
+                # Lo que calcula una fórmula del lote no es entrada de las siguientes
+                for formula in p['formulas']:
+                    compilada = _compilar(formula)
+                    op['lee'] |= compilada['columnas'] - op['escribe']
+                    op['escribe'] = op['escribe'] | {compilada['res']}
+
+            case 'Time':
+                config = p['config']
+                op['lee'] = {config.get(k) for k in ('dt1', 'dt2') if isinstance(config.get(k), str)}
+                op['escribe'] = {config['res']} if config.get('res') else set()
+
+            case 'TimePlus':
+                config = p['kwargs']
+                salidas = {"lead_time": "Lead_Time", "inventario": "Inventario",
+                           "proyecciones": "Proyecciones", "horarios": "Turno"}
+                op['lee'] = {config.get(k) for k in ('date1', 'date2') if isinstance(config.get(k), str)}
+                op['escribe'] = {salidas[config.get('tipo')]} if config.get('tipo') in salidas else set()
+                # La estacionalidad resume todas las filas
+                op['global'] = config.get('tipo') == 'estacionalidad'
+
+            case 'Rename' | 'StandarCol':
+                op['lee'] = op['escribe'] = {'*'}
+
+            case _:
+                # Cualquier otro paso: barrera, no se mueve nada a través de él
+                op['lee'] = op['escribe'] = {'*'}
+                op['global'] = True
+
+        if op['kernel'] is not None:
+            op['lee'] = op['lee'] | {op['kernel'][0]}
+            op['escribe'] = op['escribe'] | {op['kernel'][0]}
+
+        return op
+
+    #dos pasos consecutivos se pueden intercambiar si no comparten columnas que uno escriba
+    def _Conmutan(self, a:dict, b:dict) -> bool:
+
+        if a['filtro'] or a['global']:
+            return False
+
+        if '*' in (a['lee'] | a['escribe'] | b['lee'] | b['escribe']):
+            return False
+
+        return not (a['escribe'] & b['lee'] or b['escribe'] & a['lee'] or a['escribe'] & b['escribe'])
+
+    #optimiza el plan: quita pasos que nadie lee y adelanta los filtros de filas
+    def _Optimizar(self, plan:list, columnas:Optional[list] =None) -> list:
+
+        ops = [self._Operacion(nombre, args, kwargs) for nombre, args, kwargs in plan]
+        # Posición original de cada paso: los filtros adelantados la usan en '_Ejecutar'
+        for orden, op in enumerate(ops):
+            op['orden'] = orden
+
+        # 1. Si sabemos qué columnas se quieren al final, quitamos los pasos cuyo resultado nadie usa
+        if columnas is not None:
+            vivas = set(columnas)
+            utiles = []
+
+            for op in reversed(ops):
+                muerto = (not op['filtro'] and not op['global'] and op['escribe'] and '*' not in vivas
+                          and '*' not in op['escribe'] and not (op['escribe'] & vivas))
+                if muerto:
+                    continue
+                vivas = (vivas - op['escribe']) | op['lee']
+                utiles.append(op)
+
+            ops = utiles[::-1]
+
+        # 2. Los filtros (CleanStruct, CleanDate con drop, CleanFalse) se adelantan a los pasos
+        #    fila a fila que no tocan sus columnas, así el trabajo caro se hace sobre menos filas
+        for i in range(len(ops)):
+            j = i
+            while j > 0 and ops[j]['filtro'] and self._Conmutan(ops[j - 1], ops[j]):
+                ops[j - 1], ops[j] = ops[j], ops[j - 1]
+                j -= 1
+
+        return ops
+
+    #calcula desde qué paso se pueden descartar columnas y cuáles hacen falta
+    def _Poda(self, ops:list, columnas:Optional[list] =None):
+
+        if columnas is None:
+            return None, None
+
+        # Buscamos el primer paso a partir del cual ninguno necesita todas las columnas
+        corte = len(ops)
+        while corte > 0 and '*' not in (ops[corte - 1]['lee'] | ops[corte - 1]['escribe']):
+            corte -= 1
+
+        necesarias = set(columnas)
+        for op in ops[corte:]:
+            necesarias |= op['lee']
+
+        return corte, necesarias
+
+    #ejecuta los pasos ya optimizados sobre self.df fusionando los kernels de una misma columna
+    def _Ejecutar(self, ops:list, corte:Optional[int] =None, necesarias:Optional[set] =None) -> int:
+
+        # Columnas que se están transformando en memoria y aún no se escriben en self.df
+        pendientes = {}
+        pasadas = 0
+
+        def volcar(cols=None):
+            nonlocal pasadas
+            for col in [c for c in pendientes if cols is None or c in cols]:
+                self.df[col] = pendientes.pop(col)
+                self._Invalidar({col})
+                pasadas += 1
+
+        # Pasos que un filtro adelantado dejó atrás: {posición: {columna: es Categorical}}
+        decisiones, hechos = {}, set()
+
+        def adelantar(i, filtro):
+            # En modo directo esos pasos ven las filas de antes del filtro. La detección automática
+            # de Categorical depende de esas filas, así que se decide con ellas; los kernels que
+            # resultan Categorical (baratos: solo valores distintos) se ejecutan antes del filtro
+            # y conservan las mismas categorías que en modo directo
+            tocadas = set()
+            for k in range(i + 1, len(ops)):
+                otro = ops[k]
+                if k in hechos:
+                    continue
+                if not otro['filtro'] and otro['orden'] < filtro['orden'] and k not in decisiones:
+                    decisiones[k] = {}
+                    for col in otro['lee'] & otro['escribe']:
+                        if col in pendientes or col in self.df.columns:
+                            serie = pendientes[col] if col in pendientes else self.df[col]
+                            decisiones[k][col] = self._EsCategorica(col, serie)
+                    if otro['kernel'] is not None:
+                        col, funcion, kw = otro['kernel']
+                        if decisiones[k].get(col) and col not in tocadas and '*' not in tocadas:
+                            serie = pendientes[col] if col in pendientes else self.df[col]
+                            pendientes[col] = _kernel(serie, funcion, True, kw)
+                            hechos.add(k)
+                            continue
+                tocadas |= otro['lee'] | otro['escribe']
+
+        try:
+            for i, op in enumerate(ops):
+
+                if i == corte:
+                    volcar()
+                    self.df = self.df[[c for c in self.df.columns if c in necesarias]]
+
+                if i in hechos:
+                    continue
+
+                self._fijas = decisiones.pop(i, {})
+
+                if op['kernel'] is not None and not op['filtro']:
+                    # Encadenamos el kernel sobre la serie pendiente, sin escribir en el DataFrame
+                    col, funcion, kw = op['kernel']
+                    serie = pendientes[col] if col in pendientes else self.df[col]
+                    pendientes[col] = self._Aplicar(col, serie, funcion, **kw)
+                    continue
+
+                if op['filtro']:
+                    adelantar(i, op)
+
+                # Antes de un filtro o paso general escribimos lo que ese paso pueda necesitar
+                toca = op['lee'] | op['escribe']
+                volcar(None if op['filtro'] or '*' in toca else toca)
+                getattr(self, op['nombre'])(*op['args'], **op['kwargs'])
+                pasadas += 1
+
+        finally:
+            self._fijas = {}
+
+        volcar()
+
+        if corte == len(ops) and necesarias is not None:
+            self.df = self.df[[c for c in self.df.columns if c in necesarias]]
+
+        return pasadas
+
+    #muestra el plan optimizado sin ejecutarlo
+    def Plan(self, columnas:Optional[list] =None):
+
+        ops = self._Optimizar(self.plan, columnas)
+        print(f"\n--- 🧠 PLAN OPTIMIZADO ({len(ops)} de {len(self.plan)} pasos) ---")
+        for i, op in enumerate(ops, start=1):
+            tipo = "filtro" if op['filtro'] else "kernel" if op['kernel'] else "paso"
+            print(f"({i}) {op['nombre']} [{tipo}] lee={sorted(op['lee'])} escribe={sorted(op['escribe'])}")
+
+        return ops
+
+    #ejecuta el plan registrado en modo lazy en una sola pasada optimizada
+    def Collect(self, columnas:Optional[list] =None):
+        """
+        Ejecuta el plan del modo lazy: fusiona los pasos de una misma columna,
+        adelanta los filtros de filas y, si se indican 'columnas', solo lee y
+        calcula lo necesario para obtenerlas.
+        """
+        pasos, self.plan = self.plan, []
+        lazy, self.lazy = self.lazy, False
+        # Si algo falla el plan y el DataFrame vuelven a como estaban para corregir y reintentar
+        original, pendiente = self.df.copy(deep=False), self._pendiente
+
+        try:
+            ops = self._Optimizar(pasos, columnas)
+            corte, necesarias = self._Poda(ops, columnas)
+            ops, corte = self._RestaurarCheckpoint(pasos, ops, corte)
+
+            if self._pendiente:
+                # Si ningún paso necesita todas las columnas, solo leemos las necesarias
+                self.df = self._Leer(self.ruta, necesarias if corte == 0 else None)
+                self._pendiente = False
+                print(f"✅ Archivo '{self.ruta}' cargado con éxito.")
+                self._AutoCompactar('carga')
+
+            pasadas = self._Ejecutar(ops, corte, necesarias)
+
+            if columnas is not None:
+                self.df = self.df[[c for c in columnas if c in self.df.columns]]
+
+            print(f"🧠 Plan ejecutado: {len(pasos)} pasos -> {pasadas} escrituras sobre el DataFrame.")
+
+        except Exception as e:
+            self.plan, self.df, self._pendiente = pasos + self.plan, original, pendiente
+            print(f"❌ ERROR al ejecutar el plan: {e}. El plan se conservó ({len(self.plan)} pasos).")
+
+        finally:
+            self.lazy = lazy
+
+        return self.df
+
+    #-------------------------Cache de resultados---------------------------
+
+    #activa la caché en disco de los checkpoints del plan lazy
+    def Cache(self, carpeta:str =".cache_datatoolbox", max_bytes:int =2_000_000_000):
+
+        #Ejemplo de uso
+        # db = DataToolBox("bandeja/caos_total.csv", lazy=True)
+        # db.Cache()
+        # db.CleanStruct(); db.CleanNumb("id"); db.CleanText("nombre_cliente")
+        # db.Checkpoint("limpio")          # lo de arriba se guarda y la próxima vez no se recalcula
+        # db.CalculadoraPlus(tipo="subtotal", col1="precio", col2="cantidad")
+        # db.Collect()
+
+        """
+        Cada 'Checkpoint' del plan se guarda en parquet con una clave formada por el
+        hash del contenido del archivo de entrada, el del código de kit.py y el de
+        los pasos anteriores (con sus argumentos). Al ejecutar el plan se retoma
+        desde el último checkpoint que ya esté en caché. Si la carpeta supera
+        'max_bytes' se borran los menos usados.
+        """
+        if not os.path.exists(carpeta):
+            os.makedirs(carpeta)
+
+        self.cache_ruta = carpeta
+        self.cache_max_bytes = max_bytes
+        print(f"🗄️ Caché de resultados en: {carpeta} (máx. {max_bytes / 1e6:,.0f} MB)")
+
+    #marca un punto del plan cuyo resultado se guarda en la caché
+    def Checkpoint(self, etiqueta:Optional[str] =None, clave:Optional[str] =None):
+
+        if self.lazy:
+            self.plan.append(('Checkpoint', (etiqueta,), {}))
+            print(f"📝 Checkpoint '{etiqueta or len(self.plan)}' agregado al plan ({len(self.plan)} pasos).")
+            return
+
+        # La clave la pone Collect; sin ella (modo normal o sin caché) no hay nada que guardar
+        if clave is None or self.cache_ruta is None:
+            return
+
+        ruta = os.path.join(self.cache_ruta, f"{clave}.parquet")
+
+        try:
+            self.df.to_parquet(ruta, engine='pyarrow', compression='snappy')
+            print(f"💾 Checkpoint '{etiqueta}' guardado en caché.")
+            self._PodarCache()
+
+        except Exception as e:
+            # Columnas con tipos mezclados no se pueden guardar: se sigue sin caché
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            print(f"⚠️ No se pudo guardar el checkpoint '{etiqueta}': {e}")
+
+    #clave de caché de un checkpoint: archivo de entrada + código + pasos previos
+    def _ClaveCache(self, pasos:list) -> str:
+
+        plan = json.dumps([[nombre, list(args), kwargs] for nombre, args, kwargs in pasos],
+                          sort_keys=True, default=repr, ensure_ascii=False)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(_huella_archivo(__file__).encode())
+        h.update(self.backend.encode())
+        # Opciones de la instancia que cambian el resultado de los pasos (tipos categóricos y compactos)
+        opciones = [sorted(map(str, self.categoricas)), self.umbral_categorico, self.auto_compactar]
+        h.update(json.dumps(opciones, default=repr).encode())
+        h.update(plan.encode())
+
+        # El nombre empieza con la huella del archivo para poder invalidar por archivo
+        return f"{_huella_archivo(self.ruta)}_{h.hexdigest()}"
+
+    #busca el último checkpoint en caché y devuelve los pasos que faltan por ejecutar
+    def _RestaurarCheckpoint(self, pasos:list, ops:list, corte:Optional[int]):
+
+        if self.cache_ruta is None or not self._pendiente:
+            return ops, corte
+
+        # Los checkpoints son barreras: aparecen en 'ops' en el mismo orden que en 'pasos'
+        posiciones = [i for i, (nombre, _, _) in enumerate(pasos) if nombre == 'Checkpoint']
+        indices = [i for i, op in enumerate(ops) if op['nombre'] == 'Checkpoint']
+
+        for posicion, indice in zip(posiciones, indices):
+            ops[indice]['kwargs'] = {'clave': self._ClaveCache(pasos[:posicion])}
+
+        for indice in reversed(indices):
+
+            etiqueta = ops[indice]['args'][0] if ops[indice]['args'] else None
+            ruta = os.path.join(self.cache_ruta, f"{ops[indice]['kwargs']['clave']}.parquet")
+
+            if os.path.exists(ruta):
+                self.df = self._LeerCheckpoint(ruta)
+                self._pendiente = False
+                os.utime(ruta)  # la fecha de modificación hace de reloj LRU
+                print(f"♻️ Checkpoint '{etiqueta}' restaurado desde caché ({indice} pasos omitidos).")
+                return ops[indice + 1:], None if corte is None else max(corte - indice - 1, 0)
+
+        return ops, corte
+
+    #lee un checkpoint devolviendo cada columna a su tipo original
+    def _LeerCheckpoint(self, ruta:str) -> pd.DataFrame:
+        import pyarrow.parquet as pq
+        return _a_pandas(pq.read_table(ruta), self.backend)
+
+    #borra los checkpoints menos usados si la caché supera su tamaño máximo
+    def _PodarCache(self):
+
+        entradas = sorted(glob.glob(os.path.join(self.cache_ruta, "*.parquet")), key=os.path.getmtime)
+        total = sum(os.path.getsize(e) for e in entradas)
+
+        while entradas and total > self.cache_max_bytes:
+            viejo = entradas.pop(0)
+            total -= os.path.getsize(viejo)
+            os.remove(viejo)
+
+    #invalida la caché: toda, o solo los checkpoints de un archivo de entrada
+    def LimpiarCache(self, archivo:Optional[str] =None):
+
+        if self.cache_ruta is None:
+            print("⚠️ La caché no está activa. Usa 'Cache' primero.")
+            return 0
+
+        patron = "*.parquet" if archivo is None else f"{_huella_archivo(archivo)}_*.parquet"
+        entradas = glob.glob(os.path.join(self.cache_ruta, patron))
+
+        for entrada in entradas:
+            os.remove(entrada)
+
+        print(f"🧹 Caché limpiada: {len(entradas)} checkpoints eliminados.")
+        return len(entradas)
+
+    #-------------------------Memoria---------------------------
+
+    #tabla de memoria por columna (memory_usage con deep=True: cuenta los textos de verdad)
+    def _Memoria(self, profunda:bool =True) -> pd.DataFrame:
+
+        bytes_col = self.df.memory_usage(deep=profunda, index=False)
+        return pd.DataFrame({'tipo': self.df.dtypes.astype(str), 'MB': (bytes_col / 1e6).round(3)})
+
+    #reduce cada columna al tipo más pequeño que guarda sus valores sin pérdida
+    @_diferible
+    def Compact(self, columnas:Optional[list] =None, umbral:float =0.5, entero_min:str ='int8'):
+
+        #Ejemplo de uso
+        # db.Compact()                        # todo el DataFrame
+        # db.Compact(["cantidad", "IVA"])     # solo algunas columnas
+        # db.auto_compactar = 'final'         # se compacta solo antes de Export/ExportSQL
+
+        """
+        Enteros al entero con signo más chico que abarca su rango (nunca menos que
+        'entero_min'), decimales a float32 solo si ningún valor cambia, y textos con
+        pocos valores distintos (distintos <= umbral * filas) a Categorical.
+        Imprime y devuelve la memoria por columna antes y después.
+        """
+        antes = self._Memoria()
+
+        for columna in columnas or list(self.df.columns):
+            nuevo = _tipo_compacto(self.df[columna], umbral, entero_min)
+            if nuevo is not None:
+                self.df[columna] = self.df[columna].astype(nuevo)
+
+        despues = self._Memoria()
+        reporte = pd.DataFrame({'tipo_antes': antes['tipo'], 'tipo_despues': despues['tipo'],
+                                'MB_antes': antes['MB'], 'MB_despues': despues['MB']})
+
+        total_antes, total_despues = antes['MB'].sum(), despues['MB'].sum()
+        ahorro = 100 * (1 - total_despues / total_antes) if total_antes else 0.0
+
+        print("--- 🗜️ COMPACTACIÓN DE TIPOS ---")
+        print(reporte[reporte['tipo_antes'] != reporte['tipo_despues']].to_string() or "(sin cambios)")
+        print(f"💾 Memoria: {total_antes:,.2f} MB -> {total_despues:,.2f} MB ({ahorro:.1f}% menos)")
+
+        return reporte
+
+    #compacta solo si 'auto_compactar' coincide con el momento ('carga' o 'final')
+    def _AutoCompactar(self, momento:str) -> pd.DataFrame:
+
+        if self.auto_compactar != momento or self.df.empty:
+            return self.df
+
+        if momento == 'carga':
+            # Justo después de leer faltan los cálculos: enteros de al menos 32 bits para no desbordar
+            self.Compact(entero_min='int32')
+            return self.df
+
+        # Al exportar se compacta una copia (sin copiar los datos): self.df conserva sus tipos
+        original, lazy = self.df, self.lazy
+        self.df, self.lazy = self.df.copy(deep=False), False
+        try:
+            self.Compact(entero_min='int8')
+            return self.df
+        finally:
+            self.df, self.lazy = original, lazy
+
+    #-------------------------Motor de Normalizacion---------------------------
+
+    #perfil de calidad de datos en una sola lectura (self.df o un archivo por lotes)
+    def Perfil(self, origen=None, chunksize:int =100_000, top:int =10, ruta:Optional[str] =None) -> dict:
+
+        #Ejemplo de uso
+        # perfil = db.Perfil()                                          # el DataFrame actual
+        # perfil = db.Perfil("bandeja/gigante.csv", chunksize=500_000)  # sin cargarlo en memoria
+        # db.Perfil("bandeja/gigante.csv", ruta="perfil.json")
+
+        """
+        Por columna: nulos, distintos aproximados (HyperLogLog), mínimo/máximo,
+        cuantiles aproximados (KLL), valores más frecuentes, longitud de los
+        textos y sus patrones ('TXN-1366' -> 'A-9'). Todo sale de una sola
+        lectura de los datos; con 'origen' el archivo se recorre por lotes.
+        Devuelve un diccionario (y lo guarda como JSON si se indica 'ruta').
+        """
+        inicio = time.perf_counter()
+
+        if origen is None:
+            self._Materializar()
+            # Rebanadas del DataFrame (vistas, sin copiar) para acotar la memoria temporal
+            lotes = (self.df.iloc[i:i + chunksize] for i in range(0, max(len(self.df), 1), chunksize))
+        else:
+            lotes = self._Lotes(origen, chunksize)
+
+        columnas, filas, vueltas = {}, 0, 0
+
+        for lote in lotes:
+            for columna in lote.columns:
+                columnas.setdefault(columna, _PerfilColumna(top)).Agregar(lote[columna])
+            filas += len(lote)
+            vueltas += 1
+
+        perfil = {"filas": filas, "lotes": vueltas, "columnas": {str(c): p.Resultado() for c, p in columnas.items()}}
+        duracion = time.perf_counter() - inicio
+        print(f"🔬 Perfil: {filas} filas x {len(columnas)} columnas en {vueltas} lotes ({duracion:.2f} s).")
+
+        if ruta is not None:
+            with open(ruta, "w", encoding="utf-8") as archivo:
+                json.dump(perfil, archivo, ensure_ascii=False, indent=2)
+            print(f"🔬 Perfil guardado en: {ruta}")
+
+        return perfil
+
+    #Testear estado de lista
+    def TestData(self) -> dict:
+        self._Materializar()
+        print("--- 📊 REPORTE DE INSPECCIÓN ---")
+
+        # Una sola pasada sobre los datos: todo lo demás sale del perfil
+        perfil = self.Perfil()
+        resumen = pd.DataFrame(perfil["columnas"]).T
+
+        # 1. ¿Cuántas filas y columnas tenemos en total?
+        print(f"Dimensiones totales: {self.df.shape}")
+
+        if self.df.empty:
+            print("⚠️ El DataFrame está vacío: no hay nada que inspeccionar.")
+            return perfil
+
+        # 2. ¿Qué columnas hay y de qué tipo son? (Para ver si Precio es número)
+        print("\nTipos de datos por columna:")
+        print(self.df.dtypes)
+
+        # 3. ¿Hay valores nulos (vacíos) que se nos escaparon? Y el % de basura por columna
+        print(f"\n🔍 Mapa de huecos en el archivo:\n{resumen[['nulos', 'nulos_pct']].to_string()}")
+
+        # 4. ¿Cuánta memoria usa cada columna y a qué tipo se podría compactar? (ver 'Compact')
+        # Sin recorrer los textos object uno por uno (cuentan solo sus punteros)
+        memoria = self._Memoria(profunda=False)
+        memoria['sugerido'] = [perfil["columnas"][str(c)]["sugerido"] or "-" for c in self.df.columns]
+        print(f"\n💾 Memoria por columna (total {memoria['MB'].sum():,.2f} MB):\n{memoria.to_string()}")
+
+        # 5. Distintos, rango, mediana, valor más común y patrón dominante de cada columna
+        calidad = pd.DataFrame({
+            "distintos": resumen["distintos_aprox"],
+            "min": resumen["min"],
+            "max": resumen["max"],
+            "mediana": [c.get("cuantiles", {}).get("p50") for c in perfil["columnas"].values()],
+            "mas_comun": [c["top"][0][0] if c["top"] else None for c in perfil["columnas"].values()],
+            "patron": [c["patrones"][0][0] if c.get("patrones") else None for c in perfil["columnas"].values()],
+        })
+        print(f"\n🔬 Perfil de calidad:\n{calidad.to_string()}")
+
+        return perfil
+
+    #Limpia varias columnas a la vez repartiéndolas entre hilos o procesos
+    @_diferible
+    def CleanBatch(self, limpiezas:dict, hilos:Optional[int] =None, procesos:bool =False):
+
+        #Ejemplo de uso
+        # db.CleanBatch({
+        #     "id": "CleanNumb",
+        #     "nombre_cliente": "CleanText",
+        #     "producto": ("CleanText", {"drop": False}),
+        #     "precio": ("CleanNumb", {"tipo": "float"}),
+        #     "email": "ExtractInfo",
+        # })
+
+        """
+        Cada columna se limpia con su kernel en paralelo y los resultados se
+        asignan juntos al final. Con hilos las columnas se comparten sin copiar;
+        con procesos=True cada columna se envía (copia) a otro núcleo, útil cuando
+        el trabajo es Python puro y no libera el GIL (el script que lo llama
+        necesita 'if __name__ == "__main__":', ver '_pool').
+        """
+        trabajos = {}
+
+        for columna, limpieza in limpiezas.items():
+
+            try:
+                op = self._Operacion(*self._Limpieza(columna, limpieza))
+            except (ValueError, TypeError) as e:
+                print(f"❌ ERROR en CleanBatch ('{columna}'): {e}")
+                return self.df
+
+            if op['kernel'] is None:
+                print(f"❌ ERROR en CleanBatch ('{columna}'): solo admite limpiezas que reemplazan la columna")
+                return self.df
+
+            _, funcion, kw = op['kernel']
+            serie = self.df[columna]
+            trabajos[columna] = (serie, funcion, self._EsCategorica(columna, serie), kw, op['filtro'])
+
+        Pool = _pool(procesos)
+        with Pool(max_workers=hilos or min(len(trabajos), os.cpu_count() or 1) or 1) as pool:
+            futuros = {col: pool.submit(_kernel, *t[:4]) for col, t in trabajos.items()}
+            resultados = {col: futuro.result() for col, futuro in futuros.items()}
+
+        # Una sola asignación con todas las columnas limpias
+        self.df = self.df.assign(**resultados)
+
+        # CleanDate con drop=True: las fechas inválidas se eliminan al final
+        fechas = [col for col, t in trabajos.items() if t[4]]
+        if fechas:
+            self.df = self.df.dropna(subset=fechas)
+
+        print(f"✅ {len(resultados)} columnas limpiadas en paralelo ({'procesos' if procesos else 'hilos'}).")
+
+        return self.df
+
+    #normaliza una limpieza de CleanBatch ("CleanText" o ("CleanText", {...})) al formato del plan
+    def _Limpieza(self, columna:str, limpieza) -> tuple:
 
-            #aqui va la ruta sql
-            self.engine = create_engine(ruta)
-            print("⚡ Conexión establecida.")
+        nombre, kwargs = (limpieza, {}) if isinstance(limpieza, str) else limpieza
 
-        except Exception as e:
+        if nombre not in ('CleanText', 'CleanNumb', 'CleanDate', 'CleanDecimal', 'ExtractInfo'):
+            raise ValueError(f"'{nombre}' no es una limpieza de columna")
 
-            print(f"❌ Error al al cargar ruta: {e}")
-            self.engine = None # Aseguramos que quede limpio si falla
-            return []
-    
-    #convertir una tabla en un DataFrame
-    def CargarTabla(self, tabla:str):
+        return nombre, (columna,), kwargs
 
-        if self.engine is None:
+    #Limpiar texto
+    @_diferible
+    def CleanText(self, columna:str, drop:bool= True):
 
-            print("⚠️ Error: Primero debes llamar a 'Conexion' antes de cargar una tabla.")
-            return
+        # drop=True solo deja letras y espacios, drop=False conserva también los números
+        self.df[columna] = self._Aplicar(columna, self.df[columna], _texto, drop=drop)
 
-        try:
-            # Usamos pd.read_sql_query para extraer la información
-            # Si pasas solo el nombre de una tabla, f-string la convierte en query
-            query = f"SELECT * FROM {tabla}" if " " not in tabla else tabla
-            
-            self.df = pd.read_sql_query(query, self.engine)
-            print(f"✅ Lista '{tabla}' cargada al DataFrame ({len(self.df)} filas).")
+        print(f"✅ Columna '{columna}' normalizada al estilo estándar.")
+        print("✅ Texto limpiado")
 
-        except Exception as e:
-            print(f"❌ Error al extraer datos de SQL: {e}")
+        return self.df
 
-    # Guardar el DataFrame actual en una tabla SQL
-    def ExportSQL(self, nombre_tabla:str, modo:str ='append'):
+    #Limpiar numeros
+    @_diferible
+    def CleanNumb(self, columna:str ,sib:str=None, drop:bool= True, decimal:str ='.', tipo:str ='auto', escala:int =2):
         """
-        Exporta el contenido de self.df a la base de datos conectada.
-        modo 'append': Agrega los datos al final.
-        modo 'replace': Borra la tabla y crea una nueva con los datos actuales.
+        Convierte la columna a número conservando los decimales.
+        sib: símbolo o lista de símbolos a quitar antes (ej: ['$', '€', ',']).
+        decimal: ',' para formatos como '1.234,56'.
+        tipo: 'auto' (entero si no hay decimales), 'int', 'float', 'Int64' (entero con nulos)
+        o 'decimal' (redondeado a 'escala' decimales). drop=True rellena los nulos con 0.
         """
-        # 1. Verificación de seguridad: ¿Hay conexión y hay datos?
-        if self.engine is None:
-            print("⚠️ ERROR: No hay conexión activa. Usa 'Conexion' primero.")
-            return
-            
-        if self.df.empty:
-            print("⚠️ ERROR: El DataFrame está vacío. No hay nada que exportar.")
-            return
+        self.df[columna] = self._Aplicar(columna, self.df[columna], _numero, sib=sib, drop=drop,
+                                         decimal=decimal, tipo=tipo, escala=escala)
 
-        try:
-            # 2. Ejecutar la exportación usando el motor de la instancia
-            self.df.to_sql(nombre_tabla, con=self.engine, if_exists=modo, index=False)
-            print(f"✅ ¡Éxito! Datos exportados a la tabla '{nombre_tabla}' (Modo: {modo}).")
-            self.Reporte(f"EXPORTACIÓN SQL: Tabla '{nombre_tabla}' actualizada satisfactoriamente.")
-            
-        except Exception as e:
-            print(f"❌ ERROR al exportar a SQL: {e}")
-            self.Reporte(f"FALLO EXPORTACIÓN SQL: {e}")
+        print("✅ Numeros limpiados")
 
-    #---------------------------Utilieria-------------------------------
+        return self.df
+    
+    #calcula los límites de outliers por columna (y por grupo), en memoria o recorriendo un archivo por lotes
+    def Limites(self, columnas:Optional[list] =None, metodo:str ='iqr', factor:Optional[float] =None,
+                grupo:Optional[str] =None, origen=None, chunksize:int =100_000) -> pd.DataFrame:
 
-    #Ver lista
-    def View(self, filas:int =10, portable:bool =False, list:Optional[list] =None):
+        #Ejemplo de uso
+        # limites = db.Limites(["precio", "cantidad"])                          # exactos, del DataFrame actual
+        # limites = db.Limites(["precio"], metodo="mad", grupo="producto")
+        # limites = db.Limites(["precio"], origen="bandeja/gigante.csv")        # aproximados (KLL), una lectura
+        # db.Stream("bandeja/gigante.csv", [("CleanFalse", ["precio"], {"limites": limites})], name="limpio")
 
-        if (portable == True):
-            """Imprime el DataFrame de forma segura y rápida"""
-            print(f"\n>>> Mostrando {filas} filas de {list.shape[0]} totales:")
-            print(list.head(filas))
-            print("-" * 30)
+        """
+        Devuelve una tabla con una fila por grupo ('*' sin grupo) y las columnas
+        ('inferior', col) / ('superior', col), lista para pasar a CleanFalse.
+        Sin 'origen' usa el DataFrame actual y los estadísticos son exactos; con
+        'origen' (ruta, lista de rutas o iterador de DataFrames) el archivo se
+        recorre una sola vez con sketches KLL o momentos acumulados.
+        """
+        if isinstance(columnas, str):
+            columnas = [columnas]
+
+        if origen is None:
+            self._Materializar()
+            columnas = columnas or [c for c in self.df.select_dtypes('number').columns if c != grupo]
+            limites = _limites(self.df, columnas, metodo, factor, grupo)
         else:
-            """Imprime el DataFrame de forma segura y rápida"""
-            print(f"\n>>> Mostrando {filas} filas de {self.df.shape[0]} totales:")
-            print(self.df.head(filas))
-            print("-" * 30)
+            limites = _limites_lotes(self._Lotes(origen, chunksize), columnas, metodo, factor, grupo)
 
-    #genera documento de texto con las operaciones realizadas
-    def Reporte(self, mensaje:str):
-        from datetime import datetime
-        hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open("factura_proceso.txt", "a", encoding="utf-8") as f:
-            f.write(f"[{hora}] {mensaje}\n")
+        print(f"📏 Límites '{metodo}' calculados para {len(limites['inferior'].columns)} columnas"
+              f"{f' en {len(limites)} grupos de {grupo}' if grupo is not None else ''}.")
+        return limites
 
-    #Renombras filas de una lista
-    def Rename(self, esquema:Optional[str]):
+    #limpiar datos mentirosos o con valores fuera de las metricas
+    @_diferible
+    def CleanFalse(self, columna, metodo:str ='iqr', factor:Optional[float] =None, grupo:Optional[str] =None,
+                   limites=None):
 
         #Ejemplo de uso
-        # cambios = {
-        #     "Product_ID": "ID",
-        #     "Item": "Producto",
-        #     "Cost": "Precio"
-        # }
+        # db.CleanFalse("precio")
+        # db.CleanFalse(["precio", "cantidad", "peso"], metodo="zscore")
+        # db.CleanFalse("precio", metodo="mad", grupo="producto")
+        # db.CleanFalse("precio", limites={"precio": (0, 5_000)})
 
         """
-        Cambia el nombre de las columnas.
-        Argumento 'esquema': un diccionario {'viejo': 'nuevo'}
+        Elimina las filas con algún valor fuera de rango en cualquiera de las
+        columnas: 'iqr' (Q1/Q3 -+ 1.5*IQR), 'zscore' (media -+ 3 desv) o 'mad'
+        (mediana -+ 3.5 desv. robustas); 'factor' cambia ese multiplicador y
+        'grupo' calcula los límites por categoría. Todas las columnas se miden
+        juntas y el DataFrame se filtra una sola vez. Con 'limites' (ver
+        'Limites', o un dict {col: (min, max)}) no se calcula nada y el paso
+        se puede usar en Stream.
         """
+        columnas = [columna] if isinstance(columna, str) else list(columna)
+
         try:
-            self.df.rename(columns=esquema, inplace=True)
-            print("✅ Columnas renombradas con éxito.")
-        except Exception as e:
-            print(f"❌ Error al renombrar: {e}")
+            #normalizamos en caso que no se haya echo ya
+            for c in columnas:
+                if not pd.api.types.is_numeric_dtype(self.df[c]):
+                    self.df[c] = pd.to_numeric(self.df[c], errors='coerce')
+
+            #limpieza de lvl2
+            if limites is None:
+                limites = _limites(self.df, columnas, metodo, factor, grupo)
+            elif isinstance(limites, dict):
+                limites = _tabla_limites(pd.DataFrame({c: [limites[c][0]] for c in columnas}, index=['*']),
+                                         pd.DataFrame({c: [limites[c][1]] for c in columnas}, index=['*']))
+
+            # Solo deja los datos que están en el rango normal (un único filtro para todas las columnas)
+            fuera = _fuera(self.df, columnas, limites)
+            self.df = self.df[~fuera]
+            print(f"💀 {int(fuera.sum())} filas con outliers eliminadas en {columnas}. Los datos mentirosos han muerto.")
+
+        except (KeyError, ValueError, TypeError) as e:
+            print(f"❌ ERROR al limpiar outliers: {e}")
 
-    #refrescamos o asignamos una lista al dataframe
-    def Refresh(self, archivo:str):
+        return self.df
 
-        try:
+    #conjunto de hashes para deduplicar (en memoria, o el de la carpeta indicada abierto una sola vez)
+    def _Conjunto(self, persistente:Optional[str] =None) -> ConjuntoHashes:
 
-            print(f"📂 Cargando CSV: {archivo}.")
-            self.df = pd.read_csv(f"{archivo}")
+        if persistente is None:
+            return ConjuntoHashes()
 
-        except Exception as e:
-            print(f"❌ Error al al cargar archivo: {e}")
-            return []
-    
-    #exportar a los formatos disponibles
-    def Export(self, name:str= "archivo", carpeta:str= "./", formato:str = "csv"):
+        if persistente not in self.conjuntos:
+            self.conjuntos[persistente] = ConjuntoHashes(persistente)
+        return self.conjuntos[persistente]
 
-        try:
+    #elimina o marca filas repetidas comparando solo el hash de sus columnas clave
+    @_diferible
+    def Dedup(self, claves=None, accion:str ='eliminar', persistente:Optional[str] =None,
+              columna:str ='duplicado'):
 
-            if not os.path.exists(carpeta):
-                os.makedirs(carpeta)
-                
-            match (formato):
-            
-                case 'csv':
-                    ruta_completa = os.path.join(carpeta, f"{name}.csv")
-                    self.df.to_csv(ruta_completa, index=False)
-                case 'parquet':
-                    ruta_completa = os.path.join(carpeta, f"{name}.parquet")
-                    self.df.to_parquet(ruta_completa, engine='pyarrow', compression='snappy')
-                case 'json':
-                    ruta_completa = os.path.join(carpeta, f"{name}.json")
-                    self.df.to_json(ruta_completa, orient='records', indent=4)
-                case 'excel':
-                    ruta_completa = os.path.join(carpeta, f"{name}.excel")
-                    self.df.to_excel(ruta_completa, sheet_name=f"{name}")
-            
-            print(f"✅ ¡Éxito! Archivo guardado en: {ruta_completa}")
-            self.Reporte(f"Exportación exitosa: {name}.{formato}") # Usando tu sistema de log
-            
-        except PermissionError:
-            print(f"❌ ERROR: No se pudo guardar. Cierra el archivo '{name}.{formato}' si lo tienes abierto en Excel.")
-        except Exception as e:
-            print(f"❌ ERROR INESPERADO al exportar: {e}")
-            self.Reporte(f"Fallo en exportación: {e}")
+        #Ejemplo de uso
+        # db.Dedup("id")
+        # db.Dedup(["id", "fecha_compra"], accion="marcar")            # columna 'duplicado' = True/False
+        # pasos = [("CleanText", "email"), ("Dedup", "email", {"persistente": ".hashes_clientes"})]
+        # db.Stream("bandeja/gigante.csv", pasos, name="clientes")     # sin repetidos entre lotes
 
-    #-------------------------Motor de Normalizacion---------------------------
+        """
+        Cada fila se resume en un hash uint64 de sus columnas clave (todas si
+        'claves' es None) y se conserva la primera aparición. Con 'persistente'
+        (una carpeta) los hashes ya vistos se guardan en disco y valen entre
+        lotes de Stream, archivos de MergePlus y ejecuciones distintas.
+        En memoria solo quedan 8 bytes por clave distinta.
+        """
+        try:
+            if accion not in ('eliminar', 'marcar'):
+                raise ValueError(f"Acción '{accion}' no soportada. Usa 'eliminar' o 'marcar'.")
 
-    #Testear estado de lista
-    def TestData(self):
-        print("--- 📊 REPORTE DE INSPECCIÓN ---")
+            claves = list(self.df.columns) if claves is None else [claves] if isinstance(claves, str) else list(claves)
+            conjunto = self._Conjunto(persistente)
+            primeros = conjunto.Nuevos(_hash_filas(self.df, claves))
+            repetidos = len(primeros) - int(primeros.sum())
 
-        # 1. ¿Cuántas filas y columnas tenemos en total?
-        print(f"Dimensiones totales: {self.df.shape}") 
+            if accion == 'eliminar':
+                self.df = self.df[primeros]
+                print(f"🧬 {repetidos} filas duplicadas eliminadas por {claves}.")
+            else:
+                self.df[columna] = ~primeros
+                print(f"🧬 {repetidos} filas duplicadas marcadas en '{columna}' por {claves}.")
 
-        # 2. ¿Qué columnas hay y de qué tipo son? (Para ver si Precio es número)
-        print("\nTipos de datos por columna:")
-        print(self.df.dtypes)
+            if persistente is not None:
+                print(f"🧬 Claves registradas en '{persistente}': {len(conjunto)}")
 
-        # 3. ¿Hay valores nulos (vacíos) que se nos escaparon?
-        print("\nConteo de valores nulos:")
-        print(self.df.isnull().sum())
+        except (KeyError, ValueError) as e:
+            print(f"❌ ERROR al deduplicar: {e}")
 
-        #test de nulos
-        resumen_nulos = self.df.isnull().sum()
-        print(f"🔍 Mapa de huecos en el archivo:\n{resumen_nulos}")
-        # Esto te dice el % de basura por columna
-        print(f"\n📊 Porcentaje de suciedad:\n{(self.df.isnull().sum() / len(self.df)) * 100}%")
+        return self.df
 
-        # 4. Un resumen estadístico (Solo para las columnas numéricas como Precio)
-        #print("\nResumen matemático del Precio:")
-        #print(self.df.describe())
+    #separa IDs como 'TXN-1366' en prefijo y número con tipos compactos
+    @_diferible
+    def CleanID(self, columna:str, prefijo:Optional[str] =None, numero:Optional[str] =None, drop:bool =False):
 
-    #Limpiar texto
-    def CleanText(self, columna:str, drop:bool= True):
+        #Ejemplo de uso
+        # db.CleanID("id")                                   # id_prefijo = 'TXN' (category), id_num = 1366 (int16)
+        # db.CleanID("id", prefijo="serie", numero="folio", drop=True)
 
-        if drop:
+        """
+        Reconoce 'TXN-1366', 'txn 1366', 'A#07' o '1366': el prefijo queda como
+        categoría en mayúsculas y el número como el entero más chico que lo
+        guarda (Int nullable si hay IDs que no se pudieron leer). Con drop=True
+        se elimina la columna original.
+        """
+        prefijo = prefijo or f"{columna}_prefijo"
+        numero = numero or f"{columna}_num"
 
-            # 2. 🔥 NUEVO: Eliminar símbolos (solo deja letras y espacios)
-            self.df[columna] = self.df[columna].str.replace(r'[^a-zA-Z\s]', '', regex=True)
-        
-        else:
+        try:
+            self.df[prefijo], self.df[numero] = _separar_id(self.df[columna])
+            invalidos = int(self.df[numero].isna().sum())
 
-            # 2. 🔥 NUEVO: Eliminar símbolos (solo deja letras, números y espacios)
-            self.df[columna] = self.df[columna].str.replace(r'[^a-zA-Z0-9\s]', '', regex=True)
+            if drop:
+                self.df = self.df.drop(columns=columna)
 
-        # A. Limpiar espacios vacíos en los nombres y poner la primera en Mayúscula
-        # Quita espacios, pone todo en minúsculas y elimina acentos
-        self.df[columna] = self.df[columna].astype(str).str.strip().str.lower().str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('utf-8')
-        
-        # .str.strip() quita espacios, .str.capitalize() pone la primera en mayúscula
-        self.df[columna] = self.df[columna].str.strip().str.capitalize()
+            print(f"🪪 IDs de '{columna}' separados en '{prefijo}' ({len(self.df[prefijo].cat.categories)} prefijos) "
+                  f"y '{numero}' ({self.df[numero].dtype}). Sin formato reconocible: {invalidos}.")
 
-        print(f"✅ Columna '{columna}' normalizada al estilo estándar.")
-        print("✅ Texto limpiado")
+        except KeyError as e:
+            print(f"❌ ERROR: No existe la columna {e}")
 
-        return self.df
+    #agrupa variantes de un mismo nombre ('Maria', 'Mariaa', 'Marai') con un ID de grupo
+    @_diferible
+    def Fuzzy(self, columna:str, res:str ='cluster_id', similitud:float =0.8, ventana:int =8,
+              representante:Optional[str] =None):
 
-    #Limpiar numeros
-    def CleanNumb(self, columna:str ,sib:str=None, drop:bool= True):
+        #Ejemplo de uso
+        # db.CleanText("nombre_cliente")
+        # db.Fuzzy("nombre_cliente")                                   # cluster_id por variante
+        # db.Fuzzy("nombre_cliente", similitud=0.85, representante="cliente")
 
-        #limpiamos los numeros de simbolos
-        if sib is not None:
-            if self.df[columna].dtype == 'object':
-                self.df[columna] = self.df[columna].str.replace(sib, '', regex=False)
-        #eliminamos cualquier presencia de letra
-        # Extrae solo los números (0-9) y los une.
-        self.df[columna] = self.df[columna].astype(str).str.extract(r'(\d+)').astype(float)
-        #transformamor caracteres en numeros
-        self.df[columna] = pd.to_numeric(self.df[columna], errors='coerce')
+        """
+        Trabaja sobre los valores distintos: cada uno se compara solo con sus
+        vecinos (mismo bloque fonético y 'ventana' vecinos al ordenar el texto
+        al derecho y al revés), así el costo crece casi lineal. Dos textos se
+        unen si 1 - distancia / largo >= 'similitud' (Levenshtein, donde dos
+        letras cambiadas de lugar cuentan como un error); los textos de hasta
+        5 letras además deben tener la misma clave fonética y los de más de 255
+        no se comparan. 'res' recibe el ID del grupo (-1 en nulos) y
+        'representante' la variante más frecuente.
+        """
+        try:
+            serie = self.df[columna]
+            codigos, unicos = pd.factorize(serie)
+            textos = pd.Series(np.asarray(unicos, dtype=object)).astype(str)
 
-        if drop:
-            #eliminamos nulos
-            self.df[columna] = self.df[columna].fillna(0)
-        
-        #convertir en entero
-        self.df[columna] = self.df[columna].round(0).astype(int)
+            inicio = time.perf_counter()
+            grupos, comparados = _agrupar_textos(textos, similitud, ventana)
+            grupos, raices = pd.factorize(grupos)
 
-        print("✅ Numeros limpiados")
+            ids = pd.Series(np.append(grupos, -1)[codigos], index=serie.index)
+            self.df[res] = ids.astype(_tipo_compacto(ids) or ids.dtype)
 
-        return self.df
-    
-    #limpiar datos mentirosos o con valores fuera de las metricas
-    def CleanFalse(self, columna:str):
-        
-        #normalizamos en caso que no se haya echo ya
-        self.df[columna] = pd.to_numeric(self.df[columna], errors='coerce')
+            if representante is not None:
+                # La variante con más filas de cada grupo
+                conteos = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+                orden = np.lexsort((-conteos, grupos))
+                primero = orden[np.r_[True, grupos[orden][1:] != grupos[orden][:-1]]]
+                nombres = np.append(textos.to_numpy()[primero][grupos], np.nan)
+                self.df[representante] = pd.Categorical(nombres[codigos])
 
-        #limpieza de lvl2
-        Q1 = self.df[columna].quantile(0.25)
-        Q3 = self.df[columna].quantile(0.75)
-        IQR = Q3 - Q1
-        # Solo deja los datos que están en el rango normal
-        self.df = self.df[~((self.df[columna] < (Q1 - 1.5 * IQR)) | (self.df[columna] > (Q3 + 1.5 * IQR)))]
-        print(f"💀 Outliers eliminados en {columna}. Los datos mentirosos han muerto.")
+            print(f"🧩 '{columna}': {len(unicos)} valores distintos -> {len(raices)} grupos "
+                  f"({comparados} comparaciones, {time.perf_counter() - inicio:.2f} s).")
 
-        return self.df
+        except KeyError as e:
+            print(f"❌ ERROR: No existe la columna {e}")
 
     #Acomodar fechas
-    def CleanDate(self, fecha:str, drop:str= True):
-        
-        ##Eliminamos espacios
-        self.df[fecha] = self.df[fecha].astype(str).str.strip() # Quita espacios
-        # Convierte a Fecha
-        self.df[fecha] = pd.to_datetime(self.df[fecha], errors='coerce')
+    @_diferible
+    def CleanDate(self, fecha:str, drop:str= True, formatos:Optional[list] =None):
+        """
+        Convierte la columna a fecha detectando los formatos dominantes sobre una
+        muestra. 'formatos' fija la lista a usar (ej: ['%d/%m/%Y']) y desactiva el
+        parser general para los valores que no encajen.
+        """
+        # Quita espacios y convierte a Fecha
+        reporte = {}
+        self.df[fecha] = _fecha(self.df[fecha], formatos, reporte)
+        print("📅 Formatos detectados: " + " | ".join(f"{f}: {n} filas" for f, n in reporte.items()))
 
         if drop:
 
@@ -378,13 +3701,15 @@ class DataToolBox:
         return self.df
 
     #Limitar o eliminar
+    @_diferible
     def CleanDecimal(self, columna, decimales:int = 2):
         # En kit.py, dentro de un nuevo método o en CalculadoraPlus
-        self.df[columna] = pd.to_numeric(self.df[columna], errors='coerce').round(decimales)
+        self.df[columna] = _decimal(self.df[columna], decimales)
             
         print(f"🎯 Columna '{columna}' redondeada a {decimales} decimales.")
 
     # Limpieza estructural: Eliminar filas inservibles o con todo nulos
+    @_diferible
     def CleanStruct(self):
 
         # 1. Eliminamos filas donde TODOS los valores sean nulos
@@ -395,14 +3720,60 @@ class DataToolBox:
         despues = len(self.df)
         print(f"🧹 Estructura limpiada: Se eliminaron {antes - despues} filas vacías.")
 
+    #columnas que escribe ExtractInfo -> patrón de cada una
+    def _Extracciones(self, columna:str, patron:str, extraer=None) -> dict:
+
+        if extraer is None:
+            return {columna: patron}
+        if isinstance(extraer, str):
+            extraer = [extraer]
+        if isinstance(extraer, dict):
+            return dict(extraer)
+        return {f"{columna}_{nombre}": nombre for nombre in extraer}
+
     #recuperar correo y numeros cuando la informacion en la columna sea ilegible
-    def ExtractInfo(self, columna:str, patron:str=r"[\w\.-]+@[\w\.-]+"): 
+    @_diferible
+    def ExtractInfo(self, columna:str, patron:str ='email', extraer=None, validar:bool =False):
+
+        #Ejemplo de uso
+        # db.ExtractInfo("email")                                          # deja solo el correo
+        # db.ExtractInfo("notas", patron=r"TXN-\d+")                       # cualquier regex
+        # db.ExtractInfo("contacto", extraer=["email", "telefono"], validar=True)
+        #   -> contacto_email, contacto_telefono, contacto_email_valido, contacto_telefono_valido
+        # db.ExtractInfo("notas", extraer={"folio": "id", "total": "monto"})
+
+        """
+        Sin 'extraer' reemplaza la columna por la primera coincidencia de
+        'patron' (email, telefono, id, monto o una regex propia). Con 'extraer'
+        (lista de patrones o {columna_nueva: patron}) crea una columna por
+        patrón en una sola pasada por los valores distintos. Las celdas sin el
+        texto obligatorio del patrón (ej: '@' en email) no pasan por la regex.
+        validar=True agrega '<columna>_valido' con la validación del patrón.
+        """
+        try:
+            destinos = self._Extracciones(columna, patron, extraer)
+            patrones = {res: _extractor(nombre) for res, nombre in destinos.items()}
+
+            if extraer is None:
+                # Por defecto busca emails; como kernel respeta las columnas categóricas
+                regex, literal, _ = patrones[columna]
+                resultados = [self._Aplicar(columna, self.df[columna], _extraer, patron=regex, literal=literal)]
+            else:
+                resultados = _extraer_varios(self.df[columna], [(r, l) for r, l, _ in patrones.values()])
+
+            for res, resultado in zip(destinos, resultados):
+                self.df[res] = resultado
+                if validar:
+                    self.df[f"{res}_valido"] = _validar(resultado, patrones[res][2])
 
-        # Por defecto busca emails, pero puedes pasarle cualquier patron
-        self.df[columna] = self.df[columna].str.findall(patron).str[0]
-        print("📧 Información extraída mediante patrones complejos.")
+            print("📧 Información extraída mediante patrones complejos: "
+                  + " | ".join(f"{res}: {int(r.notna().sum())}" for res, r in zip(destinos, resultados)))
+
+        except (KeyError, re.error) as e:
+            print(f"❌ ERROR al extraer información: {e}")
           
     #cambia el nombre de columnas de acuerdo al orden que tengan
+    @_diferible
     def StandarCol(self, nuevos_nombres:str):
         """
         Fuerza el nombre de las columnas 
@@ -437,6 +3808,9 @@ class DataToolBox:
             print("❌ ERROR: Solo puedo unir con otro objeto DataToolBox")
             return
 
+        self._Materializar()
+        add._Materializar()
+
         # 2. Verificamos que las columnas coincidan
         if list(self.df.columns) != list(add.df.columns):
             print("⚠️ ALERTA: Las columnas no coinciden. El resultado tendrá valores vacíos (NaN).")
@@ -446,39 +3820,77 @@ class DataToolBox:
         print("🚀 Unión completada con éxito.")
 
     #unifacion de lista con extendido
-    def MergePlus(self, rutas:str, lado:str='v'):
+    def MergePlus(self, rutas:str, lado:str='v', hilos:int =8, procesos:bool =False, claves=None,
+                  persistente:Optional[str] =None):
+        """
+        Lee los archivos en paralelo ('hilos' a la vez, o en procesos si
+        procesos=True: el script que lo llama necesita 'if __name__ ==
+        "__main__":', ver '_pool'), valida sus columnas contra el DataFrame actual (o el
+        primer archivo si está vacío) y los une con una sola concatenación.
+        Los que fallan o no coinciden van a 'rezagados'. Con 'claves' (unión
+        vertical) cada archivo llega sin las filas ya vistas en el DataFrame
+        o en los archivos anteriores (ver 'Dedup'; 'persistente' guarda los
+        hashes en disco para las siguientes uniones).
+        """
         #aqui se almacenaran las listas que no se puedan integrar
         rezagados=[]
 
         if isinstance(rutas, str):
             rutas = [rutas]
-        
-        for nombre in rutas:
-            # 1. Filtro rápido: ¿Soy yo mismo? -> Salto
-            if self.ruta == nombre:
-                continue
-                
-            # 2. El paracaídas: Si algo falla adentro, no explota el código
-            try:
-                nuevo_envio = DataToolBox(nombre)
-                
-                # 3. Validación de columnas
-                if list(self.df.columns) == list(nuevo_envio.df.columns):
-                    self.Merge(nuevo_envio, lado)
-                # Dentro de MergePlus en kit.py
-                elif list(self.df.columns) != list(nuevo_envio.df.columns):
-                    print("⚠️ ¡Cuidado! Las columnas no coinciden exactamente.")
-                    input("Pulse cualquier tecla pra continuar: ")
-                else:
-                    print ("Error inesperado")
-                    input("Pulse cualquier tecla pra continuar: ")
-            
-            except Exception as e:
+
+        self._Materializar()
+
+        # 1. Filtro rápido: ¿Soy yo mismo? -> Salto
+        rutas = [nombre for nombre in rutas if nombre != self.ruta]
+
+        # 2. El paracaídas: si un archivo falla no detiene a los demás (_leer_seguro)
+        # Con procesos cada lectura usa su propio núcleo aunque el parser no libere el GIL
+        Pool = _pool(procesos)
+        with Pool(max_workers=max(1, min(hilos, len(rutas) or 1))) as pool:
+            leidos = list(pool.map(functools.partial(_leer_seguro, backend=self.backend), rutas))
+
+        # 3. Validación de columnas contra un esquema de referencia
+        referencia = list(self.df.columns) if len(self.df.columns) else None
+        lotes = []
+
+        for nombre, (df, error) in zip(rutas, leidos):
+
+            if error is not None:
                 # Si el archivo no existe o está corrupto
-                print(f"❌ Error con {nombre}: {e}")
+                print(f"❌ Error con {nombre}: {error}")
                 rezagados.append(nombre)
-        
-        # 4. Aqui se imprimen los rezagados por unificar
+                continue
+
+            if referencia is None:
+                referencia = list(df.columns)
+
+            if list(df.columns) != referencia:
+                print(f"⚠️ ¡Cuidado! Las columnas de {nombre} no coinciden exactamente.")
+                rezagados.append(nombre)
+                continue
+
+            lotes.append(df)
+
+        lado = 1 if lado in ('h', 'H') else 0
+        base = [self.df] if len(self.df.columns) else []
+
+        # Duplicados entre archivos: solo se guardan los hashes, las filas repetidas no llegan a unirse
+        if claves is not None and lado == 0 and lotes:
+            claves = [claves] if isinstance(claves, str) else list(claves)
+            conjunto = self._Conjunto(persistente)
+            # El DataFrame actual no se filtra (para eso está 'Dedup'), solo registra sus claves
+            for df in base:
+                conjunto.Nuevos(_hash_filas(df, claves))
+            antes = sum(len(df) for df in lotes)
+            lotes = [df[conjunto.Nuevos(_hash_filas(df, claves))] for df in lotes]
+            print(f"🧬 {antes - sum(len(df) for df in lotes)} filas duplicadas descartadas al unir.")
+
+        # 4. Una sola concatenación al final (no una por archivo)
+        if lotes:
+            self.df = pd.concat(base + lotes, ignore_index=True, axis=lado)
+            print(f"🚀 Unión completada con éxito: {len(lotes)} archivos en una sola concatenación.")
+
+        # 5. Aqui se imprimen los rezagados por unificar
         if rezagados: # 👈 Esto significa: "Si la lista NO está vacía"
             print("\n⚠️ Los siguientes archivos requieren revisión:")
             for archivo in rezagados:
@@ -486,9 +3898,53 @@ class DataToolBox:
         else: # 👈 Esto significa: "Si la lista está vacía"
             print("✨ ¡Éxito total! No hubo rezagados.\n")
 
+        return rezagados
+
+    #---------------------------Cache de fechas-------------------------------
+
+    #olvida las fechas convertidas de las columnas indicadas ('*' = todas)
+    def _Invalidar(self, columnas:set):
+
+        if '*' in columnas:
+            self._fechas = {}
+        else:
+            for columna in columnas:
+                self._fechas.pop(columna, None)
+
+    #devuelve la columna convertida a fecha, convirtiéndola solo la primera vez (o si la columna cambió)
+    def _Fecha(self, columna:str) -> pd.Series:
+
+        serie = self.df[columna]
+        guardada = self._fechas.get(columna)
+
+        # 'db.df[col] = ...' o 'db.df.loc[...] = ...' no pasan por el setter de df: se compara la columna
+        # con la que se convirtió (guardarla hace que Copy-on-Write escriba cualquier cambio en otra memoria)
+        if guardada is None or not _misma_columna(serie, guardada['fuente']):
+            self._fechas[columna] = {'fuente': serie, 'fecha': _fecha(serie)}
+
+        return self._fechas[columna]['fecha']
+
+    #campo derivado de una fecha (year, month, dayofweek, week, hour, day_name) calculado una sola vez
+    def _Campo(self, columna:str, campo:str) -> pd.Series:
+
+        fecha = self._Fecha(columna)
+        campos = self._fechas[columna]
+
+        if campo not in campos:
+            match campo:
+                case 'week':
+                    campos[campo] = fecha.dt.isocalendar().week
+                case 'day_name':
+                    campos[campo] = fecha.dt.day_name()
+                case _:
+                    campos[campo] = getattr(fecha.dt, campo)
+
+        return campos[campo]
+
     #---------------------------Motor de calculo-------------------------------
 
     #Operaciones y formulas de calculo
+    @_diferible
     def Calculadora(self, config:Optional[str]):
 
         op = config.get('op')
@@ -584,143 +4040,60 @@ class DataToolBox:
             self.Reporte(f"OPERACION  REALIZADA: {op}")
             return resultado_calculado # <--- Retorna el resultado para operaciones encadenadas
 
-    #calculo por formulas
-    def CalculadoraPlus(self, **kwargs:Optional[str]):
-
-        try:
-            # --- Recorremos los casos ---
-            tipo = kwargs.get('tipo')
-                        
-            match tipo:
-
-                case "costo_unitario":
-                    #Subtotal: cantidad vendida + cantidad total 
-
-                    self.Calculadora({
-                    "op" : "/",
-                    "res" : "Costo_unitario",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
-
-                case "subtotal":
-                    #Subtotal: cantidad * precio 
-
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "Subtotal",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
-
-                case "iva":
-                    # Fórmula: Subtotal * tasa
-                    
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "IVA",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2', 0.16),             
-                    "pass" : True                
-                    })
-                    
-                case "descuento":
-                    # Fórmula: Precio * (1 - pct) (donde 0.10 son como 10%)
-
-                    pct = self.Calculadora({
-                    "op" : "-",
-                    "res" : "",
-                    "col1" : 1,              
-                    "col2" : kwargs.get('col2', 0.10),              
-                    })
+    #evalúa fórmulas ya validadas y escribe sus columnas (sin registrar el paso)
+    def _Formulas(self, formulas:list, bloque:int =65_536) -> dict:
 
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "Descuento",
-                    "col1" : kwargs.get('col1'),              
-                    "col2" : pct,              
-                    })
+        salidas = _evaluar(self.df, formulas, bloque)
+        for columna, valores in salidas.items():
+            self.df[columna] = valores
+            print(f"✅ Columna '{columna}' creada en el DataFrame.")
 
-                case "precio_final":
-                    # Fórmula: Precio Final: Subtotal + Impuestos - Descuentos
-                    
-                    op1=self.Calculadora({
-                    "op" : "+",
-                    "res" : "",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
+        return salidas
 
-                    self.Calculadora({
-                    "op" : "-",
-                    "res" : "Precio_final",
-                    "col1" : op1,
-                    "col2" : kwargs.get('col3', 0.10)                
-                    })
+    #calcula columnas con fórmulas escritas como texto, todas en una sola pasada
+    @_diferible
+    def Formula(self, *formulas:str, bloque:int =65_536):
 
-                case "margen_bruto":
-                    # Fórmula: Precio de venta - Costo
-                    
-                    self.Calculadora({
-                    "op" : "-",
-                    "res" : "Margen_bruto",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
-                    
-                case "margen_pct":
-                    # Fórmula: (Margen / Ventas) * 100
-
-                    margen = self.Calculadora({
-                    "op" : "/",
-                    "res" : "",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
+        #Ejemplo de uso
+        # db.Formula("Precio_final = Subtotal + IVA - Descuento")
+        # db.Formula("Subtotal = precio * cantidad",
+        #            "IVA = Subtotal * 0.16",
+        #            "`Margen %` = (precio - costo) / precio * 100")
 
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "Margen",
-                    "col1" : margen,
-                    "col2" : 100               
-                    })
+        """
+        Cada fórmula 'Resultado = expresión' admite columnas, números, + - * / ** %,
+        paréntesis y abs/sqrt/log/exp/minimum/maximum (columnas con espacios entre
+        `comillas`). Se compilan a ufuncs de NumPy y se evalúan juntas por bloques
+        de 'bloque' filas: cada columna de entrada se recorre una vez y no se crean
+        columnas intermedias. Una fórmula puede usar el resultado de las anteriores.
+        Como en Calculadora, dividir entre 0 equivale a dividir entre 1.
+        """
+        try:
+            salidas = self._Formulas(list(formulas), bloque)
+            self.Reporte(f"FORMULAS REALIZADAS: {' | '.join(formulas)}")
+            return salidas
 
-                case "margen_porcent":
-                    # Fórmula: (Margen / Precio de Venta) * 100.
-                    
-                    op1=self.Calculadora({
-                    "op" : "/",
-                    "res" : "",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2')                
-                    })
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ ERROR en la fórmula: {e}")
+            self.Reporte(f"FORMULAS || ERROR: {e}")
 
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "margen_porcent",
-                    "col1" : op1,
-                    "col2" : 100               
-                    })
+    #calculo por formulas
+    @_diferible
+    def CalculadoraPlus(self, **kwargs:Optional[str]):
 
-                case "envio_KG":
-                    # Fórmula: Peso * Tarifa_por_Kg
-                    
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "Logistica",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2', 15)                
-                    })
+        try:
+            # --- Recorremos los casos ---
+            tipo = kwargs.get('tipo')
+                        
+            match tipo:
 
-                case "conversion_divisa":
-                    # Fórmula: Subtotal * tasa
-                    
-                    self.Calculadora({
-                    "op" : "*",
-                    "res" : "Conversion",
-                    "col1" : kwargs.get('col1'),
-                    "col2" : kwargs.get('col2', 1)                
-                    })
+                case _ if tipo in _PRESETS:
+                    # Toda la fórmula se evalúa fusionada, sin Series intermedias (ver '_compilar')
+                    # costo_unitario: col1 / col2 | subtotal: col1 * col2 | iva: col1 * tasa
+                    # descuento: col1 * (1 - pct) | precio_final: col1 + col2 - col3
+                    # margen_bruto: col1 - col2 | margen_pct / margen_porcent: col1 / col2 * 100
+                    # envio_KG: peso * tarifa | conversion_divisa: col1 * tasa
+                    self._Formulas([_preset(tipo, kwargs)])
 
                 case "rango":
 
@@ -732,17 +4105,20 @@ class DataToolBox:
 
                     # Bloque: Creación de categoría rápida
                     resultado_calculado = np.where(self.df[col1] > limite, "Mayor", 'Menor')
+                    # Para la bitácora solo un resumen, nunca el arreglo completo
+                    mayores = int((resultado_calculado == "Mayor").sum())
+                    resumen = f"Mayor: {mayores}, Menor: {len(resultado_calculado) - mayores} (limite {limite})"
 
                     if(res):
 
                         self.df[res] = resultado_calculado
                         print(f"✅ Columna '{res}' creada en el DataFrame.")
-                        self.Reporte(f"OPERACION REALIZADA: EN LA COLUMNA {col1}={resultado_calculado} || COLUMNA CREADA: {res}")
+                        self.Reporte(f"OPERACION REALIZADA: EN LA COLUMNA {col1}={resumen} || COLUMNA CREADA: {res}")
                         return resultado_calculado # <--- Retorna el resultado para operaciones encadenadas
 
                     else:
                         print(f"✅ Operacion realizada.")
-                        self.Reporte(f"OPERACION  REALIZADA: EN LA COLUMNA {col1}={resultado_calculado}")
+                        self.Reporte(f"OPERACION  REALIZADA: EN LA COLUMNA {col1}={resumen}")
                         return resultado_calculado # <--- Retorna el resultado para operaciones encadenadas
 
                 case _:
@@ -757,6 +4133,7 @@ class DataToolBox:
             self.Reporte(f"OPERACION REALIZADA: {tipo} || ERROR: {e}")
 
     #operaciones con fechas
+    @_diferible
     def Time(self, config:Optional[str]):
 
         #asignamos las variables
@@ -807,8 +4184,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el número (0-6) - Atributo sin ()
-                    col_fecha = pd.to_datetime(dt1, errors='coerce')
-                    date = col_fecha.dt.dayofweek
+                    date = self._Campo(config.get('dt1'), 'dayofweek')
                 except Exception as e:
                     print(f"❌ Error inesperado al extraer dias: {e}")
                     date = None
@@ -817,8 +4193,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el nombre (Texto) - Función con ()
-                    col_fecha = pd.to_datetime(dt1, errors='coerce')
-                    date = col_fecha.dt.day_name()
+                    date = self._Campo(config.get('dt1'), 'day_name')
                 except Exception as e:
                     print(f"❌ Error inesperado al extraer dias: {e}")
                     date = None
@@ -827,8 +4202,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el número de semana del año (1-53)
-                    col_fecha = pd.to_datetime(dt1, errors='coerce')
-                    date = col_fecha.dt.isocalendar().week
+                    date = self._Campo(config.get('dt1'), 'week')
                 except Exception as e:
                     print(f"❌ Error inesperado al extraer semanas: {e}")
                     date = None
@@ -837,8 +4211,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el número del mes (1-12)
-                    col_fecha = pd.to_datetime(dt1, errors='coerce')
-                    date = col_fecha.dt.month
+                    date = self._Campo(config.get('dt1'), 'month')
                 except Exception as e:
                     print(f"❌ Error inesperado al extraer meses: {e}")
                     date = None
@@ -847,8 +4220,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el número del mes (1-12)
-                    hora = pd.to_datetime(dt1, errors='coerce')
-                    date = hora.dt.hour
+                    date = self._Campo(config.get('dt1'), 'hour')
                 except Exception as e:
                     print(f"❌ Error inesperado al extraer las horas: {e}")
                     date = None
@@ -857,8 +4229,7 @@ class DataToolBox:
 
                 try:
                     ## Extraemos el año (ej. 2024, 2025)
-                    fecha = pd.to_datetime(dt1, errors='coerce')
-                    date = fecha.dt.year
+                    date = self._Campo(config.get('dt1'), 'year')
                 except Exception as e:
                     print(f"❌ Error inesperado al al extraer por fecha: {e}")
                     date = None
@@ -879,6 +4250,7 @@ class DataToolBox:
             return date # <--- Retorna el resultado para operaciones encadenadas
 
     #operaciones con fecha
+    @_diferible
     def TimePlus(self, **kwargs:Optional[str]):
 
         try:
@@ -929,13 +4301,11 @@ class DataToolBox:
 
                     print("\n--- 📊 RESUMEN DE ESTACIONALIDAD ---")
 
-                    year = self.Time({
-                        'op' : 'Y',
-                        'dt1' : kwargs.get('date1')
-                    })
+                    # 1. La fecha se convierte una sola vez y los campos quedan en caché
+                    year = self._Campo(kwargs.get('date1'), 'year')
 
                     # 2. Resumen compacto (sin crear columnas nuevas en el df principal)
-                    conteo_year = self.df[kwargs.get('date1')].dt.year.value_counts().sort_index()
+                    conteo_year = year.value_counts().sort_index()
                     
                     # 3. Solo imprimimos el resumen
                     print("\n--- 📊 ACTIVIDAD ANUAL ---")
@@ -944,29 +4314,24 @@ class DataToolBox:
 
                     #----------------- por mes --------------------
 
-                    meses = self.Time({
-                        'op' : 'M',
-                        'dt1' : kwargs.get('date1')
-                    })
+                    meses = self._Campo(kwargs.get('date1'), 'month')
 
                     # 2. Resumen compacto (sin crear columnas nuevas en el df principal)
-                    conteo_mes = self.df[kwargs.get('date1')].dt.month.value_counts().sort_index()
+                    conteo_mes = meses.value_counts().sort_index()
                     
                     # 3. Solo imprimimos el resumen
                     print("\n--- 📊 ACTIVIDAD MENSUAL ---")
                     for mes, total in conteo_mes.items():
-                        print(f"Mes {mes}: {total} ventas")
+                        print(f"Mes {int(mes)}: {total} ventas")
 
                     #----------------- por semana -------------------------------
 
-                    dias = self.Time({
-                        'op' : 'D',
-                        'dt1' : kwargs.get('date1')
-                    })
+                    dias = self._Campo(kwargs.get('date1'), 'dayofweek')
 
-                    # Contadores fiables
-                    c_semana = sum(1 for d in dias if d < 5)
-                    c_finde = sum(1 for d in dias if d >= 5)
+                    # Contadores vectorizados (las fechas inválidas no cuentan en ningún grupo)
+                    conteo_dias = _semana(dias, kwargs.get('finde', (5, 6))).value_counts()
+                    c_semana = conteo_dias["Semana"]
+                    c_finde = conteo_dias["Fin de semana"]
 
                     print("\n--- 📊 ACTIVIDAD SEMANAL ---")
                     print (f"Ventas en dia de semana: {c_semana} \nVentas los fines de semana: {c_finde}\n")
@@ -977,18 +4342,10 @@ class DataToolBox:
                     #Formula: Extracción de la hora (.dt.hour) y uso de condicionales  
 
                     #Realizamos operacion
-                    horas = self.Time({
-                        'op' : 'H',
-                        'dt1' : kwargs.get('date1')
-                    })
+                    horas = self._Campo(kwargs.get('date1'), 'hour')
 
-                    self.df['Turno'] = [
-                        "Mañana" if 6 <= h < 12 else 
-                        "Tarde" if 12 <= h < 18 else 
-                        "Noche" if 18 <= h < 24 else 
-                        "Madrugada" 
-                        for h in horas
-                    ]
+                    # Turnos configurables: {'Nombre': (hora_inicio, hora_fin)}, pueden cruzar la medianoche
+                    self.df['Turno'] = _turnos(horas, kwargs.get('turnos', _TURNOS))
 
                 case _:
                     print("❌ Operación no válida: no se especifico operacion")
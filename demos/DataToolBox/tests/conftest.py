@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# kit.py vive en la carpeta del demo, un nivel arriba de tests/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BANDEJA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bandeja")
+
+
+#cada prueba corre en su propia carpeta (reportes, marcas de agua y cachés no se mezclan)
+@pytest.fixture(autouse=True)
+def carpeta_temporal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def caos_total():
+    return os.path.join(BANDEJA, "caos_total.csv")
@@ -0,0 +1,45 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from kit import DataToolBox
+
+
+def _limpiar(db):
+    db.CleanText("nombre_cliente")
+    db.CleanText("producto", False)
+    db.CleanNumb("precio", "$", tipo="float")
+    db.CleanDate("fecha_compra", drop=False)
+    db.ExtractInfo("email")
+
+
+def _valores(df):
+    return df.astype(object).where(df.notna(), None).to_dict("list")
+
+
+def test_backend_pyarrow_igual_a_numpy(caos_total):
+    pd.read_csv(caos_total).to_parquet("caos.parquet")
+    arrow, numpy = DataToolBox("caos.parquet", backend="pyarrow"), DataToolBox("caos.parquet")
+
+    assert all(isinstance(t, pd.ArrowDtype) for t in arrow.df.dtypes)
+
+    _limpiar(arrow)
+    _limpiar(numpy)
+
+    assert _valores(arrow.df) == _valores(numpy.df)
+    # Los textos que no se tocaron siguen en Arrow
+    assert isinstance(arrow.df["email"].dtype, pd.ArrowDtype)
+    assert isinstance(arrow.df["cantidad"].dtype, pd.ArrowDtype)
+
+
+def test_export_parquet_sin_pasar_por_numpy(caos_total):
+    pd.read_csv(caos_total).to_parquet("caos.parquet")
+    db = DataToolBox("caos.parquet", backend="pyarrow")
+    db.CleanNumb("precio", "$", tipo="float")
+
+    db.Export("salida", carpeta="out", formato="parquet")
+
+    esquema = pq.read_schema("out/salida.parquet")
+    assert str(esquema.field("email").type) == "large_string"
+    assert str(esquema.field("precio").type) == "double"
+    leido = DataToolBox("out/salida.parquet", backend="pyarrow").df
+    assert _valores(leido) == _valores(db.df)
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kit import DataToolBox
+
+
+def _datos(filas=2_000):
+    generador = np.random.default_rng(3)
+    df = pd.DataFrame({"precio": generador.normal(100, 10, filas), "cantidad": generador.normal(5, 1, filas),
+                       "producto": generador.choice(["Laptop Pro", "Monitor 4K", "Mouse"], filas)})
+    df.loc[df["producto"] == "Mouse", "precio"] /= 10
+    df.loc[3, "precio"], df.loc[7, "cantidad"], df.loc[11, "precio"] = 1_000, -50, np.nan
+    return df
+
+
+#la regla de siempre columna por columna (límites medidos sobre el DataFrame original)
+def _dentro(df, columna, metodo, grupo=None):
+    serie = df[columna]
+    if grupo is None:
+        q1, q3, media, desviacion = serie.quantile(0.25), serie.quantile(0.75), serie.mean(), serie.std()
+    else:
+        agrupado = df.groupby(grupo)[columna]
+        q1, q3 = agrupado.transform(lambda s: s.quantile(0.25)), agrupado.transform(lambda s: s.quantile(0.75))
+        media, desviacion = agrupado.transform("mean"), agrupado.transform("std")
+    if metodo == "iqr":
+        bajo, alto = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    else:
+        bajo, alto = media - 3 * desviacion, media + 3 * desviacion
+    return serie.isna() | serie.between(bajo, alto)
+
+
+@pytest.mark.parametrize("metodo", ["iqr", "zscore"])
+@pytest.mark.parametrize("grupo", [None, "producto"])
+def test_cleanfalse_varias_columnas_igual_a_una_por_una(metodo, grupo):
+    df = _datos()
+    db = DataToolBox(df.copy())
+
+    db.CleanFalse(["precio", "cantidad"], metodo=metodo, grupo=grupo)
+
+    dentro = _dentro(df, "precio", metodo, grupo) & _dentro(df, "cantidad", metodo, grupo)
+    assert db.df.index.tolist() == df.index[dentro].tolist()
+    assert 3 not in db.df.index and 7 not in db.df.index and 11 in db.df.index
+
+
+def test_limites_por_lotes_cerca_de_los_exactos():
+    df = _datos(20_000)
+    df.to_csv("ventas.csv", index=False)
+    db = DataToolBox(df.copy())
+
+    exactos = db.Limites(["precio", "cantidad"])
+    aproximados = db.Limites(["precio", "cantidad"], origen="ventas.csv", chunksize=3_000)
+
+    np.testing.assert_allclose(aproximados.to_numpy(), exactos.to_numpy(), rtol=0.03)
+
+
+def test_cleanfalse_con_limites_fijos_en_stream():
+    df = _datos()
+    df.to_csv("ventas.csv", index=False)
+    db = DataToolBox(pd.DataFrame())
+
+    db.Stream("ventas.csv", [("CleanFalse", ["precio"], {"limites": {"precio": (0, 500)}})], name="limpio",
+              carpeta="out", chunksize=500)
+
+    limpio = pd.read_csv("out/limpio.csv")
+    assert len(limpio) == len(df) - 1
+    assert limpio["precio"].max() < 500
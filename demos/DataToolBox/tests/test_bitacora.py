@@ -0,0 +1,80 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+from kit import Bitacora
+
+
+def test_ruta_relativa_se_fija_al_crear(tmp_path, monkeypatch):
+    bitacora = Bitacora("rel.jsonl")
+    otra = tmp_path / "otra"
+    otra.mkdir()
+    monkeypatch.chdir(otra)
+
+    bitacora.Escribir({"mensaje": "hola"})
+    assert bitacora.Vaciar(timeout=5)
+    bitacora.Cerrar()
+
+    assert (tmp_path / "rel.jsonl").exists()
+    assert not (otra / "rel.jsonl").exists()
+
+
+def test_error_al_abrir_no_bloquea(tmp_path):
+    (tmp_path / "archivo").write_text("no soy carpeta")
+    bitacora = Bitacora(str(tmp_path / "archivo" / "log.jsonl"), capacidad=2)
+
+    inicio = time.monotonic()
+    for i in range(10):
+        bitacora.Escribir({"i": i})
+
+    assert bitacora.Vaciar(timeout=5)
+    assert time.monotonic() - inicio < 3
+    assert bitacora.error is not None
+    assert bitacora.perdidos == 10
+    bitacora.Cerrar()
+
+
+def test_error_de_disco_deshabilita_y_sigue_vaciando(monkeypatch, capsys):
+    def fsync_roto(_):
+        raise OSError("disco lleno")
+
+    bitacora = Bitacora("log.jsonl", fsync_cada=1)
+    bitacora.Escribir({"i": 0})
+    assert bitacora.Vaciar(timeout=5)
+
+    monkeypatch.setattr(os, "fsync", fsync_roto)
+    for i in range(1, 5):
+        bitacora.Escribir({"i": i})
+
+    assert bitacora.Vaciar(timeout=5)
+    assert isinstance(bitacora.error, OSError)
+    assert bitacora.perdidos >= 1
+    assert capsys.readouterr().err.count("Bitácora deshabilitada") == 1
+    bitacora.Cerrar()
+
+    with open("log.jsonl", encoding="utf-8") as archivo:
+        assert json.loads(archivo.readline()) == {"i": 0}
+
+
+def test_vaciar_tiene_limite():
+    bitacora = Bitacora("log.jsonl")
+    bitacora.Cerrar()
+    bitacora._cola.put({"i": 1})
+
+    inicio = time.monotonic()
+    assert bitacora.Vaciar(timeout=0.2) is False
+    assert time.monotonic() - inicio < 2
+
+
+def test_configurar_reporte_reconfigura_la_bitacora_abierta():
+    from kit import DataToolBox, _bitacora
+
+    db = DataToolBox(pd.DataFrame({"a": [1]}))
+    db.Reporte("con las opciones por defecto")
+    db.ConfigurarReporte("factura_proceso.jsonl", max_bytes=1_000, respaldos=1, fsync_cada=1)
+
+    bitacora = _bitacora("factura_proceso.jsonl")
+    assert (bitacora.max_bytes, bitacora.respaldos, bitacora.fsync_cada) == (1_000, 1, 1)
+    bitacora.Cerrar()
@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from kit import DataToolBox
+
+
+@pytest.mark.parametrize("filas", [40, 1200])
+def test_cleannumb_por_categoria_mismo_tipo_sin_nulos(filas):
+    db = DataToolBox(pd.DataFrame({"a": [str(1 + i % 4) for i in range(filas)]}))
+
+    db.CleanNumb("a", drop=False, tipo="int")
+
+    assert db.df["a"].dtype == "int64"
+
+
+def test_cleannumb_por_categoria_con_nulos():
+    db = DataToolBox(pd.DataFrame({"a": [str(1 + i % 4) for i in range(1199)] + [None]}))
+
+    db.CleanNumb("a", drop=False, tipo="int")
+
+    assert db.df["a"].dtype == "Int64"
+    assert db.df["a"].isna().sum() == 1
+
+
+def test_cleantext_categorias_declaradas():
+    db = DataToolBox(pd.DataFrame({"p": ["  laptop PRO", "Laptop pro!!", "monitor", None]}))
+    db.Categorizar(["p"])
+
+    db.CleanText("p", False)
+
+    assert isinstance(db.df["p"].dtype, pd.CategoricalDtype)
+    assert db.df["p"].tolist()[:3] == ["Laptop pro", "Laptop pro", "Monitor"]
+    assert list(db.df["p"].cat.categories) == ["Laptop pro", "Monitor"]
@@ -0,0 +1,29 @@
+import os
+
+import pandas as pd
+
+from kit import _leer_columnar
+
+
+def _copias(carpeta):
+    return sorted(os.listdir(carpeta / ".datatoolbox"))
+
+
+def test_copia_columnar_solo_borra_versiones_anteriores(tmp_path):
+    ruta = tmp_path / "ventas.json"
+    pd.DataFrame({"id": [1, 2]}).to_json(ruta)
+
+    assert _leer_columnar(str(ruta))["id"].tolist() == [1, 2]
+    (primera,) = _copias(tmp_path)
+    ajena = tmp_path / ".datatoolbox" / "ventas.json.respaldo.feather"
+    ajena.write_bytes(b"")
+
+    # La copia vigente se reutiliza y no se toca
+    assert _leer_columnar(str(ruta), {"id"})["id"].tolist() == [1, 2]
+    assert _copias(tmp_path) == sorted([primera, ajena.name])
+
+    pd.DataFrame({"id": [3]}).to_json(ruta)
+    assert _leer_columnar(str(ruta))["id"].tolist() == [3]
+
+    copias = _copias(tmp_path)
+    assert primera not in copias and ajena.name in copias and len(copias) == 2
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from kit import DataToolBox
+
+
+def _datos():
+    return pd.DataFrame({"id": [1, 2, 3], "precio": [10.5, 20.25, 30.0], "producto": ["a", "a", "b"]})
+
+
+def test_export_compacta_una_copia():
+    db = DataToolBox(_datos(), compactar="final")
+    tipos = db.df.dtypes.to_dict()
+
+    db.Export("salida", carpeta="out", formato="parquet")
+
+    assert db.df.dtypes.to_dict() == tipos
+    escrito = pd.read_parquet("out/salida.parquet")
+    assert escrito["id"].dtype == "int8"
+    assert escrito["precio"].dtype == "float32"
+    assert escrito["id"].tolist() == [1, 2, 3]
+
+
+def test_exportsql_compacta_una_copia(tmp_path):
+    db = DataToolBox(_datos(), compactar="final")
+    db.Conexion(red=False, bd=str(tmp_path / "datos.db"))
+    tipos = db.df.dtypes.to_dict()
+
+    db.ExportSQL("ventas")
+    db.df["id"] = db.df["id"] * 100   # seguiría desbordando si self.df se hubiera quedado en int8
+
+    assert db.df.dtypes.to_dict() == tipos
+    assert db.df["id"].tolist() == [100, 200, 300]
+
+
+def test_export_en_modo_lazy_no_deja_pasos_en_el_plan():
+    db = DataToolBox(_datos(), compactar="final")
+    db.Lazy()
+
+    db.Export("salida", carpeta="out", formato="parquet")
+
+    assert db.plan == []
+    assert pd.read_parquet("out/salida.parquet")["id"].dtype == "int8"
+    assert db.df["id"].dtype == "int64"
+
+
+def test_compact_reduce_tipos_sin_cambiar_valores():
+    df = pd.DataFrame({
+        "cantidad": [1, 2, 300] * 100,
+        "grande": [0, 2**40, 5] * 100,
+        "IVA": [1.5, 0.25, 2.0] * 100,
+        "precio": [19.99, 1.0, 2.0] * 100,
+        "producto": pd.Series(["Laptop Pro", "Monitor 4K", None] * 100, dtype=object),
+    })
+    db = DataToolBox(df.copy())
+
+    reporte = db.Compact()
+
+    tipos = db.df.dtypes.astype(str).to_dict()
+    assert tipos == {"cantidad": "int16", "grande": "int64", "IVA": "float32", "precio": "float64",
+                     "producto": "category"}
+    for columna in df.columns:
+        assert db.df[columna].astype(object).where(db.df[columna].notna(), None).tolist() == \
+            df[columna].astype(object).where(df[columna].notna(), None).tolist()
+    assert reporte["MB_despues"].sum() < reporte["MB_antes"].sum()
+
+
+def test_compact_respeta_entero_minimo():
+    db = DataToolBox(pd.DataFrame({"id": [1, 2, 3]}))
+
+    db.Compact(entero_min="int32")
+
+    assert db.df["id"].dtype == "int32"
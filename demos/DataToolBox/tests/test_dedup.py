@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from kit import DataToolBox, ConjuntoHashes, _hash_filas
+
+
+def test_dedup_ids_enteros_mayores_a_2_53():
+    # Distintos en int64 pero iguales si se pasan por float64
+    ids = [1_789_000_000_000_000_001, 1_789_000_000_000_000_002, 1_789_000_000_000_000_003]
+    assert len({float(i) for i in ids}) == 1
+
+    db = DataToolBox(pd.DataFrame({"id": ids}))
+    db.Dedup("id")
+
+    assert db.df["id"].tolist() == ids
+
+
+def test_hash_entero_y_float_entero_coinciden():
+    # Un lote sin nulos lee int64 y otro con nulos float64: 5 y 5.0 son la misma clave
+    enteros = pd.DataFrame({"id": [5, 7]})
+    flotantes = pd.DataFrame({"id": [5.0, np.nan, 7.5]})
+
+    a, b = _hash_filas(enteros, ["id"]), _hash_filas(flotantes, ["id"])
+
+    assert a[0] == b[0]
+    assert len({a[1], b[1], b[2]}) == 3
+
+
+def test_conjunto_persistente_entre_lotes(tmp_path):
+    carpeta = str(tmp_path / "hashes")
+    lote_1 = pd.DataFrame({"id": [1, 2, 2, 3]})
+    lote_2 = pd.DataFrame({"id": [3.0, 4.0, np.nan]})
+
+    db = DataToolBox(lote_1)
+    db.Dedup("id", persistente=carpeta)
+    assert db.df["id"].tolist() == [1, 2, 3]
+
+    # Otra instancia (otra ejecución) lee los hashes guardados en disco
+    db = DataToolBox(lote_2)
+    db.Dedup("id", persistente=carpeta)
+    assert db.df["id"].isna().sum() == 1
+    assert db.df["id"].dropna().tolist() == [4.0]
+    assert len(ConjuntoHashes(carpeta)) == 5
+
+
+def test_dedup_marcar_varias_claves():
+    db = DataToolBox(pd.DataFrame({"id": [1, 1, 1, 2], "fecha": ["a", "a", "b", "a"]}))
+
+    db.Dedup(["id", "fecha"], accion="marcar")
+
+    assert db.df["duplicado"].tolist() == [False, True, False, False]
+    assert len(db.df) == 4
+
+
+def test_cleanid_separa_prefijo_y_numero():
+    db = DataToolBox(pd.DataFrame({"id": ["TXN-1366", "txn 7", "A#07", "1366", "???", None]}))
+
+    db.CleanID("id", drop=True)
+
+    assert "id" not in db.df.columns
+    assert db.df["id_prefijo"].tolist()[:3] == ["TXN", "TXN", "A"]
+    assert pd.isna(db.df["id_prefijo"][3])
+    assert db.df["id_num"].tolist()[:4] == [1366, 7, 7, 1366]
+    assert db.df["id_num"].isna().tolist()[4:] == [True, True]
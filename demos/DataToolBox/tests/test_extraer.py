@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kit import DataToolBox, _extraer
+
+NOTAS = ["pago TXN-1366 ok", "sin folio", None, "TXN-7 y TXN-8"]
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_grupo_de_captura_como_str_extract(tipo):
+    serie = pd.Series(NOTAS, dtype=tipo)
+
+    extraido = _extraer(serie, r"TXN-(\d+)")
+    esperado = serie.str.extract(r"TXN-(\d+)", expand=False)
+
+    assert extraido.tolist()[0] == "1366"
+    assert extraido.isna().tolist() == esperado.isna().tolist()
+    assert extraido.dropna().tolist() == esperado.dropna().tolist()
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_sin_grupos_devuelve_la_coincidencia(tipo):
+    extraido = _extraer(pd.Series(NOTAS, dtype=tipo), r"TXN-\d+")
+
+    assert extraido.dropna().tolist() == ["TXN-1366", "TXN-7"]
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_extractinfo_varios_patrones_con_grupos(tipo):
+    db = DataToolBox(pd.DataFrame({"notas": pd.Series(["folio AB-12 total $40", "nada"], dtype=tipo)}))
+
+    db.ExtractInfo("notas", extraer={"folio": r"(?:AB)-(\d+)", "total": r"\$(\d+)"})
+
+    assert db.df["folio"].tolist()[0] == "12"
+    assert db.df["total"].tolist()[0] == "40"
+    assert pd.isna(db.df["folio"].tolist()[1])
+
+
+def test_email_sin_cambios():
+    db = DataToolBox(pd.DataFrame({"email": ["Ana <ana@x.com>", "---", np.nan]}))
+
+    db.ExtractInfo("email")
+
+    assert db.df["email"].tolist()[0] == "ana@x.com"
+    assert db.df["email"].isna().tolist()[1:] == [True, True]
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_presets_telefono_id_y_monto(tipo):
+    notas = ["folio AB-12 total $40", "tel 55-1234-5678 pago 300.50", "sin datos", None]
+    db = DataToolBox(pd.DataFrame({"notas": pd.Series(notas, dtype=tipo)}))
+
+    db.ExtractInfo("notas", extraer={"folio": "id", "tel": "telefono", "total": "monto"}, validar=True)
+
+    assert db.df["folio"].tolist()[0] == "AB-12"
+    assert db.df["tel"].tolist()[1] == "55-1234-5678"
+    assert db.df["total"].tolist()[:2] == ["$40", "300.50"]
+    assert db.df["total"].isna().tolist()[2:] == [True, True]
+    assert db.df["total_valido"].tolist()[:2] == [True, True]
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_monto_no_toma_folios_ni_telefonos(tipo):
+    notas = ["folio AB-12", "tel 55-1234-5678", "lote 1999", "total: -$1,234.56 mxn"]
+    db = DataToolBox(pd.DataFrame({"notas": pd.Series(notas, dtype=tipo)}))
+
+    db.ExtractInfo("notas", patron="monto")
+
+    assert db.df["notas"].isna().tolist()[:3] == [True, True, True]
+    assert db.df["notas"].tolist()[3] == "-$1,234.56"
@@ -0,0 +1,91 @@
+import pandas as pd
+
+from kit import DataToolBox, _fecha
+
+
+def test_fecha_con_zona_horaria_se_conserva():
+    serie = pd.Series(["2024-01-01 10:00+02:00", "2024-01-02 10:00+02:00", None])
+
+    fechas = _fecha(serie)
+
+    assert str(fechas.dt.tz) == "UTC+02:00"
+    assert fechas.iloc[0] == pd.Timestamp("2024-01-01 10:00", tz="UTC+02:00")
+    assert fechas.isna().tolist() == [False, False, True]
+
+
+def test_fechas_con_zonas_mezcladas_pasan_a_utc():
+    serie = pd.Series(["2024-01-01 10:00+02:00", "2024-01-01 10:00-05:00", "2024-01-03"])
+
+    fechas = _fecha(serie)
+
+    assert str(fechas.dt.tz) == "UTC"
+    assert fechas.tolist() == [pd.Timestamp("2024-01-01 08:00", tz="UTC"),
+                               pd.Timestamp("2024-01-01 15:00", tz="UTC"),
+                               pd.Timestamp("2024-01-03", tz="UTC")]
+
+
+def test_fecha_fuera_de_rango_ns():
+    serie = pd.Series(["9999-12-31", "2024-01-01", "basura"])
+
+    fechas = _fecha(serie)
+
+    assert fechas.iloc[0] == pd.Timestamp("9999-12-31")
+    assert fechas.iloc[1] == pd.Timestamp("2024-01-01")
+    assert pd.isna(fechas.iloc[2])
+
+
+def test_cleandate_no_elimina_fechas_con_zona():
+    db = DataToolBox(pd.DataFrame({"f": ["2024-01-01T10:00:00Z", "2024-01-02T11:30:00Z", "nunca"]}))
+
+    db.CleanDate("f")
+
+    assert len(db.df) == 2
+    assert db.df["f"].dt.tz is not None
+
+
+def test_fecha_dia_primero():
+    fechas = _fecha(pd.Series(["31/12/2023", "01/02/2024", "2024-03-05"]))
+
+    assert fechas.tolist() == [pd.Timestamp("2023-12-31"), pd.Timestamp("2024-02-01"), pd.Timestamp("2024-03-05")]
+
+
+# Lo que debe salir de cada texto distinto (ISO tal cual, con '/' el día va primero)
+ESPERADAS = {"2026-01-12 00:00:00": pd.Timestamp("2026-01-12"), "2026-15-99": pd.NaT, "MAÑANA": pd.NaT,
+             "2026-02-01 10:30:00": pd.Timestamp("2026-02-01 10:30"), "12/03/2026": pd.Timestamp("2026-03-12"),
+             None: pd.NaT, "05/11/2025": pd.Timestamp("2025-11-05")}
+
+
+def test_formatos_mezclados_igual_a_valor_por_valor():
+    valores = list(ESPERADAS) * 50 + ["2026-01-12 00:00:00"] * 50
+    reporte = {}
+
+    fechas = _fecha(pd.Series(valores), None, reporte)
+
+    assert fechas.tolist() == [ESPERADAS[v] for v in valores]
+    assert reporte == {"%Y-%m-%d %H:%M:%S": 150, "%d/%m/%Y": 100, "sin fecha": 150}
+
+
+def test_formatos_fijos_no_usan_el_parser_general():
+    reporte = {}
+
+    fechas = _fecha(pd.Series(["12/03/2026", "2026-03-12"]), ["%d/%m/%Y"], reporte)
+
+    assert fechas.tolist() == [pd.Timestamp("2026-03-12"), pd.NaT]
+    assert reporte == {"%d/%m/%Y": 1, "sin fecha": 1}
+
+
+def test_cache_de_fechas_ve_cambios_en_el_lugar():
+    db = DataToolBox(pd.DataFrame({"fecha": ["2026-01-05", "2026-01-06"], "n": [1, 2]}))
+
+    assert db.Time({"op": "Y", "dt1": "fecha"}).tolist() == [2026, 2026]
+
+    db.df["fecha"] = ["2025-03-01", "2025-03-02"]
+    assert db.Time({"op": "Y", "dt1": "fecha"}).tolist() == [2025, 2025]
+
+    db.df.loc[0, "fecha"] = "2024-07-01"
+    assert db.Time({"op": "Y", "dt1": "fecha"}).tolist() == [2024, 2025]
+
+    # Cambiar otra columna no obliga a convertir de nuevo
+    fechas = db._Fecha("fecha")
+    db.df.loc[0, "n"] = 9
+    assert db._Fecha("fecha") is fechas
@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kit import DataToolBox, _preset
+
+
+@pytest.mark.parametrize("tasa", [0.16, np.float64(0.16), np.float32(0.5), Decimal("0.16")])
+def test_preset_escalares_son_numeros(tasa):
+    assert "`" not in _preset("iva", {"col1": 2, "col2": tasa}).split("=", 1)[1]
+
+
+def test_calculadoraplus_con_escalares_de_numpy():
+    db = DataToolBox(pd.DataFrame({"precio": [100.0, 50.0], "peso": [2, 3]}))
+
+    db.CalculadoraPlus(tipo="iva", col1="precio", col2=np.float64(0.16))
+    db.CalculadoraPlus(tipo="envio_KG", col1="peso", col2=np.int64(15))
+
+    assert db.df["IVA"].tolist() == pytest.approx([16.0, 8.0])
+    assert db.df["Logistica"].tolist() == [30, 45]
+
+
+def test_preset_columnas_entre_comillas():
+    assert _preset("subtotal", {"col1": "precio", "col2": "cantidad"}) == "`Subtotal` = `precio` * `cantidad`"
+
+
+def _ventas(filas=1_000):
+    generador = np.random.default_rng(7)
+    return pd.DataFrame({
+        "precio": generador.uniform(1, 500, filas).round(2),
+        "cantidad": generador.integers(0, 20, filas),
+        "costo": generador.uniform(1, 400, filas).round(2),
+        "Descuento": generador.uniform(0, 5, filas),
+    })
+
+
+def test_formulas_igual_a_pandas_con_bloques_pequenos():
+    df = _ventas()
+    db = DataToolBox(df.copy())
+
+    db.Formula("Subtotal = precio * cantidad",
+               "IVA = Subtotal * 0.16",
+               "Precio_final = Subtotal + IVA - Descuento",
+               "`Margen %` = (precio - costo) / precio * 100",
+               "Raiz = sqrt(abs(precio - costo)) + maximum(cantidad, 3) ** 2 % 7",
+               bloque=64)
+
+    subtotal = df["precio"] * df["cantidad"]
+    iva = subtotal * 0.16
+    np.testing.assert_allclose(db.df["Subtotal"], subtotal)
+    np.testing.assert_allclose(db.df["Precio_final"], subtotal + iva - df["Descuento"])
+    np.testing.assert_allclose(db.df["Margen %"], (df["precio"] - df["costo"]) / df["precio"] * 100)
+    np.testing.assert_allclose(db.df["Raiz"], np.sqrt((df["precio"] - df["costo"]).abs())
+                               + np.maximum(df["cantidad"], 3) ** 2 % 7)
+
+
+def test_division_entre_cero_como_calculadora():
+    db = DataToolBox(pd.DataFrame({"a": [10.0, 6.0], "b": [0.0, 3.0]}))
+
+    db.Formula("c = a / b")
+
+    assert db.df["c"].tolist() == [10.0, 2.0]
+
+
+def test_formula_invalida_no_crea_columnas(capsys):
+    db = DataToolBox(pd.DataFrame({"a": [1.0]}))
+
+    db.Formula("b = a + no_existe")
+    db.Formula("c = __import__('os')")
+
+    assert db.df.columns.tolist() == ["a"]
+    assert capsys.readouterr().out.count("❌ ERROR en la fórmula") == 2
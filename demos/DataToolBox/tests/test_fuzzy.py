@@ -0,0 +1,56 @@
+import pandas as pd
+
+from kit import DataToolBox
+
+
+def _grupos(nombres, **opciones):
+    db = DataToolBox(pd.DataFrame({"n": nombres}))
+    db.Fuzzy("n", **opciones)
+    return dict(zip(db.df["n"], db.df["cluster_id"]))
+
+
+def test_nombres_cortos_distintos_no_se_unen():
+    grupos = _grupos(["Maria", "Marta", "Mariaa", "Ana", "Ada"])
+
+    # 1 error en 5 letras llega justo a 0.8, pero 'Marta' y 'Ada' no suenan igual
+    assert grupos["Maria"] != grupos["Marta"]
+    assert grupos["Maria"] == grupos["Mariaa"]
+    assert grupos["Ana"] != grupos["Ada"]
+
+
+def test_umbral_es_inclusivo():
+    # 1 error en 10 letras = 0.9 exacto: con similitud=0.9 se une, con 0.95 no
+    grupos = _grupos(["Alejandros", "Alejandras"], similitud=0.9)
+    assert grupos["Alejandros"] == grupos["Alejandras"]
+
+    grupos = _grupos(["Alejandros", "Alejandras"], similitud=0.95)
+    assert grupos["Alejandros"] != grupos["Alejandras"]
+
+
+def test_similitud_uno_une_mayusculas_y_la_fonetica_ignora_acentos():
+    grupos = _grupos(["MARIA", "maria", "Maria", "Marta"], similitud=1.0)
+    assert len({grupos["MARIA"], grupos["maria"], grupos["Maria"]}) == 1
+    assert grupos["Maria"] != grupos["Marta"]
+
+    # Sin CleanText previo los acentos se quitan para la clave fonética ('ñandú' y 'nandu' -> 'nnd')
+    grupos = _grupos(["Ñandú", "Nandu"], similitud=0.6)
+    assert grupos["Ñandú"] == grupos["Nandu"]
+
+
+def test_textos_largos_no_se_comparan():
+    largo = "a" * 10_000
+    grupos = _grupos([largo, largo + "b", "Alejandro", "Alejandor"])
+
+    assert grupos[largo] != grupos[largo + "b"]
+    assert grupos["Alejandro"] == grupos["Alejandor"]
+
+
+def test_transposicion_y_representante():
+    db = DataToolBox(pd.DataFrame({"n": ["Alejandro", "Alejandro", "Alejandor", None, "Guillermo"]}))
+
+    db.Fuzzy("n", representante="canon")
+
+    assert db.df["cluster_id"].tolist()[:2] == [db.df["cluster_id"][2]] * 2
+    assert db.df["cluster_id"][3] == -1
+    assert db.df["canon"].tolist()[:3] == ["Alejandro"] * 3
+    assert db.df["canon"][4] == "Guillermo"
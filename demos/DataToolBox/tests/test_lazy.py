@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from kit import DataToolBox
+
+
+def _pipeline(db):
+    db.CleanStruct()
+    db.CleanNumb("id")
+    db.CleanText("nombre_cliente")
+    db.CleanText("producto", False)
+    db.CleanNumb("precio", "$")
+    db.CleanNumb("cantidad")
+    db.CleanDate("fecha_compra")
+    db.ExtractInfo("email")
+    db.CalculadoraPlus(tipo="subtotal", col1="precio", col2="cantidad")
+    db.CalculadoraPlus(tipo="iva", col1="Subtotal")
+    db.CleanDecimal("IVA")
+
+
+def test_plan_lazy_igual_a_ejecucion_directa(caos_total):
+    directo = DataToolBox(caos_total)
+    _pipeline(directo)
+
+    diferido = DataToolBox(caos_total, lazy=True)
+    _pipeline(diferido)
+    assert diferido.plan
+
+    diferido.Collect()
+
+    pd.testing.assert_frame_equal(directo.df, diferido.df)
+
+
+@pytest.mark.parametrize("columnas", [["IVA"], ["id", "Subtotal"], ["email"]])
+def test_collect_por_columnas_igual_a_ejecucion_directa(caos_total, columnas):
+    directo = DataToolBox(caos_total)
+    _pipeline(directo)
+
+    diferido = DataToolBox(caos_total, lazy=True)
+    _pipeline(diferido)
+    diferido.Collect(columnas)
+
+    # La poda puede dejar fuera columnas que no se pidieron, nunca filas ni valores
+    pd.testing.assert_frame_equal(directo.df[columnas], diferido.df[columnas])
+
+
+def test_filtro_de_filas_se_adelanta_sin_cambiar_el_resultado(caos_total):
+    def pasos(db):
+        db.CleanNumb("precio", "$")
+        db.CleanText("producto", False)
+        db.CleanDate("fecha_compra")
+        db.CalculadoraPlus(tipo="subtotal", col1="precio", col2="cantidad")
+
+    directo = DataToolBox(caos_total)
+    pasos(directo)
+
+    diferido = DataToolBox(caos_total, lazy=True)
+    pasos(diferido)
+    orden = [op["nombre"] for op in diferido.Plan()]
+    assert orden.index("CleanDate") < orden.index("CleanText")
+    diferido.Collect()
+
+    # El filtro de CleanDate se adelanta a CleanText: la detección automática de Categorical
+    # debe decidirse con las mismas filas que en modo directo
+    assert isinstance(directo.df["producto"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(directo.df, diferido.df)
+
+
+def test_collect_fallido_conserva_el_plan(caos_total):
+    db = DataToolBox(caos_total, lazy=True)
+    db.CleanText("producto", False)
+    db.CleanNumb("no_existe")
+    pasos = list(db.plan)
+
+    db.Collect()
+    assert db.plan == pasos
+    assert db.df.empty
+
+    # Se corrige el paso y se reintenta sobre los datos originales
+    db.plan[-1] = ("CleanNumb", ("precio", "$"), {})
+    db.Collect()
+
+    directo = DataToolBox(caos_total)
+    directo.CleanText("producto", False)
+    directo.CleanNumb("precio", "$")
+    assert db.plan == []
+    pd.testing.assert_frame_equal(directo.df, db.df)
+
+
+def test_stream_con_paso_inexistente(caos_total):
+    db = DataToolBox(pd.DataFrame())
+
+    assert db.Stream(caos_total, [("NoExiste", "precio")], name="x", carpeta="out") == 0
+    assert db.Stream(caos_total, [("_Leer", "precio")], name="x", carpeta="out") == 0
+
+
+def test_clave_de_cache_cambia_con_las_opciones_de_tipos(tmp_path):
+    ruta = tmp_path / "ventas.csv"
+    pd.DataFrame({"producto": ["a", "b"]}).to_csv(ruta, index=False)
+    db = DataToolBox(str(ruta), lazy=True)
+    pasos = [("CleanText", ("producto",), {})]
+
+    claves = {db._ClaveCache(pasos)}
+    db.Categorizar(["producto"])
+    claves.add(db._ClaveCache(pasos))
+    db.auto_compactar = "carga"
+    claves.add(db._ClaveCache(pasos))
+
+    assert len(claves) == 3
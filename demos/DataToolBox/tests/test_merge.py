@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pandas as pd
+
+from kit import DataToolBox
+
+KIT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _archivos(carpeta, cuantos=3):
+    rutas = []
+    for i in range(cuantos):
+        ruta = carpeta / f"ventas_{i}.csv"
+        pd.DataFrame({"id": [i * 10, i * 10 + 1], "precio": [1.5, 2.5]}).to_csv(ruta, index=False)
+        rutas.append(str(ruta))
+    return rutas
+
+
+def test_mergeplus_con_hilos(tmp_path):
+    db = DataToolBox(pd.DataFrame())
+
+    rezagados = db.MergePlus(_archivos(tmp_path) + [str(tmp_path / "no_existe.csv")])
+
+    assert sorted(db.df["id"]) == [0, 1, 10, 11, 20, 21]
+    assert rezagados == [str(tmp_path / "no_existe.csv")]
+
+
+def test_procesos_con_spawn_sin_guardia_no_se_repite(tmp_path):
+    _archivos(tmp_path)
+    script = tmp_path / "sin_guardia.py"
+    script.write_text(textwrap.dedent(f"""
+        import glob, multiprocessing, sys
+        sys.path.insert(0, {KIT!r})
+        multiprocessing.set_start_method("spawn", force=True)
+        import pandas as pd
+        from kit import DataToolBox
+
+        db = DataToolBox(pd.DataFrame())
+        db.MergePlus(sorted(glob.glob({str(tmp_path / "ventas_*.csv")!r})), procesos=True, hilos=2)
+        print("FILAS", len(db.df))
+    """), encoding="utf-8")
+
+    salida = subprocess.run([sys.executable, str(script)], cwd=tmp_path, capture_output=True, text=True,
+                            timeout=120)
+
+    assert salida.returncode == 0, salida.stderr
+    # Solo el proceso principal termina la unión con sus 6 filas; los hijos usan hilos en vez de otro pool
+    assert salida.stdout.count("FILAS 6") >= 1
+    assert "Se usarán hilos" in salida.stdout
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kit import _numero
+
+PRECIOS = ["$1,234.50", "426.35", "12", "abc", None, "  7 ", "-3.25", "$0.99", "1e3"]
+
+
+#valor por valor: se quitan los símbolos y lo que quede se lee con float()
+def _referencia(valor, simbolos, decimal="."):
+    if valor is None:
+        return np.nan
+    texto = str(valor)
+    for simbolo in simbolos:
+        texto = texto.replace(simbolo, "")
+    if decimal == ",":
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return float(texto.strip())
+    except ValueError:
+        return np.nan
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+def test_numero_igual_a_float_valor_por_valor(tipo):
+    resultado = _numero(pd.Series(PRECIOS, dtype=tipo), sib=["$", ","], drop=False, tipo="float")
+
+    esperado = np.array([_referencia(v, ["$", ","]) for v in PRECIOS])
+    np.testing.assert_array_equal(resultado.to_numpy(dtype=np.float64, na_value=np.nan), esperado)
+
+
+def test_decimales_se_conservan():
+    resultado = _numero(pd.Series(["426.35", "12"]))
+
+    assert resultado.dtype == np.float64
+    assert resultado.tolist() == [426.35, 12.0]
+
+
+def test_coma_decimal():
+    valores = ["€1.234,56", "-7,5", "x"]
+
+    resultado = _numero(pd.Series(valores), sib=["€"], decimal=",", drop=False)
+
+    esperado = [_referencia(v, ["€"], ",") for v in valores]
+    np.testing.assert_array_equal(resultado.to_numpy(dtype=np.float64, na_value=np.nan), esperado)
+
+
+def test_tipos_de_salida():
+    valores = pd.Series(["1", "2.349", None])
+
+    assert _numero(valores).tolist() == [1.0, 2.349, 0.0]
+    assert _numero(valores, tipo="Int64", drop=False).tolist()[::2] == [1, pd.NA]
+    assert _numero(valores, tipo="decimal", escala=2).tolist() == [1.0, 2.35, 0.0]
+    assert _numero(pd.Series(["1", "2"])).dtype == np.int64
+
+
+def test_columna_ya_numerica_no_cambia():
+    serie = pd.Series([3, 1, 2], name="cantidad")
+
+    resultado = _numero(serie)
+
+    assert resultado.dtype == np.int64
+    assert resultado.tolist() == [3, 1, 2]
+    assert resultado.name == "cantidad"
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+from kit import DataToolBox, _tipo_compacto
+
+
+def test_testdata_sugiere_lo_mismo_que_compact():
+    df = pd.DataFrame({
+        "id": [1, 2, 300] * 10,
+        "medio": [0.5, 1.25, np.nan] * 10,
+        "precio": [19.99, 1.0, 2.0] * 10,
+        "producto": ["x", "y", "z"] * 10,
+        "folio": [str(i) for i in range(30)],
+    })
+
+    perfil = DataToolBox(df).TestData()
+
+    for columna in df.columns:
+        esperado = _tipo_compacto(df[columna])
+        assert perfil["columnas"][columna]["sugerido"] == (None if esperado is None else str(esperado))
+
+
+def test_testdata_con_dataframe_vacio():
+    assert DataToolBox(pd.DataFrame()).TestData()["columnas"] == {}
+    assert DataToolBox(pd.DataFrame({"a": []})).TestData()["filas"] == 0
@@ -0,0 +1,96 @@
+import os
+
+import pandas as pd
+import pytest
+
+from kit import DataToolBox
+
+
+def test_stream_parquet_lote_entero_y_lote_decimal():
+    # El primer lote solo trae enteros y el segundo trae decimales: el esquema no puede salir de 'auto'
+    pd.DataFrame({"precio": ["10", "20", "30.5", "$40"], "producto": list("abcd")}).to_csv("mixto.csv", index=False)
+    db = DataToolBox(pd.DataFrame())
+
+    filas = db.Stream("mixto.csv", [("CleanNumb", "precio", "$")], name="limpio", carpeta="out",
+                      formato="parquet", chunksize=2)
+    leido = pd.read_parquet("out/limpio.parquet")
+
+    assert filas == 4
+    assert leido["precio"].dtype == "float64"
+    assert leido["precio"].tolist() == [10.0, 20.0, 30.5, 40.0]
+
+
+def test_stream_respeta_tipo_explicito():
+    pd.DataFrame({"cantidad": ["1", "2", "3", "4"]}).to_csv("enteros.csv", index=False)
+    db = DataToolBox(pd.DataFrame())
+
+    db.Stream("enteros.csv", [("CleanNumb", "cantidad", {"tipo": "int"})], name="limpio", carpeta="out",
+              formato="parquet", chunksize=2)
+
+    assert pd.read_parquet("out/limpio.parquet")["cantidad"].dtype == "int64"
+
+
+PASOS = [
+    ("CleanStruct",),
+    ("CleanNumb", "precio", "$"),
+    ("CleanNumb", "cantidad"),
+    ("CleanText", "producto", False),
+    ("CalculadoraPlus", {"tipo": "subtotal", "col1": "precio", "col2": "cantidad"}),
+]
+
+
+def _completo(caos_total):
+    # El mismo proceso sobre el archivo entero, con el tipo que Stream usa en todos los lotes
+    db = DataToolBox(caos_total)
+    db.CleanStruct()
+    db.CleanNumb("precio", "$", tipo="float")
+    db.CleanNumb("cantidad", tipo="float")
+    db.CleanText("producto", False)
+    db.CalculadoraPlus(tipo="subtotal", col1="precio", col2="cantidad")
+    return db.df.reset_index(drop=True)
+
+
+def test_stream_csv_y_json_igual_al_archivo_completo(caos_total):
+    esperado = _completo(caos_total)
+    db = DataToolBox(pd.DataFrame())
+
+    filas_csv = db.Stream(caos_total, PASOS, name="limpio", carpeta="out", formato="csv", chunksize=150)
+    filas_json = db.Stream(caos_total, PASOS, name="limpio", carpeta="out", formato="json", chunksize=150)
+
+    assert filas_csv == filas_json == len(esperado)
+    for leido in (pd.read_csv("out/limpio.csv"), pd.read_json("out/limpio.jsonl", lines=True)):
+        assert leido["Subtotal"].tolist() == pytest.approx(esperado["Subtotal"].tolist())
+        assert leido["producto"].tolist() == esperado["producto"].astype(str).tolist()
+
+
+def test_stream_a_tabla_sql(caos_total, tmp_path):
+    esperado = _completo(caos_total)
+    db = DataToolBox(pd.DataFrame())
+    db.Conexion(red=False, bd=str(tmp_path / "datos.db"))
+
+    filas = db.Stream(caos_total, PASOS, tabla="ventas", modo="replace", chunksize=200)
+
+    with db.engine.connect() as con:
+        leido = pd.read_sql_query("SELECT * FROM ventas", con)
+    assert filas == len(leido) == len(esperado)
+    assert leido["Subtotal"].sum() == pytest.approx(esperado["Subtotal"].sum())
+
+
+def test_stream_sin_duplicados_entre_lotes(tmp_path):
+    pd.DataFrame({"id": [1, 2, 2, 3, 1, 4, 3, 5]}).to_csv("ids.csv", index=False)
+    db = DataToolBox(pd.DataFrame())
+
+    pasos = [("Dedup", "id", {"persistente": str(tmp_path / "hashes")})]
+    filas = db.Stream("ids.csv", pasos, name="unicos", carpeta="out", chunksize=3)
+
+    assert filas == 5
+    assert pd.read_csv("out/unicos.csv")["id"].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_stream_rechaza_pasos_que_necesitan_todo_el_archivo(caos_total):
+    db = DataToolBox(pd.DataFrame())
+
+    filas = db.Stream(caos_total, [("CleanFalse", "precio")], name="x", carpeta="out")
+
+    assert filas == 0
+    assert not os.path.exists("out/x.csv")
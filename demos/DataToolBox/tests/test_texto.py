@@ -0,0 +1,49 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kit import DataToolBox, _texto
+
+NOMBRES = ["  José  Pérez ", "MARÍA123!!", "ñandú", None, "", "  ", 'Laptop Pro 15"', "ÅNGSTRÖM",
+           "o'brien", "Ana\tSofía", "123", "ÇA VA?"]
+
+
+#la cadena de métodos de antes, paso a paso y con los acentos quitados antes de los símbolos
+def _referencia(valor, drop):
+    if valor is None:
+        return np.nan
+    texto = unicodedata.normalize("NFKD", str(valor)).encode("ascii", "ignore").decode("ascii")
+    texto = re.sub(r"[^A-Za-z\s]" if drop else r"[^A-Za-z0-9\s]", "", texto)
+    return texto.strip().lower().capitalize()
+
+
+@pytest.mark.parametrize("tipo", [object, "str"])
+@pytest.mark.parametrize("drop", [True, False])
+def test_texto_igual_a_la_cadena_de_metodos(tipo, drop):
+    resultado = _texto(pd.Series(NOMBRES, dtype=tipo), drop=drop)
+
+    esperado = [_referencia(v, drop) for v in NOMBRES]
+    assert resultado.isna().tolist() == pd.isna(esperado).tolist()
+    assert resultado.dropna().tolist() == [e for e in esperado if isinstance(e, str)]
+
+
+def test_acentos_se_quitan_en_vez_de_borrar_la_letra():
+    assert _texto(pd.Series(["José", "MARÍA123!!"])).tolist() == ["Jose", "Maria"]
+    assert _texto(pd.Series(["MARÍA123!!"]), drop=False).tolist() == ["Maria123"]
+
+
+def test_cleantext_por_categorias_igual_a_fila_por_fila():
+    valores = NOMBRES * 200
+    directo = DataToolBox(pd.DataFrame({"nombre": valores}))
+    directo.umbral_categorico = None
+    directo.CleanText("nombre")
+
+    categorias = DataToolBox(pd.DataFrame({"nombre": valores}))
+    categorias.Categorizar(["nombre"])
+    categorias.CleanText("nombre")
+
+    assert isinstance(categorias.df["nombre"].dtype, pd.CategoricalDtype)
+    assert categorias.df["nombre"].astype(object).tolist() == directo.df["nombre"].astype(object).tolist()